@@ -4,3 +4,6 @@ from . import account
 from . import account_move_line
 from . import ir_actions_report
 from . import res_config_settings
+from . import account_move
+from . import account_move_line_month_balance
+from . import account_financial_report_job
@@ -0,0 +1,244 @@
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html).
+
+import hashlib
+import json
+import logging
+from datetime import timedelta
+
+from odoo import api, fields, models
+from odoo.tools import json_default
+
+_logger = logging.getLogger(__name__)
+
+REPORT_MIMETYPES = {
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "pdf": "application/pdf",
+    "html": "text/html",
+}
+
+
+class AccountFinancialReportJob(models.Model):
+    """Financial report computed in background.
+
+    The wizards enqueue a job instead of rendering the report inside the HTTP
+    request. A cron renders it, stores the file as an attachment and notifies
+    the user. Jobs are also a result cache: the cache key is built from the
+    report filters and the last change of the journal entries they cover, so
+    an identical report is returned at once until the ledger changes.
+    """
+
+    _name = "account.financial.report.job"
+    _description = "Financial Report Job"
+    _order = "id desc"
+
+    name = fields.Char(required=True, readonly=True)
+    user_id = fields.Many2one(
+        "res.users", required=True, readonly=True, default=lambda self: self.env.user
+    )
+    company_id = fields.Many2one(
+        "res.company",
+        required=True,
+        readonly=True,
+        default=lambda self: self.env.company,
+    )
+    report_name = fields.Char(required=True, readonly=True)
+    report_type = fields.Char(required=True, readonly=True)
+    res_model = fields.Char(required=True, readonly=True)
+    res_id = fields.Integer(readonly=True)
+    data = fields.Text(readonly=True)
+    cache_key = fields.Char(required=True, readonly=True, index=True)
+    state = fields.Selection(
+        [
+            ("pending", "Pending"),
+            ("done", "Done"),
+            ("failed", "Failed"),
+        ],
+        default="pending",
+        required=True,
+        readonly=True,
+        index=True,
+    )
+    attachment_id = fields.Many2one("ir.attachment", readonly=True)
+    error = fields.Text(readonly=True)
+    date_done = fields.Datetime(readonly=True)
+
+    @api.model
+    def _get_ledger_version(self, company_id, data):
+        """Return a value that changes whenever a journal entry covered by
+        the report filters ``data`` is created, modified or deleted, or
+        whenever a journal item of the company is reconciled or unreconciled.
+
+        Only the end date and the journals restrict the entries: reports
+        with initial balances read every entry before their start date, and
+        the unaffected earnings don't follow the accounts filter."""
+        domain = [("company_id", "=", company_id)]
+        if date_to := data.get("date_to") or data.get("date_at"):
+            domain.append(("date", "<=", date_to))
+        if data.get("journal_ids"):
+            domain.append(("journal_id", "in", data["journal_ids"]))
+        version = []
+        for model_name in ("account.move", "account.move.line"):
+            version += self.env[model_name]._read_group(
+                domain, [], ["write_date:max", "__count"]
+            )[0]
+        # Reconciling only creates or deletes partial reconciliations, the
+        # residual amounts and reconciled items follow from them
+        version += self.env["account.partial.reconcile"]._read_group(
+            [("company_id", "=", company_id)],
+            [],
+            ["write_date:max", "id:max", "__count"],
+        )[0]
+        return version
+
+    @api.model
+    def _get_cache_key(self, report_name, report_type, data, company_id):
+        # The wizard is transient, its id does not identify the report
+        filters = {key: value for key, value in data.items() if key != "wizard_id"}
+        payload = json.dumps(
+            [
+                report_name,
+                report_type,
+                filters,
+                self._get_ledger_version(company_id, filters),
+                self.env.lang,
+            ],
+            sort_keys=True,
+            default=json_default,
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    @api.model
+    def _enqueue(self, wizard, action):
+        """Return the cached result of the report ``action`` of ``wizard`` if
+        any, or enqueue a job rendering it and notify the user."""
+        # Report actions may be wrapped in the document layout configurator
+        action = action.get("context", {}).get("report_action", action)
+        data = json.loads(json.dumps(action.get("data") or {}, default=json_default))
+        company_id = data.get("company_id") or self.env.company.id
+        cache_key = self._get_cache_key(
+            action["report_name"], action["report_type"], data, company_id
+        )
+        job = self.search(
+            [
+                ("cache_key", "=", cache_key),
+                ("user_id", "=", self.env.uid),
+                ("state", "in", ("pending", "done")),
+            ],
+            limit=1,
+        )
+        if job.state == "done" and job.attachment_id:
+            return job._get_download_action()
+        if not job:
+            job = self.create(
+                {
+                    "name": action.get("name") or action["report_name"],
+                    "company_id": company_id,
+                    "report_name": action["report_name"],
+                    "report_type": action["report_type"],
+                    "res_model": wizard._name,
+                    "res_id": wizard.id,
+                    "data": json.dumps(data),
+                    "cache_key": cache_key,
+                }
+            )
+            self.env.ref(
+                "account_financial_report.ir_cron_run_financial_report_jobs"
+            ).sudo()._trigger()
+        return {
+            "type": "ir.actions.client",
+            "tag": "display_notification",
+            "params": {
+                "type": "info",
+                "title": job.name,
+                "message": self.env._(
+                    "The report is being generated, you will be notified when "
+                    "it is ready."
+                ),
+                "next": {"type": "ir.actions.act_window_close"},
+            },
+        }
+
+    def _get_download_action(self):
+        self.ensure_one()
+        return {
+            "type": "ir.actions.act_url",
+            "url": f"/web/content/{self.attachment_id.id}?download=true",
+            "target": "self",
+        }
+
+    def _run(self):
+        """Render the report and store it as an attachment of the job."""
+        for job in self:
+            wizard = job.env[job.res_model].browse(job.res_id).exists()
+            if not wizard:
+                job.write(
+                    {
+                        "state": "failed",
+                        "error": self.env._("The report wizard has expired."),
+                    }
+                )
+                continue
+            report_env = job.with_user(job.user_id).with_company(job.company_id)
+            content, extension = (
+                report_env.env["ir.actions.report"]
+                .with_context(active_model=job.res_model, active_ids=[job.res_id])
+                ._render(job.report_name, [job.res_id], data=json.loads(job.data))
+            )
+            attachment = self.env["ir.attachment"].create(
+                {
+                    "name": f"{job.name}.{extension}",
+                    "raw": content,
+                    "mimetype": REPORT_MIMETYPES.get(extension),
+                    "res_model": job._name,
+                    "res_id": job.id,
+                }
+            )
+            job.write(
+                {
+                    "state": "done",
+                    "attachment_id": attachment.id,
+                    "date_done": fields.Datetime.now(),
+                }
+            )
+            job._notify_done()
+
+    def _notify_done(self):
+        for job in self:
+            job.user_id.partner_id._bus_send(
+                "simple_notification",
+                {
+                    "type": "success",
+                    "title": job.name,
+                    "message": self.env._(
+                        "The report is ready, you can download it from the "
+                        "Report Jobs menu."
+                    ),
+                },
+            )
+
+    @api.model
+    def _cron_run_jobs(self):
+        """Run the pending jobs, committing after each one so a failing or
+        slow report does not hold back the others."""
+        for job in self.search([("state", "=", "pending")], order="id"):
+            try:
+                with self.env.cr.savepoint():
+                    job._run()
+            except Exception as error:
+                _logger.exception("Financial report job %s failed", job.id)
+                job.write({"state": "failed", "error": str(error)})
+            if not self.env.registry.in_test_mode():
+                self.env.cr.commit()
+
+    @api.autovacuum
+    def _gc_jobs(self):
+        """Remove the jobs older than a week along with their files."""
+        jobs = self.search(
+            [("create_date", "<", fields.Datetime.now() - timedelta(days=7))]
+        )
+        jobs.attachment_id.unlink()
+        jobs.unlink()
+
+    def action_download(self):
+        self.ensure_one()
+        return self._get_download_action()
@@ -0,0 +1,30 @@
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html).
+
+from odoo import models
+
+from .account_move_line_month_balance import MONTH_BALANCE_MOVE_FIELDS
+
+
+class AccountMove(models.Model):
+    _inherit = "account.move"
+
+    def _get_posted_moves(self):
+        return self.filtered(lambda move: move.state == "posted")
+
+    def write(self, vals):
+        month_balance_model = self.env["account.move.line.month.balance"]
+        if (
+            self.env.context.get("skip_month_balance")
+            or not MONTH_BALANCE_MOVE_FIELDS.intersection(vals)
+            or not month_balance_model._is_active()
+        ):
+            return super().write(vals)
+        # The items of the entries are removed with their current values and
+        # added back once written, the journal items hooks are skipped since
+        # the items created, modified or removed by this write are covered.
+        month_balance_model.sudo()._apply_moves(self._get_posted_moves(), sign=-1)
+        res = super(AccountMove, self.with_context(skip_month_balance=True)).write(
+            vals
+        )
+        month_balance_model.sudo()._apply_moves(self._get_posted_moves())
+        return res
@@ -5,6 +5,8 @@ from collections import defaultdict
 from odoo import api, fields, models
 from odoo.fields import Command
 
+from .account_move_line_month_balance import MONTH_BALANCE_LINE_FIELDS
+
 
 class AccountMoveLine(models.Model):
     _inherit = "account.move.line"
@@ -61,6 +63,59 @@ class AccountMoveLine(models.Model):
             ON account_move_line (account_id, partner_id)"""
             )
 
+    def _get_month_balance_model(self):
+        """Return the month balance model when the changes of posted journal
+        items have to be applied to it."""
+        month_balance_model = self.env["account.move.line.month.balance"]
+        if self.env.context.get("skip_month_balance"):
+            return None
+        if not month_balance_model._is_active():
+            return None
+        return month_balance_model.sudo()
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        month_balance_model = self._get_month_balance_model()
+        if month_balance_model is None:
+            return super().create(vals_list)
+        # The whole entries are removed from the month balances and added
+        # back: creating or writing journal items synchronizes the other
+        # items of their entries (taxes, payment terms), the nested hooks are
+        # skipped since these changes are covered here.
+        moves = self.env["account.move"].browse(
+            {vals["move_id"] for vals in vals_list if vals.get("move_id")}
+        )
+        month_balance_model._apply_moves(moves._get_posted_moves(), sign=-1)
+        lines = super(
+            AccountMoveLine, self.with_context(skip_month_balance=True)
+        ).create(vals_list)
+        month_balance_model._apply_moves(moves._get_posted_moves())
+        return lines.with_env(self.env)
+
+    def write(self, vals):
+        month_balance_model = self._get_month_balance_model()
+        if month_balance_model is None or not MONTH_BALANCE_LINE_FIELDS.intersection(
+            vals
+        ):
+            return super().write(vals)
+        moves = self.move_id
+        month_balance_model._apply_moves(moves._get_posted_moves(), sign=-1)
+        res = super(AccountMoveLine, self.with_context(skip_month_balance=True)).write(
+            vals
+        )
+        month_balance_model._apply_moves(moves._get_posted_moves())
+        return res
+
+    def unlink(self):
+        month_balance_model = self._get_month_balance_model()
+        if month_balance_model is None:
+            return super().unlink()
+        moves = self.move_id
+        month_balance_model._apply_moves(moves._get_posted_moves(), sign=-1)
+        res = super(AccountMoveLine, self.with_context(skip_month_balance=True)).unlink()
+        month_balance_model._apply_moves(moves.exists()._get_posted_moves())
+        return res
+
     @api.model
     def search_count(self, domain, limit=None):
         # In Big DataBase every time you change the domain widget this method
@@ -0,0 +1,295 @@
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html).
+
+from dateutil.relativedelta import relativedelta
+
+from odoo import api, fields, models
+from odoo.tools import SQL
+
+# Journal items fields that can be translated to a month balance field
+MONTH_BALANCE_FIELDS = {
+    "company_id": "company_id",
+    "account_id": "account_id",
+    "partner_id": "partner_id",
+    "journal_id": "journal_id",
+    "currency_id": "currency_id",
+    "account_type": "account_id.account_type",
+    "account_id.account_type": "account_id.account_type",
+}
+MONTH_BALANCE_STATE_FIELDS = ("move_id.state", "parent_state")
+MONTH_BALANCE_GROUPBY = ("company_id", "account_id", "partner_id", "currency_id")
+# Journal items fields stored in, or aggregated into, the month balances
+MONTH_BALANCE_LINE_FIELDS = {
+    "account_id",
+    "partner_id",
+    "debit",
+    "credit",
+    "balance",
+    "amount_currency",
+    "currency_id",
+    "date",
+    "journal_id",
+    "company_id",
+}
+# Journal entries fields changing the month balances of all their items
+MONTH_BALANCE_MOVE_FIELDS = {"state", "date", "journal_id", "company_id"}
+
+
+class AccountMoveLineMonthBalance(models.Model):
+    """Posted journal items balances aggregated by month.
+
+    The table is kept up to date when journal entries are posted or reset to
+    draft and when the journal items of posted entries are created, modified
+    or removed, so the reports can sum a few rows per month instead of scanning
+    every journal item. Only posted items are stored: draft items can still
+    change and are read from the journal items directly.
+    """
+
+    _name = "account.move.line.month.balance"
+    _description = "Journal Items Monthly Balance"
+    _order = "month, company_id, account_id"
+
+    month = fields.Date(required=True, readonly=True, index=True)
+    company_id = fields.Many2one("res.company", required=True, readonly=True)
+    account_id = fields.Many2one("account.account", required=True, readonly=True)
+    journal_id = fields.Many2one("account.journal", required=True, readonly=True)
+    partner_id = fields.Many2one("res.partner", readonly=True)
+    currency_id = fields.Many2one("res.currency", readonly=True)
+    debit = fields.Float(readonly=True)
+    credit = fields.Float(readonly=True)
+    balance = fields.Float(readonly=True)
+    amount_currency = fields.Float(readonly=True)
+    line_count = fields.Integer(readonly=True)
+
+    def init(self):
+        self._cr.execute(
+            """
+            CREATE UNIQUE INDEX IF NOT EXISTS
+                account_move_line_month_balance_key_uniq
+            ON account_move_line_month_balance (
+                company_id, account_id, journal_id, COALESCE(partner_id, 0),
+                COALESCE(currency_id, 0), month
+            )
+            """
+        )
+
+    @api.model
+    def _is_active(self):
+        return bool(
+            self.env["ir.config_parameter"]
+            .sudo()
+            .get_param("account_financial_report.use_month_balance")
+        )
+
+    @api.model
+    def _get_lines_aggregate_query(self, where, sign=1):
+        return SQL(
+            """
+            SELECT
+                date_trunc('month', aml.date)::date,
+                aml.company_id,
+                aml.account_id,
+                aml.journal_id,
+                aml.partner_id,
+                aml.currency_id,
+                %(sign)s * SUM(aml.debit),
+                %(sign)s * SUM(aml.credit),
+                %(sign)s * SUM(aml.balance),
+                %(sign)s * SUM(aml.amount_currency),
+                %(sign)s * COUNT(*)
+            FROM account_move_line aml
+            WHERE aml.account_id IS NOT NULL
+                AND aml.parent_state = 'posted'
+                AND %(where)s
+            GROUP BY 1, 2, 3, 4, 5, 6
+            """,
+            sign=sign,
+            where=where,
+        )
+
+    @api.model
+    def _apply_lines(self, where, sign=1):
+        """Add (sign=1) or remove (sign=-1) the posted journal items matching
+        the ``where`` SQL condition from the month balances."""
+        self.env.flush_all()
+        self.env.cr.execute(
+            SQL(
+                """
+                INSERT INTO account_move_line_month_balance AS mb (
+                    month, company_id, account_id, journal_id, partner_id,
+                    currency_id, debit, credit, balance, amount_currency,
+                    line_count, create_uid, create_date, write_uid, write_date
+                )
+                SELECT agg.*, %(uid)s, now() at time zone 'UTC',
+                    %(uid)s, now() at time zone 'UTC'
+                FROM (%(aggregate)s) agg
+                ON CONFLICT (
+                    company_id, account_id, journal_id, COALESCE(partner_id, 0),
+                    COALESCE(currency_id, 0), month
+                ) DO UPDATE SET
+                    debit = mb.debit + EXCLUDED.debit,
+                    credit = mb.credit + EXCLUDED.credit,
+                    balance = mb.balance + EXCLUDED.balance,
+                    amount_currency = mb.amount_currency + EXCLUDED.amount_currency,
+                    line_count = mb.line_count + EXCLUDED.line_count,
+                    write_uid = EXCLUDED.write_uid,
+                    write_date = EXCLUDED.write_date
+                """,
+                uid=self.env.uid,
+                aggregate=self._get_lines_aggregate_query(where, sign=sign),
+            )
+        )
+        self.env.cr.execute(
+            "DELETE FROM account_move_line_month_balance WHERE line_count = 0"
+        )
+        self.invalidate_model()
+
+    @api.model
+    def _apply_moves(self, moves, sign=1):
+        """Add (sign=1) or remove (sign=-1) the posted journal items of
+        ``moves`` from the month balances."""
+        if moves:
+            self._apply_lines(SQL("aml.move_id IN %s", tuple(moves.ids)), sign=sign)
+
+    @api.model
+    def _rebuild(self, companies=None):
+        """Recompute the month balances of ``companies`` (all by default) from
+        the journal items."""
+        companies = companies or self.env["res.company"].search([])
+        self.env.flush_all()
+        self.env.cr.execute(
+            SQL(
+                "DELETE FROM account_move_line_month_balance WHERE company_id IN %s",
+                tuple(companies.ids),
+            )
+        )
+        self.env.cr.execute(
+            SQL(
+                """
+                INSERT INTO account_move_line_month_balance (
+                    month, company_id, account_id, journal_id, partner_id,
+                    currency_id, debit, credit, balance, amount_currency,
+                    line_count, create_uid, create_date, write_uid, write_date
+                )
+                SELECT agg.*, %(uid)s, now() at time zone 'UTC',
+                    %(uid)s, now() at time zone 'UTC'
+                FROM (%(aggregate)s) agg
+                """,
+                uid=self.env.uid,
+                aggregate=self._get_lines_aggregate_query(
+                    SQL("aml.company_id IN %s", tuple(companies.ids))
+                ),
+            )
+        )
+        self.invalidate_model()
+
+    @api.model
+    def _cron_rebuild(self):
+        if self._is_active():
+            self._rebuild()
+
+    @api.model
+    def _split_domain(self, domain):
+        """Split a journal items domain into a month balance domain covering
+        the posted items of the complete months and a journal items domain
+        for the remaining items (partial months and non posted items).
+
+        Return ``None`` when the domain cannot be translated (OR operators,
+        unsupported fields or no complete month in the date range)."""
+        mb_domain = []
+        date_start = date_stop = None
+        for leaf in domain:
+            if not isinstance(leaf, tuple | list) or len(leaf) != 3:
+                return None
+            field_name, operator, value = leaf
+            if field_name == "date":
+                if operator in (">=", ">"):
+                    value = fields.Date.to_date(value)
+                    if operator == ">":
+                        value += relativedelta(days=1)
+                    date_start = max(date_start or value, value)
+                elif operator in ("<", "<="):
+                    value = fields.Date.to_date(value)
+                    if operator == "<=":
+                        value += relativedelta(days=1)
+                    date_stop = min(date_stop or value, value)
+                else:
+                    return None
+            elif field_name in MONTH_BALANCE_STATE_FIELDS:
+                states = [value] if isinstance(value, str) else value
+                if operator not in ("=", "in") or "posted" not in states:
+                    return None
+            elif field_name == "display_type" and operator == "not in":
+                # Notes and sections have no account, so they are never stored
+                continue
+            elif field_name in MONTH_BALANCE_FIELDS:
+                mb_domain.append((MONTH_BALANCE_FIELDS[field_name], operator, value))
+            else:
+                return None
+        # Only the complete months of the range are read from the balances
+        if date_start and date_start.day != 1:
+            date_start = date_start.replace(day=1) + relativedelta(months=1)
+        if date_stop:
+            date_stop = date_stop.replace(day=1)
+        if date_start and date_stop and date_start >= date_stop:
+            return None
+        remaining_domain = [
+            ("account_id", "=", False),
+            ("parent_state", "!=", "posted"),
+        ]
+        if date_start:
+            mb_domain.append(("month", ">=", date_start))
+            remaining_domain.append(("date", "<", date_start))
+        if date_stop:
+            mb_domain.append(("month", "<", date_stop))
+            remaining_domain.append(("date", ">=", date_stop))
+        remaining_domain = ["|"] * (len(remaining_domain) - 1) + remaining_domain
+        return mb_domain, list(domain) + remaining_domain
+
+    @api.model
+    def _read_group_balances(self, domain, groupby):
+        """Equivalent of ``account.move.line.read_group(domain, [debit, credit,
+        balance, amount_currency:sum], groupby, lazy=False)`` that reads the
+        complete months from the month balances. Return ``None`` when the
+        month balances cannot be used, the caller then keeps reading the
+        journal items."""
+        if not self._is_active() or set(groupby) - set(MONTH_BALANCE_GROUPBY):
+            return None
+        split_domain = self._split_domain(domain)
+        if split_domain is None:
+            return None
+        mb_domain, remaining_domain = split_domain
+        aggregates = [
+            "debit:sum",
+            "credit:sum",
+            "balance:sum",
+            "amount_currency:sum",
+        ]
+        res = {}
+        for model, model_domain, count_aggregate in (
+            (self, mb_domain, "line_count:sum"),
+            (self.env["account.move.line"], remaining_domain, "__count"),
+        ):
+            for row in model._read_group(
+                model_domain, groupby, aggregates + [count_aggregate]
+            ):
+                keys = row[: len(groupby)]
+                debit, credit, balance, amount_currency, count = row[len(groupby) :]
+                key = tuple(record.id for record in keys)
+                if key not in res:
+                    res[key] = {
+                        field_name: (record.id, record.display_name) if record else False
+                        for field_name, record in zip(groupby, keys, strict=True)
+                    }
+                    res[key].update(
+                        debit=0.0,
+                        credit=0.0,
+                        balance=0.0,
+                        amount_currency=0.0,
+                        __count=0,
+                    )
+                res[key]["debit"] += debit or 0.0
+                res[key]["credit"] += credit or 0.0
+                res[key]["balance"] += balance or 0.0
+                res[key]["amount_currency"] += amount_currency or 0.0
+                res[key]["__count"] += count or 0
+        return list(res.values())
@@ -11,15 +11,26 @@ class ResConfigSettings(models.TransientModel):
         "account.age.report.configuration",
         string="Intervals configuration",
     )
+    afr_use_month_balance = fields.Boolean(
+        string="Use monthly balances",
+        config_parameter="account_financial_report.use_month_balance",
+        help="Keep the balances of the posted journal items aggregated by month "
+        "so the Trial Balance and the General Ledger initial balances don't "
+        "need to read every journal item.",
+    )
 
     def set_values(self):
+        use_month_balance = self.env["account.move.line.month.balance"]._is_active()
         self.env["ir.default"].sudo().set(
             "aged.partner.balance.report.wizard",
             "age_partner_config_id",
             self.age_partner_config_id.id,
             company_id=self.env.company.id,
         )
-        return super().set_values()
+        res = super().set_values()
+        if self.afr_use_month_balance and not use_month_balance:
+            self.env["account.move.line.month.balance"].sudo()._rebuild()
+        return res
 
     @api.model
     def get_values(self):
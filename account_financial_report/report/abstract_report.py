@@ -122,6 +122,23 @@ class AgedPartnerBalanceReport(models.AbstractModel):
                 move_line["amount_currency"] = 0
         return move_lines
 
+    def _read_group_balances(self, domain, groupby):
+        """Sum debit, credit, balance and amount_currency of the journal items
+        matching ``domain`` grouped by ``groupby`` (``read_group`` format with
+        ``lazy=False``). The monthly balances are used when enabled and the
+        domain allows it."""
+        res = self.env["account.move.line.month.balance"]._read_group_balances(
+            domain, groupby
+        )
+        if res is None:
+            res = self.env["account.move.line"].read_group(
+                domain=domain,
+                fields=["debit", "credit", "balance", "amount_currency:sum"],
+                groupby=groupby,
+                lazy=False,
+            )
+        return res
+
     def _get_accounts_data(self, accounts_ids):
         accounts = self.env["account.account"].browse(accounts_ids)
         accounts_data = {}
@@ -2,8 +2,18 @@
 # Copyright 2016 Camptocamp SA
 # Copyright 2021 Tecnativa - João Marques
 # License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html).
+import logging
+import tempfile
+
 from odoo import models
 
+_logger = logging.getLogger(__name__)
+
+try:
+    import xlsxwriter
+except ImportError:
+    _logger.debug("Can not import xlsxwriter`.")
+
 
 class AbstractReportXslx(models.AbstractModel):
     _name = "report.account_financial_report.abstract_report_xlsx"
@@ -15,6 +25,39 @@ class AbstractReportXslx(models.AbstractModel):
         vals.update({"constant_memory": True})
         return vals
 
+    def create_xlsx_report(self, docids, data):
+        """Write the workbook to a temporary file instead of a memory buffer.
+        Combined with the ``constant_memory`` option, rows are flushed to disk
+        as they are written, so only the final file is loaded in memory."""
+        objs = self._get_objs_for_report(docids, data)
+        with tempfile.TemporaryFile() as file_data:
+            self._write_xlsx_file(file_data, data, objs)
+            return file_data.read(), "xlsx"
+
+    def _write_xlsx_file(self, file_data, data, objs):
+        workbook = xlsxwriter.Workbook(file_data, self.get_workbook_options())
+        self.generate_xlsx_report(workbook, data, objs)
+        workbook.close()
+        file_data.seek(0)
+
+    def _create_xlsx_attachment(self, docids, data, name, res_model=False, res_id=0):
+        """Generate the report into an attachment and return it. The report
+        file goes from the temporary file to the attachment storage without
+        being kept in the report data."""
+        objs = self._get_objs_for_report(docids, data)
+        with tempfile.TemporaryFile() as file_data:
+            self._write_xlsx_file(file_data, data, objs)
+            return self.env["ir.attachment"].create(
+                {
+                    "name": name,
+                    "raw": file_data.read(),
+                    "mimetype": "application/vnd.openxmlformats-officedocument"
+                    ".spreadsheetml.sheet",
+                    "res_model": res_model,
+                    "res_id": res_id,
+                }
+            )
+
     def generate_xlsx_report(self, workbook, data, objects):
         # Initialize report variables
         report_data = {
@@ -23,6 +66,7 @@ class AbstractReportXslx(models.AbstractModel):
             "columns": None,  # columns of the report
             "row_pos": None,  # row_pos must be incremented at each writing lines
             "formats": None,
+            "columns_plan": None,  # (position, field, type) of each column
         }
         self._define_formats(workbook, report_data)
         # Get report data
@@ -30,6 +74,10 @@ class AbstractReportXslx(models.AbstractModel):
         report_footer = self._get_report_footer()
         filters = self._get_report_filters(objects)
         report_data["columns"] = self._get_report_columns(objects)
+        report_data["columns_plan"] = [
+            (col_pos, column["field"], column.get("type", "string"))
+            for col_pos, column in report_data["columns"].items()
+        ]
         report_data["workbook"] = workbook
         report_data["sheet"] = workbook.add_worksheet(report_name[:31])
         self._set_column_width(report_data)
@@ -235,16 +283,15 @@ class AbstractReportXslx(models.AbstractModel):
 
     def write_line_from_dict(self, line_dict, report_data):
         """Write a line on current line"""
-        for col_pos, column in report_data["columns"].items():
-            value = line_dict.get(column["field"], False)
-            cell_type = column.get("type", "string")
+        sheet = report_data["sheet"]
+        formats = report_data["formats"]
+        row_pos = report_data["row_pos"]
+        for col_pos, field_name, cell_type in report_data["columns_plan"]:
+            value = line_dict.get(field_name, False)
             if cell_type == "string":
                 if line_dict.get("type", "") == "group_type":
-                    report_data["sheet"].write_string(
-                        report_data["row_pos"],
-                        col_pos,
-                        value or "",
-                        report_data["formats"]["format_bold"],
+                    sheet.write_string(
+                        row_pos, col_pos, value or "", formats["format_bold"]
                     )
                 else:
                     if (
@@ -253,39 +300,33 @@ class AbstractReportXslx(models.AbstractModel):
                         and not isinstance(value, int)
                     ):
                         value = value and value.strftime("%d/%m/%Y")
-                    report_data["sheet"].write_string(
-                        report_data["row_pos"], col_pos, value or ""
-                    )
+                    sheet.write_string(row_pos, col_pos, value or "")
             elif cell_type == "amount":
-                if (
-                    line_dict.get("account_group_id", False)
-                    and line_dict["account_group_id"]
-                ):
-                    cell_format = report_data["formats"]["format_amount_bold"]
+                if line_dict.get("account_group_id", False):
+                    cell_format = formats["format_amount_bold"]
                 else:
-                    cell_format = report_data["formats"]["format_amount"]
-                report_data["sheet"].write_number(
-                    report_data["row_pos"], col_pos, float(value), cell_format
-                )
+                    cell_format = formats["format_amount"]
+                sheet.write_number(row_pos, col_pos, float(value), cell_format)
             elif cell_type == "amount_currency":
                 if line_dict.get("currency_name", False):
                     format_amt = self._get_currency_amt_format_dict(
                         line_dict, report_data
                     )
-                    report_data["sheet"].write_number(
-                        report_data["row_pos"], col_pos, float(value), format_amt
-                    )
+                    sheet.write_number(row_pos, col_pos, float(value), format_amt)
             elif cell_type == "currency_name":
-                report_data["sheet"].write_string(
-                    report_data["row_pos"],
-                    col_pos,
-                    value or "",
-                    report_data["formats"]["format_right"],
+                sheet.write_string(
+                    row_pos, col_pos, value or "", formats["format_right"]
                 )
             else:
                 self.write_non_standard_column(cell_type, col_pos, value)
         report_data["row_pos"] += 1
 
+    def write_lines_from_dict(self, lines, report_data):
+        """Write the lines of an iterable (usually a generator fed by the
+        report engine) starting on current line."""
+        for line_dict in lines:
+            self.write_line_from_dict(line_dict, report_data)
+
     def write_initial_balance(self, my_object, label, report_data):
         """Write a specific initial balance line on current line
         using defined columns field_initial_balance name.
@@ -523,6 +564,26 @@ class AbstractReportXslx(models.AbstractModel):
                     )
         report_data["row_pos"] += 1
 
+    def _get_currency_format(self, report_data, prefix, currency):
+        """Return the ``prefix`` format with the number format of ``currency``.
+        Formats are created once per report and currency and then reused."""
+        formats = report_data["formats"]
+        format_name = f"{prefix}_{currency.name}"
+        if format_name not in formats:
+            if prefix == "format_header_amount":
+                cell_format = report_data["workbook"].add_format(
+                    {"bold": True, "border": True, "bg_color": "#FFFFCC"}
+                )
+                num_format = "#,##0." + ("0" * currency.decimal_places)
+            else:
+                cell_format = report_data["workbook"].add_format(
+                    {"bold": True} if prefix == "format_amount_bold" else {}
+                )
+                num_format = self._report_xlsx_currency_format(currency)
+            cell_format.set_num_format(num_format)
+            formats[format_name] = cell_format
+        return formats[format_name]
+
     def _get_currency_amt_format(self, line_object, report_data):
         """Return amount format specific for each currency."""
         if "account_group_id" in line_object and line_object["account_group_id"]:
@@ -536,13 +597,7 @@ class AbstractReportXslx(models.AbstractModel):
                 currency = self.env["res.currency"].browse(line_object["currency_id"])
             else:
                 currency = line_object["currency_id"]
-            field_name = f"{field_prefix}_{currency.name}"
-            if hasattr(self, field_name):
-                format_amt = getattr(self, field_name)
-            else:
-                format_amt = report_data["workbook"].add_format()
-                report_data["field_name"] = format_amt
-                format_amt.set_num_format(self._report_xlsx_currency_format(currency))
+            format_amt = self._get_currency_format(report_data, field_prefix, currency)
         return format_amt
 
     def _get_currency_amt_format_dict(self, line_dict, report_data):
@@ -558,48 +613,26 @@ class AbstractReportXslx(models.AbstractModel):
                 currency = self.env["res.currency"].browse(line_dict["currency_id"])
             else:
                 currency = line_dict["currency_id"]
-            field_name = f"{field_prefix}_{currency.name}"
-            if hasattr(self, field_name):
-                format_amt = getattr(self, field_name)
-            else:
-                format_amt = report_data["workbook"].add_format()
-                report_data["field_name"] = format_amt
-                format_amt.set_num_format(self._report_xlsx_currency_format(currency))
+            format_amt = self._get_currency_format(report_data, field_prefix, currency)
         return format_amt
 
     def _get_currency_amt_header_format(self, line_object, report_data):
         """Return amount header format for each currency."""
         format_amt = report_data["formats"]["format_header_amount"]
         if line_object.currency_id:
-            field_name = f"format_header_amount_{line_object.currency_id.name}"
-            if hasattr(self, field_name):
-                format_amt = getattr(self, field_name)
-            else:
-                format_amt = report_data["workbook"].add_format(
-                    {"bold": True, "border": True, "bg_color": "#FFFFCC"}
-                )
-                report_data["field_name"] = format_amt
-                format_amount = "#,##0." + (
-                    "0" * line_object.currency_id.decimal_places
-                )
-                format_amt.set_num_format(format_amount)
+            format_amt = self._get_currency_format(
+                report_data, "format_header_amount", line_object.currency_id
+            )
         return format_amt
 
     def _get_currency_amt_header_format_dict(self, line_object, report_data):
         """Return amount header format for each currency."""
         format_amt = report_data["formats"]["format_header_amount"]
         if line_object["currency_id"]:
-            field_name = f"format_header_amount_{line_object['currency_name']}"
-            if hasattr(self, field_name):
-                format_amt = getattr(self, field_name)
-            else:
-                format_amt = report_data["workbook"].add_format(
-                    {"bold": True, "border": True, "bg_color": "#FFFFCC"}
-                )
-                report_data["field_name"] = format_amt
-                currency = self.env["res.currency"].browse(line_object["currency_id"])
-                format_amount = "#,##0." + ("0" * currency.decimal_places)
-                format_amt.set_num_format(format_amount)
+            currency = self.env["res.currency"].browse(line_object["currency_id"])
+            format_amt = self._get_currency_format(
+                report_data, "format_header_amount", currency
+            )
         return format_amt
 
     def _generate_report_content(self, workbook, report, data, report_data):
@@ -3,11 +3,18 @@
 # License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html).
 
 import operator
-from datetime import date, datetime, timedelta
+from bisect import bisect_left
+from collections import defaultdict
+from datetime import date, datetime
 
 from odoo import api, models
 from odoo.tools import float_is_zero
 
+# Fixed age intervals, a line overdue by N days goes to the first interval
+# whose limit is >= N (lines not due yet have N <= 0)
+AGE_BUCKET_LIMITS = [0, 30, 60, 90, 120]
+AGE_BUCKETS = ["current", "30_days", "60_days", "90_days", "120_days", "older"]
+
 
 class AgedPartnerBalanceReport(models.AbstractModel):
     _name = "report.account_financial_report.aged_partner_balance"
@@ -49,45 +56,10 @@ class AgedPartnerBalanceReport(models.AbstractModel):
     def _calculate_amounts(
         self, ag_pb_data, acc_id, prt_id, residual, due_date, date_at_object
     ):
-        ag_pb_data[acc_id]["residual"] += residual
-        ag_pb_data[acc_id][prt_id]["residual"] += residual
-        interval_lines = self.env.context["age_partner_config"].line_ids
-        today = date_at_object
-        if not due_date or today <= due_date:
-            ag_pb_data[acc_id]["current"] += residual
-            ag_pb_data[acc_id][prt_id]["current"] += residual
-            due_date = today
-        elif today <= due_date + timedelta(days=30):
-            ag_pb_data[acc_id]["30_days"] += residual
-            ag_pb_data[acc_id][prt_id]["30_days"] += residual
-        elif today <= due_date + timedelta(days=60):
-            ag_pb_data[acc_id]["60_days"] += residual
-            ag_pb_data[acc_id][prt_id]["60_days"] += residual
-        elif today <= due_date + timedelta(days=90):
-            ag_pb_data[acc_id]["90_days"] += residual
-            ag_pb_data[acc_id][prt_id]["90_days"] += residual
-        elif today <= due_date + timedelta(days=120):
-            ag_pb_data[acc_id]["120_days"] += residual
-            ag_pb_data[acc_id][prt_id]["120_days"] += residual
-        else:
-            ag_pb_data[acc_id]["older"] += residual
-            ag_pb_data[acc_id][prt_id]["older"] += residual
-
-        days_difference = abs((today - due_date).days)
-        for index, line in enumerate(interval_lines):
-            lower_limit = 0 if not index else interval_lines[index - 1].inferior_limit
-            next_line = interval_lines[index] if index < len(interval_lines) else None
-            interval_range = self._get_values_for_range_intervals(
-                lower_limit, next_line.inferior_limit
-            )
-            if (
-                days_difference in interval_range
-                or days_difference == line.inferior_limit
-            ):
-                ag_pb_data[acc_id][line] += residual
-                ag_pb_data[acc_id][prt_id][line] += residual
-                break
-        return ag_pb_data
+        days = (date_at_object - due_date).days if due_date else 0
+        return self._compute_aged_amounts(
+            ag_pb_data, [(acc_id, prt_id)], [residual], [days]
+        )
 
     def _get_values_for_range_intervals(self, num1, num2):
         min_num = min(num1, num2)
@@ -96,6 +68,71 @@ class AgedPartnerBalanceReport(models.AbstractModel):
             return [max_num]
         return list(range(min_num + 1, max_num))
 
+    @api.model
+    def _get_age_bucket(self, days):
+        """Return the fixed interval key of a line overdue by ``days`` days."""
+        return AGE_BUCKETS[bisect_left(AGE_BUCKET_LIMITS, days)]
+
+    @api.model
+    def _get_interval_line_getter(self):
+        """Return a function mapping the days overdue of a line (0 when it is
+        not due yet) to its configured interval line, or ``None``. Results
+        are cached per number of days, as there are far fewer distinct ages
+        than lines."""
+        interval_lines = self.env.context["age_partner_config"].line_ids
+        bounds = []
+        for index, line in enumerate(interval_lines):
+            lower_limit = 0 if not index else interval_lines[index - 1].inferior_limit
+            bounds.append(
+                (
+                    min(lower_limit, line.inferior_limit),
+                    max(lower_limit, line.inferior_limit),
+                    line,
+                )
+            )
+        cache = {}
+
+        def get_interval_line(days):
+            if days not in cache:
+                cache[days] = None
+                for min_num, max_num, line in bounds:
+                    if max_num - min_num == 1:
+                        in_range = days == max_num
+                    else:
+                        in_range = min_num < days < max_num
+                    if in_range or days == line.inferior_limit:
+                        cache[days] = line
+                        break
+            return cache[days]
+
+        return get_interval_line
+
+    @api.model
+    def _compute_aged_amounts(self, ag_pb_data, keys, residuals, days_overdue):
+        """Add the residuals to their age intervals in ``ag_pb_data``.
+        ``keys`` holds the (account, partner) of each line, ``days_overdue``
+        the days between its maturity date and the report date (0 or
+        negative when not due yet). Amounts are first reduced per key, so
+        ``ag_pb_data`` is only updated once per account and partner."""
+        get_interval_line = self._get_interval_line_getter()
+        totals = defaultdict(lambda: defaultdict(float))
+        for key, residual, days in zip(keys, residuals, days_overdue, strict=True):
+            key_totals = totals[key]
+            key_totals["residual"] += residual
+            key_totals[self._get_age_bucket(days)] += residual
+            interval_line = get_interval_line(max(days, 0))
+            if interval_line:
+                key_totals[interval_line] += residual
+        for (acc_id, prt_id), key_totals in totals.items():
+            if acc_id not in ag_pb_data:
+                self._initialize_account(ag_pb_data, acc_id)
+            if prt_id not in ag_pb_data[acc_id]:
+                self._initialize_partner(ag_pb_data, acc_id, prt_id)
+            for bucket, amount in key_totals.items():
+                ag_pb_data[acc_id][bucket] += amount
+                ag_pb_data[acc_id][prt_id][bucket] += amount
+        return ag_pb_data
+
     def _get_account_partial_reconciled(self, company_id, date_at_object):
         domain = [("max_date", ">", date_at_object), ("company_id", "=", company_id)]
         fields = [
@@ -157,7 +194,6 @@ class AgedPartnerBalanceReport(models.AbstractModel):
         line_model = self.env["account.move.line"]
         move_lines = line_model.search_read(domain=domain, fields=ml_fields)
         journals_ids = set()
-        partners_ids = set()
         partners_data = {}
         ag_pb_data = {}
         if date_at_object < date.today():
@@ -196,24 +232,34 @@ class AgedPartnerBalanceReport(models.AbstractModel):
             if move_line["date"] <= date_at_object
             and not float_is_zero(move_line["amount_residual"], precision_digits=2)
         ]
+        # Columnar pass: keys, residuals and ages are computed once per line
+        # and reduced by (account, partner) before updating ag_pb_data.
+        keys = []
+        residuals = []
+        days_overdue = []
         for move_line in move_lines:
             journals_ids.add(move_line["journal_id"][0])
-            acc_id = move_line["account_id"][0]
             if move_line["partner_id"]:
-                prt_id = move_line["partner_id"][0]
-                prt_name = move_line["partner_id"][1]
+                prt_id, prt_name = move_line["partner_id"]
             else:
-                prt_id = 0
-                prt_name = ""
-            if prt_id not in partners_ids:
-                partners_data.update({prt_id: {"id": prt_id, "name": prt_name}})
-                partners_ids.add(prt_id)
-            if acc_id not in ag_pb_data.keys():
-                ag_pb_data = self._initialize_account(ag_pb_data, acc_id)
-            if prt_id not in ag_pb_data[acc_id]:
-                ag_pb_data = self._initialize_partner(ag_pb_data, acc_id, prt_id)
-            move_line_data = {}
-            if show_move_line_details:
+                prt_id, prt_name = 0, ""
+            if prt_id not in partners_data:
+                partners_data[prt_id] = {"id": prt_id, "name": prt_name}
+            keys.append((move_line["account_id"][0], prt_id))
+            residuals.append(move_line["amount_residual"])
+            days_overdue.append(
+                (date_at_object - move_line["date_maturity"]).days
+                if move_line["date_maturity"]
+                else 0
+            )
+        self._compute_aged_amounts(ag_pb_data, keys, residuals, days_overdue)
+        if show_move_line_details:
+            line_recs = line_model.browse(
+                [move_line["id"] for move_line in move_lines]
+            )
+            for (acc_id, prt_id), move_line, line_rec in zip(
+                keys, move_lines, line_recs, strict=True
+            ):
                 if move_line["ref"] == move_line["name"]:
                     if move_line["ref"]:
                         ref_label = move_line["ref"]
@@ -225,81 +271,36 @@ class AgedPartnerBalanceReport(models.AbstractModel):
                     ref_label = move_line["ref"]
                 else:
                     ref_label = move_line["ref"] + " - " + move_line["name"]
-                move_line_data.update(
+                ag_pb_data[acc_id][prt_id]["move_lines"].append(
                     {
-                        "line_rec": line_model.browse(move_line["id"]),
+                        "line_rec": line_rec,
                         "date": move_line["date"],
                         "entry": move_line["move_id"][1],
                         "jnl_id": move_line["journal_id"][0],
                         "acc_id": acc_id,
-                        "partner": prt_name,
+                        "partner": partners_data[prt_id]["name"],
                         "ref_label": ref_label,
                         "due_date": move_line["date_maturity"],
                         "residual": move_line["amount_residual"],
                     }
                 )
-                ag_pb_data[acc_id][prt_id]["move_lines"].append(move_line_data)
-            ag_pb_data = self._calculate_amounts(
-                ag_pb_data,
-                acc_id,
-                prt_id,
-                move_line["amount_residual"],
-                move_line["date_maturity"],
-                date_at_object,
-            )
         journals_data = self._get_journals_data(list(journals_ids))
         accounts_data = self._get_accounts_data(ag_pb_data.keys())
         return ag_pb_data, accounts_data, partners_data, journals_data
 
     @api.model
-    def _compute_maturity_date(self, ml, date_at_object):
-        ml.update(
-            {
-                "current": 0.0,
-                "30_days": 0.0,
-                "60_days": 0.0,
-                "90_days": 0.0,
-                "120_days": 0.0,
-                "older": 0.0,
-            }
-        )
+    def _compute_maturity_date(self, ml, date_at_object, get_interval_line=None):
+        ml.update(dict.fromkeys(AGE_BUCKETS, 0.0))
         interval_lines = self.env.context["age_partner_config"].line_ids
         for interval_line in interval_lines:
             ml[interval_line] = 0.0
         due_date = ml["due_date"]
-        amount = ml["residual"]
-        today = date_at_object
-        if not due_date or today <= due_date:
-            ml["current"] += amount
-            due_date = today
-        elif today <= due_date + timedelta(days=30):
-            ml["30_days"] += amount
-        elif today <= due_date + timedelta(days=60):
-            ml["60_days"] += amount
-        elif today <= due_date + timedelta(days=90):
-            ml["90_days"] += amount
-        elif today <= due_date + timedelta(days=120):
-            ml["120_days"] += amount
-        else:
-            ml["older"] += amount
-        if due_date:
-            days_difference = abs((today - due_date).days)
-            for index, interval_line in enumerate(interval_lines):
-                lower_limit = (
-                    0 if not index else interval_lines[index - 1].inferior_limit
-                )
-                next_line = (
-                    interval_lines[index] if index < len(interval_lines) else None
-                )
-                interval_range = self._get_values_for_range_intervals(
-                    lower_limit, next_line.inferior_limit
-                )
-                if (
-                    days_difference in interval_range
-                    or days_difference == interval_line.inferior_limit
-                ):
-                    ml[interval_line] += amount
-                    break
+        days = (date_at_object - due_date).days if due_date else 0
+        ml[self._get_age_bucket(days)] += ml["residual"]
+        get_interval_line = get_interval_line or self._get_interval_line_getter()
+        interval_line = get_interval_line(max(days, 0))
+        if interval_line:
+            ml[interval_line] += ml["residual"]
 
     def _create_account_list(
         self,
@@ -312,6 +313,7 @@ class AgedPartnerBalanceReport(models.AbstractModel):
     ):
         aged_partner_data = []
         interval_lines = self.env.context["age_partner_config"].line_ids
+        get_interval_line = self._get_interval_line_getter()
         for account in accounts_data.values():
             acc_id = account["id"]
             account.update(
@@ -353,7 +355,9 @@ class AgedPartnerBalanceReport(models.AbstractModel):
                                     "account": accounts_data[ml["acc_id"]]["code"],
                                 }
                             )
-                            self._compute_maturity_date(ml, date_at_oject)
+                            self._compute_maturity_date(
+                                ml, date_at_oject, get_interval_line
+                            )
                             move_lines.append(ml)
                         move_lines = sorted(move_lines, key=lambda k: (k["date"]))
                         partner.update({"move_lines": move_lines})
@@ -6,9 +6,13 @@
 import calendar
 import datetime
 import operator
+import uuid
 
 from odoo import _, api, models
-from odoo.tools import float_is_zero
+from odoo.tools import SQL, float_is_zero
+
+# Number of move lines read at once by the streaming mode
+STREAM_CHUNK_SIZE = 2000
 
 
 class GeneralLedgerReport(models.AbstractModel):
@@ -106,16 +110,8 @@ class GeneralLedgerReport(models.AbstractModel):
         return domain
 
     def _get_accounts_initial_balance(self, initial_domain_bs, initial_domain_pl):
-        gl_initial_acc_bs = self.env["account.move.line"].read_group(
-            domain=initial_domain_bs,
-            fields=["account_id", "debit", "credit", "balance", "amount_currency:sum"],
-            groupby=["account_id"],
-        )
-        gl_initial_acc_pl = self.env["account.move.line"].read_group(
-            domain=initial_domain_pl,
-            fields=["account_id", "debit", "credit", "balance", "amount_currency:sum"],
-            groupby=["account_id"],
-        )
+        gl_initial_acc_bs = self._read_group_balances(initial_domain_bs, ["account_id"])
+        gl_initial_acc_pl = self._read_group_balances(initial_domain_pl, ["account_id"])
         gl_initial_acc = gl_initial_acc_bs + gl_initial_acc_pl
         return gl_initial_acc
 
@@ -141,11 +137,7 @@ class GeneralLedgerReport(models.AbstractModel):
         domain = self._get_initial_balance_fy_pl_ml_domain(
             account_ids, company_id, fy_start_date, base_domain
         )
-        initial_balances = self.env["account.move.line"].read_group(
-            domain=domain,
-            fields=["account_id", "debit", "credit", "balance", "amount_currency:sum"],
-            groupby=["account_id"],
-        )
+        initial_balances = self._read_group_balances(domain, ["account_id"])
         pl_initial_balance = {
             "debit": 0.0,
             "credit": 0.0,
@@ -198,18 +190,8 @@ class GeneralLedgerReport(models.AbstractModel):
         return getattr(self, method)(data, domain, grouped_by)
 
     def _prepare_gen_ld_data_group_partners(self, data, domain, grouped_by):
-        gl_initial_acc_prt = self.env["account.move.line"].read_group(
-            domain=domain,
-            fields=[
-                "account_id",
-                "partner_id",
-                "debit",
-                "credit",
-                "balance",
-                "amount_currency:sum",
-            ],
-            groupby=["account_id", "partner_id"],
-            lazy=False,
+        gl_initial_acc_prt = self._read_group_balances(
+            domain, ["account_id", "partner_id"]
         )
         if gl_initial_acc_prt:
             for gl in gl_initial_acc_prt:
@@ -759,8 +741,426 @@ class GeneralLedgerReport(models.AbstractModel):
             list_centralized_ml += list(centralized_ml[jnl_id].values())
         return list_centralized_ml
 
+    def _get_stream_chunk_size(self):
+        return int(
+            self.env["ir.config_parameter"]
+            .sudo()
+            .get_param("account_financial_report.stream_chunk_size", STREAM_CHUNK_SIZE)
+        )
+
+    def _iter_move_line_chunks(self, domain, order="date, move_name, id"):
+        """Yield the move lines matching ``domain`` as lists of dicts (same
+        format as ``search_read``) of at most ``_get_stream_chunk_size`` lines.
+        The ids are read through a server-side (named) cursor, so only one
+        chunk is held in memory at a time."""
+        aml_model = self.env["account.move.line"]
+        query = aml_model._search(domain, order=order)
+        sql = query.select(SQL.identifier(aml_model._table, "id"))
+        self.env.flush_query(sql)
+        chunk_size = self._get_stream_chunk_size()
+        ml_fields = self._get_ml_fields()
+        cursor_name = f"afr_gl_stream_{uuid.uuid4().hex}"
+        with self.env.cr._cnx.cursor(cursor_name) as stream_cr:
+            stream_cr.itersize = chunk_size
+            stream_cr.execute(sql.code, sql.params)
+            while True:
+                rows = stream_cr.fetchmany(chunk_size)
+                if not rows:
+                    break
+                move_lines = aml_model.browse([row[0] for row in rows])
+                yield move_lines.read(ml_fields)
+                move_lines.invalidate_recordset()
+
+    def _get_period_totals(self, domain, grouped_by, company_currency_id):
+        """Compute the period debit/credit/balance of each account (and each
+        partner when grouped by partners) with a single grouped query, so
+        the final balances are known before any move line is read."""
+        groupby = ["account_id", "currency_id"]
+        if grouped_by == "partners":
+            groupby.insert(1, "partner_id")
+        groups = self.env["account.move.line"].read_group(
+            domain=domain,
+            fields=["debit", "credit", "balance", "amount_currency:sum"],
+            groupby=groupby,
+            lazy=False,
+        )
+        totals = {}
+        for group in groups:
+            acc_id = group["account_id"][0]
+            targets = [totals.setdefault(acc_id, self._initialize_period_totals())]
+            if grouped_by == "partners":
+                prt_id = group["partner_id"][0] if group["partner_id"] else 0
+                targets.append(
+                    targets[0]["items"].setdefault(
+                        prt_id, self._initialize_period_totals()
+                    )
+                )
+            currency_id = group["currency_id"][0] if group["currency_id"] else False
+            for target in targets:
+                target["count"] += group["__count"]
+                target["debit"] += group["debit"]
+                target["credit"] += group["credit"]
+                target["balance"] += group["balance"]
+                target["bal_curr"] += group["amount_currency"]
+                if currency_id and currency_id != company_currency_id:
+                    target["foreign_bal_curr"] += group["amount_currency"]
+                    target["foreign_currency_ids"].add(currency_id)
+        return totals
+
+    def _initialize_period_totals(self):
+        return {
+            "count": 0,
+            "debit": 0.0,
+            "credit": 0.0,
+            "balance": 0.0,
+            "bal_curr": 0.0,
+            "foreign_bal_curr": 0.0,
+            "foreign_currency_ids": set(),
+            "items": {},
+        }
+
+    def _get_stream_balances(self, init_data, totals, foreign_currency):
+        init_bal = dict(init_data["init_bal"])
+        fin_bal = dict(init_data["init_bal"])
+        for field_name in ["debit", "credit", "balance"]:
+            fin_bal[field_name] += totals[field_name]
+        if foreign_currency:
+            init_bal.setdefault("bal_curr", 0.0)
+            fin_bal["bal_curr"] = fin_bal.get("bal_curr", 0.0) + totals["bal_curr"]
+        return init_bal, fin_bal
+
+    def _iter_stream_move_lines(self, domain, init_balance, date_to, shared_data):
+        """Yield the prepared move lines of one account (or one group of an
+        account) with their cumulative balance, filling the journals, taxes,
+        analytic and reconciliation dicts shared with the report writers as
+        new ids show up."""
+        cumul_balance = init_balance
+        for move_lines in self._iter_move_line_chunks(domain):
+            self._update_stream_shared_data(move_lines, shared_data)
+            rec_ids = {
+                ml["full_reconcile_id"][0]
+                for ml in move_lines
+                if ml["full_reconcile_id"]
+            }
+            rec_after_date_to_ids = set(
+                self._get_reconciled_after_date_to_ids(rec_ids, date_to)
+                if rec_ids
+                else []
+            )
+            for move_line in move_lines:
+                line = self._get_move_line_data(move_line)
+                cumul_balance += line["balance"]
+                line["balance"] = cumul_balance
+                if line["rec_id"] in rec_after_date_to_ids:
+                    line["rec_name"] = "(" + _("future") + ") " + line["rec_name"]
+                yield line
+
+    def _update_stream_shared_data(self, move_lines, shared_data):
+        journal_ids = set()
+        taxes_ids = set()
+        analytic_ids = set()
+        for move_line in move_lines:
+            journal_ids.add(move_line["journal_id"][0])
+            taxes_ids.update(move_line["tax_ids"])
+            for analytic_account in move_line["analytic_distribution"] or {}:
+                for analytic_account_id in analytic_account.split(","):
+                    analytic_ids.add(int(analytic_account_id))
+            if move_line["full_reconcile_id"]:
+                rec_id = move_line["full_reconcile_id"][0]
+                shared_data["full_reconcile_data"].setdefault(
+                    rec_id, {"id": rec_id, "name": move_line["matching_number"]}
+                )
+        journal_ids -= set(shared_data["journals_data"])
+        taxes_ids -= set(shared_data["taxes_data"])
+        analytic_ids -= set(shared_data["analytic_data"])
+        if journal_ids:
+            shared_data["journals_data"].update(
+                self._get_journals_data(list(journal_ids))
+            )
+        if taxes_ids:
+            shared_data["taxes_data"].update(self._get_taxes_data(list(taxes_ids)))
+        if analytic_ids:
+            shared_data["analytic_data"].update(
+                self._get_analytic_data(list(analytic_ids))
+            )
+
+    def _get_stream_centralized_ml(self, domain, init_balance, date_to):
+        if isinstance(date_to, str):
+            date_to = datetime.datetime.strptime(date_to, "%Y-%m-%d").date()
+        groups = self.env["account.move.line"]._read_group(
+            domain,
+            groupby=["journal_id", "date:month"],
+            aggregates=["debit:sum", "credit:sum", "amount_currency:sum"],
+            order="date:month",
+        )
+        centralized_ml = {}
+        for journal, month_date, debit, credit, amount_currency in groups:
+            centralized_ml = self._calculate_centralization(
+                centralized_ml,
+                {
+                    "journal_id": journal.id,
+                    "date": month_date,
+                    "debit": debit,
+                    "credit": credit,
+                    "bal_curr": amount_currency,
+                },
+                date_to,
+            )
+        list_centralized_ml = []
+        for jnl_id in centralized_ml.keys():
+            list_centralized_ml += list(centralized_ml[jnl_id].values())
+        return self._recalculate_cumul_balance(list_centralized_ml, init_balance, [])
+
+    def _iter_general_ledger(
+        self,
+        gen_ld_data,
+        period_totals,
+        accounts_data,
+        period_domain,
+        data,
+        shared_data,
+    ):
+        """Yield the general ledger accounts ordered by code. Balances come
+        from the aggregated data, and ``move_lines`` are generators that
+        stream the account lines from the database when iterated."""
+        grouped_by = data["grouped_by"]
+        foreign_currency = data["foreign_currency"]
+        hide_account_at_0 = data["hide_account_at_0"]
+        date_to = data["date_to"]
+        company = self.env["res.company"].browse(data["company_id"])
+        rounding = company.currency_id.rounding
+        acc_prt_account_ids = set(
+            self._get_acc_prt_accounts_ids(data["company_id"], grouped_by)
+        )
+        accounts = sorted(accounts_data.values(), key=lambda k: k["code"])
+        for account_data in accounts:
+            acc_id = account_data["id"]
+            init_data = gen_ld_data.get(acc_id) or self._initialize_data(
+                foreign_currency
+            )
+            totals = period_totals.get(acc_id) or self._initialize_period_totals()
+            if (
+                hide_account_at_0
+                and not totals["count"]
+                and float_is_zero(
+                    init_data["init_bal"]["balance"], precision_rounding=rounding
+                )
+            ):
+                continue
+            init_bal, fin_bal = self._get_stream_balances(
+                init_data, totals, foreign_currency
+            )
+            account = {
+                "id": acc_id,
+                "code": account_data["code"],
+                "name": account_data["name"],
+                "type": "account",
+                "currency_id": account_data["currency_id"],
+                "centralized": account_data["centralized"],
+                "grouped_by": grouped_by,
+                "init_bal": init_bal,
+                "fin_bal": fin_bal,
+                grouped_by: False,
+            }
+            account_domain = period_domain + [("account_id", "=", acc_id)]
+            centralized = data["centralize"] and account_data["centralized"]
+            grouped = (
+                not centralized
+                and grouped_by == "partners"
+                and acc_id in acc_prt_account_ids
+            )
+            groups = []
+            if grouped:
+                groups = self._get_stream_groups(init_data, totals)
+                account[grouped_by] = bool(groups)
+            if centralized:
+                account["move_lines"] = self._get_stream_centralized_ml(
+                    account_domain, init_bal["balance"], date_to
+                )
+            elif account[grouped_by]:
+                list_grouped = []
+                for group_item in groups:
+                    group_totals = totals["items"].get(group_item["id"])
+                    if (
+                        hide_account_at_0
+                        and not group_totals
+                        and float_is_zero(
+                            group_item["init_bal"]["balance"],
+                            precision_rounding=rounding,
+                        )
+                    ):
+                        continue
+                    group_totals = group_totals or self._initialize_period_totals()
+                    (
+                        group_item["init_bal"],
+                        group_item["fin_bal"],
+                    ) = self._get_stream_balances(
+                        group_item, group_totals, foreign_currency
+                    )
+                    group_domain = account_domain + [
+                        ("partner_id", "=", group_item["id"] or False)
+                    ]
+                    group_item["move_lines"] = (
+                        self._iter_stream_move_lines(
+                            group_domain,
+                            group_item["init_bal"]["balance"],
+                            date_to,
+                            shared_data,
+                        )
+                        if group_totals["count"]
+                        else []
+                    )
+                    list_grouped.append(group_item)
+                account["list_grouped"] = list_grouped
+            else:
+                account["move_lines"] = (
+                    self._iter_stream_move_lines(
+                        account_domain,
+                        init_bal["balance"],
+                        date_to,
+                        shared_data,
+                    )
+                    if totals["count"]
+                    else []
+                )
+            self._set_stream_fin_bal_currency(
+                account, totals, company, foreign_currency, centralized
+            )
+            yield account
+
+    def _get_stream_groups(self, init_data, totals):
+        """Return the partner groups of an account, ordered as partners are,
+        with the lines without partner at the end."""
+        group_ids = set(totals["items"]) | {
+            key for key in init_data if isinstance(key, int)
+        }
+        partners = self.env["res.partner"].search_fetch(
+            [("id", "in", list(group_ids - {0}))],
+            ["display_name"],
+        )
+        groups = [
+            {"id": partner.id, "name": partner.display_name} for partner in partners
+        ]
+        if 0 in group_ids:
+            groups.append({"id": 0, "name": _("Missing Partner")})
+        for group_item in groups:
+            init_group = init_data.get(group_item["id"])
+            group_item["init_bal"] = (
+                init_group["init_bal"]
+                if init_group
+                else self._initialize_data(True)["init_bal"]
+            )
+        return groups
+
+    def _set_stream_fin_bal_currency(
+        self, account, totals, company, foreign_currency, centralized
+    ):
+        """Same adjustments of the currency balances done at the end of
+        ``_get_report_values``, based on the aggregated period totals."""
+        items = account.get("list_grouped", [])
+        if foreign_currency and (
+            not account["currency_id"]
+            or account["currency_id"] != company.currency_id.id
+        ):
+            for item in [account] + items:
+                item["fin_bal"]["bal_curr"] -= item["init_bal"]["bal_curr"]
+                item["init_bal"]["bal_curr"] = 0
+        if account["currency_id"] or not foreign_currency:
+            account["fin_bal_currency_id"] = account["currency_id"]
+            return
+        fin_bal_currency_ids = set()
+        account["fin_bal"]["bal_curr"] = account["init_bal"]["bal_curr"]
+        if not centralized:
+            account["fin_bal"]["bal_curr"] += totals["foreign_bal_curr"]
+            fin_bal_currency_ids = totals["foreign_currency_ids"]
+        for item in items:
+            item_totals = totals["items"].get(item["id"])
+            item["fin_bal"]["bal_curr"] = item["init_bal"]["bal_curr"] + (
+                item_totals["foreign_bal_curr"] if item_totals else 0.0
+            )
+        account["fin_bal_currency_id"] = (
+            list(fin_bal_currency_ids)[0] if len(fin_bal_currency_ids) == 1 else False
+        )
+
+    def _get_report_values_stream(self, docids, data):
+        """Low memory variant of ``_get_report_values``: ``general_ledger`` is
+        a generator of accounts whose move lines are read in chunks when the
+        QWeb/XLSX writer iterates them. Only the aggregated balances are kept
+        in memory. Grouping by taxes is not supported by this mode."""
+        company = self.env["res.company"].browse(data["company_id"])
+        gen_ld_data = self._get_initial_balance_data(
+            data["account_ids"],
+            data["partner_ids"],
+            data["company_id"],
+            data["date_from"],
+            data["foreign_currency"],
+            data["only_posted_moves"],
+            data["unaffected_earnings_account"],
+            data["fy_start_date"],
+            data["cost_center_ids"],
+            data["domain"],
+            data["grouped_by"],
+        )
+        period_domain = self._get_period_domain(
+            data["account_ids"],
+            data["partner_ids"],
+            data["company_id"],
+            data["only_posted_moves"],
+            data["date_to"],
+            data["date_from"],
+            data["cost_center_ids"],
+        )
+        if data["domain"]:
+            period_domain += data["domain"]
+        period_totals = self._get_period_totals(
+            period_domain, data["grouped_by"], company.currency_id.id
+        )
+        accounts_data = self._get_accounts_data(
+            list(set(gen_ld_data) | set(period_totals))
+        )
+        shared_data = {
+            "journals_data": {},
+            "taxes_data": {},
+            "analytic_data": {},
+            "full_reconcile_data": {},
+        }
+        general_ledger = self._iter_general_ledger(
+            gen_ld_data,
+            period_totals,
+            accounts_data,
+            period_domain,
+            data,
+            shared_data,
+        )
+        return dict(
+            shared_data,
+            **{
+                "doc_ids": [data["wizard_id"]],
+                "doc_model": "general.ledger.report.wizard",
+                "docs": self.env["general.ledger.report.wizard"].browse(
+                    data["wizard_id"]
+                ),
+                "foreign_currency": data["foreign_currency"],
+                "company_name": company.display_name,
+                "company_currency": company.currency_id,
+                "currency_name": company.currency_id.name,
+                "date_from": data["date_from"],
+                "date_to": data["date_to"],
+                "only_posted_moves": data["only_posted_moves"],
+                "hide_account_at_0": data["hide_account_at_0"],
+                "show_cost_center": data["show_cost_center"],
+                "general_ledger": general_ledger,
+                "accounts_data": accounts_data,
+                "centralize": data["centralize"],
+                "filter_partner_ids": True if data["partner_ids"] else False,
+                "currency_model": self.env["res.currency"],
+            },
+        )
+
     # flake8: noqa: C901
     def _get_report_values(self, docids, data):
+        if data.get("stream_move_lines") and data["grouped_by"] != "taxes":
+            return self._get_report_values_stream(docids, data)
         wizard_id = data["wizard_id"]
         company = self.env["res.company"].browse(data["company_id"])
         company_id = data["company_id"]
@@ -137,16 +137,12 @@ class GeneralLedgerXslx(models.AbstractModel):
         ]._get_report_values(report, data)
         general_ledger = res_data["general_ledger"]
         accounts_data = res_data["accounts_data"]
-        journals_data = res_data["journals_data"]
-        taxes_data = res_data["taxes_data"]
-        analytic_data = res_data["analytic_data"]
         filter_partner_ids = res_data["filter_partner_ids"]
         foreign_currency = res_data["foreign_currency"]
-        company_currency = res_data["company_currency"]
         # For each account
         for account in general_ledger:
             # Write account title
-            total_bal_curr = 0
+            total_bal_curr = {"bal_curr": 0}
             self.write_array_title(
                 account["code"] + " - " + accounts_data[account["id"]]["name"],
                 report_data,
@@ -171,55 +167,12 @@ class GeneralLedgerXslx(models.AbstractModel):
                 self.write_initial_balance_from_dict(account, report_data)
 
                 # Display account move lines
-                for line in account["move_lines"]:
-                    line.update(
-                        {
-                            "account": account["code"],
-                            "journal": journals_data[line["journal_id"]]["code"],
-                        }
-                    )
-                    line_currency_id = (
-                        line["currency_id"][0] if line["currency_id"] else False
-                    )
-                    if line_currency_id and line_currency_id != company_currency.id:
-                        line.update(
-                            {
-                                "currency_name": line["currency_id"][1],
-                                "currency_id": line["currency_id"][0],
-                            }
-                        )
-                    if line["ref_label"] != "Centralized entries":
-                        taxes_description = ""
-                        analytic_distribution = ""
-                        for tax_id in line["tax_ids"]:
-                            taxes_description += taxes_data[tax_id]["tax_name"] + " "
-                        if line["tax_line_id"]:
-                            taxes_description += line["tax_line_id"][1]
-                        for account_ids, value in line["analytic_distribution"].items():
-                            for account_id in account_ids.split(","):
-                                if value < 100:
-                                    analytic_distribution += "%s %d%% " % (
-                                        analytic_data[int(account_id)]["name"],
-                                        value,
-                                    )
-                                else:
-                                    analytic_distribution += (
-                                        f"{analytic_data[int(account_id)]['name']} "
-                                    )
-                        line.update(
-                            {
-                                "taxes_description": taxes_description,
-                                "analytic_distribution": analytic_distribution,
-                            }
-                        )
-                    if (
-                        foreign_currency
-                        and line_currency_id
-                        and line_currency_id != company_currency.id
-                    ):
-                        total_bal_curr += line["bal_curr"]
-                        line.update({"total_bal_curr": total_bal_curr})
-                    self.write_line_from_dict(line, report_data)
+                self.write_lines_from_dict(
+                    self._iter_move_lines_dict(
+                        account["move_lines"], account, res_data, total_bal_curr
+                    ),
+                    report_data,
+                )
                 # Display ending balance line for account
                 account.update(
                     {
@@ -238,7 +191,7 @@ class GeneralLedgerXslx(models.AbstractModel):
 
             else:
                 # For each partner
-                total_bal_curr = 0
+                total_bal_curr = {"bal_curr": 0}
                 for group_item in account["list_grouped"]:
                     # Write partner title
                     self.write_array_title(group_item["name"], report_data)
@@ -280,57 +233,12 @@ class GeneralLedgerXslx(models.AbstractModel):
                     self.write_initial_balance_from_dict(group_item, report_data)
 
                     # Display account move lines
-                    for line in group_item["move_lines"]:
-                        line.update(
-                            {
-                                "account": account["code"],
-                                "journal": journals_data[line["journal_id"]]["code"],
-                            }
-                        )
-                        line_currency_id = (
-                            line["currency_id"][0] if line["currency_id"] else False
-                        )
-                        if line_currency_id and line_currency_id != company_currency.id:
-                            line.update(
-                                {
-                                    "currency_name": line["currency_id"][1],
-                                    "currency_id": line["currency_id"][0],
-                                }
-                            )
-                        if line["ref_label"] != "Centralized entries":
-                            taxes_description = ""
-                            analytic_distribution = ""
-                            for tax_id in line["tax_ids"]:
-                                taxes_description += (
-                                    taxes_data[tax_id]["tax_name"] + " "
-                                )
-                            for account_ids, value in line[
-                                "analytic_distribution"
-                            ].items():
-                                for account_id in account_ids.split(","):
-                                    if value < 100:
-                                        analytic_distribution += "%s %d%% " % (
-                                            analytic_data[int(account_id)]["name"],
-                                            value,
-                                        )
-                                    else:
-                                        analytic_distribution += (
-                                            f"{analytic_data[int(account_id)]['name']} "
-                                        )
-                            line.update(
-                                {
-                                    "taxes_description": taxes_description,
-                                    "analytic_distribution": analytic_distribution,
-                                }
-                            )
-                        if (
-                            foreign_currency
-                            and line_currency_id
-                            and line_currency_id != company_currency.id
-                        ):
-                            total_bal_curr += line["bal_curr"]
-                            line.update({"total_bal_curr": total_bal_curr})
-                        self.write_line_from_dict(line, report_data)
+                    self.write_lines_from_dict(
+                        self._iter_move_lines_dict(
+                            group_item["move_lines"], account, res_data, total_bal_curr
+                        ),
+                        report_data,
+                    )
 
                     # Display ending balance line for partner
                     group_item.update(
@@ -362,7 +270,7 @@ class GeneralLedgerXslx(models.AbstractModel):
                     if foreign_currency and account["fin_bal_currency_id"]:
                         account.update(
                             {
-                                "final_bal_curr": total_bal_curr,
+                                "final_bal_curr": total_bal_curr["bal_curr"],
                                 "currency_id": account["fin_bal_currency_id"],
                             }
                         )
@@ -371,6 +279,64 @@ class GeneralLedgerXslx(models.AbstractModel):
             # 2 lines break
             report_data["row_pos"] += 2
 
+    def _iter_move_lines_dict(self, move_lines, account, res_data, total_bal_curr):
+        """Yield the move lines of an account or group ready to be written.
+        ``move_lines`` can be a generator (low memory mode), lines are then
+        read, prepared and written one at a time. ``total_bal_curr`` holds
+        the cumulated foreign currency balance and is updated in place."""
+        journals_data = res_data["journals_data"]
+        taxes_data = res_data["taxes_data"]
+        analytic_data = res_data["analytic_data"]
+        foreign_currency = res_data["foreign_currency"]
+        company_currency = res_data["company_currency"]
+        for line in move_lines:
+            line.update(
+                {
+                    "account": account["code"],
+                    "journal": journals_data[line["journal_id"]]["code"],
+                }
+            )
+            line_currency_id = line["currency_id"][0] if line["currency_id"] else False
+            if line_currency_id and line_currency_id != company_currency.id:
+                line.update(
+                    {
+                        "currency_name": line["currency_id"][1],
+                        "currency_id": line["currency_id"][0],
+                    }
+                )
+            if line["ref_label"] != "Centralized entries":
+                taxes_description = ""
+                analytic_distribution = ""
+                for tax_id in line["tax_ids"]:
+                    taxes_description += taxes_data[tax_id]["tax_name"] + " "
+                if line["tax_line_id"]:
+                    taxes_description += line["tax_line_id"][1]
+                for account_ids, value in line["analytic_distribution"].items():
+                    for account_id in account_ids.split(","):
+                        if value < 100:
+                            analytic_distribution += "%s %d%% " % (
+                                analytic_data[int(account_id)]["name"],
+                                value,
+                            )
+                        else:
+                            analytic_distribution += (
+                                f"{analytic_data[int(account_id)]['name']} "
+                            )
+                line.update(
+                    {
+                        "taxes_description": taxes_description,
+                        "analytic_distribution": analytic_distribution,
+                    }
+                )
+            if (
+                foreign_currency
+                and line_currency_id
+                and line_currency_id != company_currency.id
+            ):
+                total_bal_curr["bal_curr"] += line["bal_curr"]
+                line.update({"total_bal_curr": total_bal_curr["bal_curr"]})
+            yield line
+
     def write_initial_balance_from_dict(self, my_object, report_data):
         """Specific function to write initial balance for General Ledger"""
         label = False
@@ -117,13 +117,23 @@ class OpenItemsReport(models.AbstractModel):
         ]
 
         open_items_move_lines_data = {}
+        # Browse all the partners at once so their fields are prefetched
+        # together instead of once per line
+        partners = self.env["res.partner"].browse(
+            {
+                move_line["partner_id"][0]
+                for move_line in move_lines
+                if move_line.get("partner_id")
+            }
+        )
+        partners_by_id = {partner.id: partner for partner in partners}
         for move_line in move_lines:
             journals_ids.add(move_line["journal_id"][0])
             acc_id = move_line["account_id"][0]
             # Partners data
             partner = self.env["res.partner"]
             if move_line.get("partner_id"):
-                partner = self.env["res.partner"].browse(move_line["partner_id"][0])
+                partner = partners_by_id[move_line["partner_id"][0]]
             if grouped_by == "salesperson":
                 user = partner.user_id
                 group_id = user.id or 0
@@ -191,11 +191,7 @@ class TrialBalanceReport(models.AbstractModel):
             only_posted_moves,
             show_partner_details,
         )
-        initial_balances = self.env["account.move.line"].read_group(
-            domain=domain,
-            fields=["account_id", "balance", "amount_currency:sum"],
-            groupby=["account_id", "currency_id"],
-        )
+        initial_balances = self._read_group_balances(domain, ["account_id"])
         pl_initial_balance = 0.0
         pl_initial_currency_balance = 0.0
         for initial_balance in initial_balances:
@@ -375,6 +371,24 @@ class TrialBalanceReport(models.AbstractModel):
                 total_amount[acc_id][key] = value
         return total_amount, partners_data
 
+    def _read_group_tb_balances(self, domain, groupby_fields):
+        """Grouping by analytic account needs the lazy ``read_group`` result
+        (its ``__context`` and ``__domain`` keys); otherwise the account
+        totals can be read from the monthly balances."""
+        if "analytic_account_ids" in groupby_fields:
+            return self.env["account.move.line"].read_group(
+                domain=domain,
+                fields=[
+                    "account_id",
+                    "debit",
+                    "credit",
+                    "balance",
+                    "amount_currency:sum",
+                ],
+                groupby=groupby_fields,
+            )
+        return self._read_group_balances(domain, ["account_id"])
+
     def _remove_accounts_at_cero(self, total_amount, show_partner_details, company):
         def is_removable(d):
             rounding = company.currency_id.rounding
@@ -444,10 +458,8 @@ class TrialBalanceReport(models.AbstractModel):
             only_posted_moves,
             show_partner_details,
         )
-        tb_initial_acc_bs = self.env["account.move.line"].read_group(
-            domain=initial_domain_bs,
-            fields=["account_id", "balance", "amount_currency:sum"],
-            groupby=groupby_fields,
+        tb_initial_acc_bs = self._read_group_tb_balances(
+            initial_domain_bs, groupby_fields
         )
         initial_domain_pl = self._get_initial_balances_pl_ml_domain(
             account_ids,
@@ -459,10 +471,8 @@ class TrialBalanceReport(models.AbstractModel):
             show_partner_details,
             fy_start_date,
         )
-        tb_initial_acc_pl = self.env["account.move.line"].read_group(
-            domain=initial_domain_pl,
-            fields=["account_id", "balance", "amount_currency:sum"],
-            groupby=groupby_fields,
+        tb_initial_acc_pl = self._read_group_tb_balances(
+            initial_domain_pl, groupby_fields
         )
         tb_initial_acc_rg = tb_initial_acc_bs + tb_initial_acc_pl
         for account_rg in tb_initial_acc_rg:
@@ -505,39 +515,21 @@ class TrialBalanceReport(models.AbstractModel):
             only_posted_moves,
             show_partner_details,
         )
-        tb_period_acc = self.env["account.move.line"].read_group(
-            domain=period_domain,
-            fields=["account_id", "debit", "credit", "balance", "amount_currency:sum"],
-            groupby=groupby_fields,
-        )
+        tb_period_acc = self._read_group_tb_balances(period_domain, groupby_fields)
 
         if show_partner_details:
-            tb_initial_prt_bs = self.env["account.move.line"].read_group(
-                domain=initial_domain_bs,
-                fields=["account_id", "partner_id", "balance", "amount_currency:sum"],
-                groupby=["account_id", "partner_id", "currency_id"],
-                lazy=False,
+            prt_groupby_fields = ["account_id", "partner_id", "currency_id"]
+            tb_initial_prt_bs = self._read_group_balances(
+                initial_domain_bs, prt_groupby_fields
             )
-            tb_initial_prt_pl = self.env["account.move.line"].read_group(
-                domain=initial_domain_pl,
-                fields=["account_id", "partner_id", "balance", "amount_currency:sum"],
-                groupby=["account_id", "partner_id", "currency_id"],
+            tb_initial_prt_pl = self._read_group_balances(
+                initial_domain_pl, prt_groupby_fields
             )
             tb_initial_prt = tb_initial_prt_bs + tb_initial_prt_pl
             if hide_account_at_0:
                 tb_initial_prt = [p for p in tb_initial_prt if p["balance"] != 0]
-            tb_period_prt = self.env["account.move.line"].read_group(
-                domain=period_domain,
-                fields=[
-                    "account_id",
-                    "partner_id",
-                    "debit",
-                    "credit",
-                    "balance",
-                    "amount_currency:sum",
-                ],
-                groupby=["account_id", "currency_id", "partner_id"],
-                lazy=False,
+            tb_period_prt = self._read_group_balances(
+                period_domain, prt_groupby_fields
             )
         total_amount = {}
         partners_data = []
@@ -122,3 +122,27 @@ class TestAgedPartnerBalance(TransactionCase):
             data=data,
         )
         self.assertTrue(result)
+
+    def test_compute_aged_amounts(self):
+        """Check that residuals are reduced per account and partner into
+        their age intervals."""
+        report_model = self.env[
+            "report.account_financial_report.aged_partner_balance"
+        ].with_context(age_partner_config=self.account_age_report_config)
+        interval_line = self.account_age_report_config.line_ids
+        ag_pb_data = report_model._compute_aged_amounts(
+            {},
+            [(1, 10), (1, 10), (1, 10), (1, 20), (2, 10)],
+            [100.0, 50.0, 25.0, 10.0, 5.0],
+            [-3, 15, 45, 200, 30],
+        )
+        self.assertAlmostEqual(ag_pb_data[1]["residual"], 185.0)
+        self.assertAlmostEqual(ag_pb_data[1][10]["residual"], 175.0)
+        self.assertAlmostEqual(ag_pb_data[1][10]["current"], 100.0)
+        self.assertAlmostEqual(ag_pb_data[1][10]["30_days"], 50.0)
+        self.assertAlmostEqual(ag_pb_data[1][10]["60_days"], 25.0)
+        self.assertAlmostEqual(ag_pb_data[1][20]["older"], 10.0)
+        self.assertAlmostEqual(ag_pb_data[2][10]["30_days"], 5.0)
+        # Only the 1-30 interval is configured
+        self.assertAlmostEqual(ag_pb_data[1][10][interval_line], 50.0)
+        self.assertAlmostEqual(ag_pb_data[2][10][interval_line], 5.0)
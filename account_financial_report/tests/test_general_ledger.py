@@ -101,7 +101,9 @@ class TestGeneralLedgerReport(AccountTestInvoicingCommon):
         move = self.env["account.move"].create(move_vals)
         move.action_post()
 
-    def _get_report_lines(self, with_partners=False, account_ids=False):
+    def _get_report_lines(
+        self, with_partners=False, account_ids=False, stream_move_lines=False
+    ):
         centralize = True
         if with_partners:
             centralize = False
@@ -116,6 +118,7 @@ class TestGeneralLedgerReport(AccountTestInvoicingCommon):
                 "account_ids": account_ids,
                 "fy_start_date": self.fy_date_start,
                 "centralize": centralize,
+                "stream_move_lines": stream_move_lines,
             }
         )
         data = general_ledger._prepare_report_general_ledger()
@@ -687,6 +690,96 @@ class TestGeneralLedgerReport(AccountTestInvoicingCommon):
         self.assertEqual(unaffected_fin_balance["credit"], 1000)
         self.assertEqual(unaffected_fin_balance["balance"], 500)
 
+    def _flatten_report_lines(self, general_ledger):
+        res = []
+        for account in general_ledger:
+            items = account.get("list_grouped") or [account]
+            for item in items:
+                res.append(
+                    (
+                        account["id"],
+                        item["id"],
+                        item["init_bal"]["balance"],
+                        item["fin_bal"]["balance"],
+                        [
+                            (line["id"], line["debit"], line["credit"], line["balance"])
+                            for line in item["move_lines"]
+                        ],
+                    )
+                )
+        return res
+
+    def test_05_stream_move_lines(self):
+        self._add_move(
+            date=self.previous_fy_date_end,
+            receivable_debit=1000,
+            receivable_credit=0,
+            income_debit=0,
+            income_credit=1000,
+        )
+        self._add_move(
+            date=self.fy_date_start,
+            receivable_debit=0,
+            receivable_credit=250,
+            income_debit=250,
+            income_credit=0,
+        )
+        self._add_move(
+            date=self.fy_date_end,
+            receivable_debit=0,
+            receivable_credit=150,
+            income_debit=150,
+            income_credit=0,
+        )
+        for with_partners in (False, True):
+            res_data = self._get_report_lines(with_partners=with_partners)
+            stream_data = self._get_report_lines(
+                with_partners=with_partners, stream_move_lines=True
+            )
+            self.assertEqual(
+                self._flatten_report_lines(stream_data["general_ledger"]),
+                self._flatten_report_lines(res_data["general_ledger"]),
+            )
+        receivable_fin_balance = self._get_final_balance(
+            self.receivable_account.id,
+            self._get_report_lines(stream_move_lines=True)["general_ledger"],
+        )
+        self.assertEqual(receivable_fin_balance["debit"], 1000)
+        self.assertEqual(receivable_fin_balance["credit"], 400)
+        self.assertEqual(receivable_fin_balance["balance"], 600)
+
+    def test_06_stream_xlsx_attachment(self):
+        self._add_move(
+            date=self.fy_date_start,
+            receivable_debit=0,
+            receivable_credit=250,
+            income_debit=250,
+            income_credit=0,
+        )
+        wizard = self.env["general.ledger.report.wizard"].create(
+            {
+                "date_from": self.fy_date_start,
+                "date_to": self.fy_date_end,
+                "target_move": "posted",
+                "company_id": self.env.user.company_id.id,
+                "fy_start_date": self.fy_date_start,
+                "stream_move_lines": True,
+            }
+        )
+        data = wizard._prepare_report_general_ledger()
+        attachment = self.env[
+            "report.a_f_r.report_general_ledger_xlsx"
+        ]._create_xlsx_attachment(
+            wizard.ids,
+            data,
+            "general_ledger.xlsx",
+            res_model=wizard._name,
+            res_id=wizard.id,
+        )
+        self.assertEqual(attachment.res_id, wizard.id)
+        # XLSX files are zip archives
+        self.assertTrue(attachment.raw.startswith(b"PK"))
+
     def test_partner_filter(self):
         partner_1 = self.env.ref("base.res_partner_1")
         partner_2 = self.env.ref("base.res_partner_2")
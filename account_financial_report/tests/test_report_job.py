@@ -0,0 +1,123 @@
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html).
+
+from odoo import fields
+from odoo.tests import tagged
+
+from odoo.addons.account.tests.common import AccountTestInvoicingCommon
+
+
+@tagged("post_install", "-at_install")
+class TestReportJob(AccountTestInvoicingCommon):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.env = cls.env(
+            context=dict(
+                cls.env.context,
+                mail_create_nolog=True,
+                mail_create_nosubscribe=True,
+                mail_notrack=True,
+                no_reset_password=True,
+                tracking_disable=True,
+            )
+        )
+        cls.job_model = cls.env["account.financial.report.job"]
+        cls.wizard = cls.env["trial.balance.report.wizard"].create(
+            {
+                "date_from": fields.Date.from_string("2016-01-01"),
+                "date_to": fields.Date.from_string("2016-12-31"),
+                "target_move": "posted",
+                "company_id": cls.env.company.id,
+            }
+        )
+
+    def _add_move(self, date="2016-06-01", amount=100):
+        """Post an entry debiting ``amount`` to the receivable account,
+        credited to it when negative."""
+        move = self.env["account.move"].create(
+            {
+                "journal_id": self.company_data["default_journal_misc"].id,
+                "date": fields.Date.from_string(date),
+                "line_ids": [
+                    (
+                        0,
+                        0,
+                        {
+                            "debit": max(amount, 0),
+                            "credit": max(-amount, 0),
+                            "account_id": self.company_data[
+                                "default_account_receivable"
+                            ].id,
+                        },
+                    ),
+                    (
+                        0,
+                        0,
+                        {
+                            "debit": max(-amount, 0),
+                            "credit": max(amount, 0),
+                            "account_id": self.company_data[
+                                "default_account_revenue"
+                            ].id,
+                        },
+                    ),
+                ],
+            }
+        )
+        move.action_post()
+        return move
+
+    def _get_jobs(self):
+        return self.job_model.search([("res_id", "=", self.wizard.id)])
+
+    def test_01_enqueue_and_cache(self):
+        action = self.wizard.button_export_xlsx_async()
+        self.assertEqual(action["tag"], "display_notification")
+        job = self._get_jobs()
+        self.assertEqual(job.state, "pending")
+        # An identical report waiting to be generated is not enqueued twice
+        self.wizard.button_export_xlsx_async()
+        self.assertEqual(self._get_jobs(), job)
+        self.job_model._cron_run_jobs()
+        self.assertEqual(job.state, "done")
+        self.assertTrue(job.attachment_id.raw)
+        # The result is reused while the ledger does not change
+        action = self.wizard.button_export_xlsx_async()
+        self.assertEqual(action["type"], "ir.actions.act_url")
+        self.assertIn(str(job.attachment_id.id), action["url"])
+        self.assertEqual(self._get_jobs(), job)
+        # A new journal entry invalidates the cached result
+        self._add_move()
+        self.wizard.button_export_xlsx_async()
+        self.assertEqual(len(self._get_jobs()), 2)
+
+    def test_02_expired_wizard(self):
+        self.wizard.button_export_xlsx_async()
+        job = self._get_jobs()
+        self.wizard.unlink()
+        self.job_model._cron_run_jobs()
+        self.assertEqual(job.state, "failed")
+
+    def test_03_cache_ignores_later_entries(self):
+        self.wizard.button_export_xlsx_async()
+        job = self._get_jobs()
+        self.job_model._cron_run_jobs()
+        # Journal entries after the end date of the report keep the result
+        self._add_move(date="2017-01-15")
+        action = self.wizard.button_export_xlsx_async()
+        self.assertEqual(action["type"], "ir.actions.act_url")
+        self.assertEqual(self._get_jobs(), job)
+
+    def test_04_reconcile_invalidates_cache(self):
+        receivable = self.company_data["default_account_receivable"]
+        moves = self._add_move() + self._add_move(amount=-100)
+        self.wizard.button_export_xlsx_async()
+        job = self._get_jobs()
+        self.job_model._cron_run_jobs()
+        # Reconciling the journal items changes the open items
+        moves.line_ids.filtered(
+            lambda line: line.account_id == receivable
+        ).reconcile()
+        self.wizard.button_export_xlsx_async()
+        self.assertEqual(len(self._get_jobs()), 2)
+        self.assertIn(job, self._get_jobs())
@@ -715,3 +715,95 @@ class TestTrialBalanceReport(AccountTestInvoicingCommon):
         ]
         self.assertEqual(len(trial_balance_code_set), len(all_accounts_code_set))
         self.assertTrue(trial_balance_code_set == all_accounts_code_set)
+
+    def test_06_month_balance(self):
+        self._add_move(
+            date=self.previous_fy_date_end,
+            receivable_debit=1000,
+            receivable_credit=0,
+            income_debit=0,
+            income_credit=1000,
+        )
+        config_parameter = self.env["ir.config_parameter"].sudo()
+        config_parameter.set_param("account_financial_report.use_month_balance", True)
+        month_balance_model = self.env["account.move.line.month.balance"]
+        month_balance_model._rebuild(self.env.user.company_id)
+        # Posting updates the balances incrementally
+        self._add_move(
+            date=self.date_start,
+            receivable_debit=0,
+            receivable_credit=1000,
+            income_debit=1000,
+            income_credit=0,
+        )
+        month_balances = month_balance_model.search(
+            [("account_id", "=", self.account100.id)]
+        )
+        self.assertEqual(len(month_balances), 2)
+        self.assertEqual(sum(month_balances.mapped("balance")), 0)
+        res_data = self._get_report_lines()
+        config_parameter.set_param("account_financial_report.use_month_balance", False)
+        expected_data = self._get_report_lines()
+        for account_id in (self.account100.id, self.account200.id):
+            self.assertEqual(
+                self._get_account_lines(account_id, res_data["trial_balance"]),
+                self._get_account_lines(account_id, expected_data["trial_balance"]),
+            )
+
+    def test_07_month_balance_posted_lines_edit(self):
+        config_parameter = self.env["ir.config_parameter"].sudo()
+        config_parameter.set_param("account_financial_report.use_month_balance", True)
+        st_line = self.env["account.bank.statement.line"].create(
+            {
+                "journal_id": self.company_data["default_journal_bank"].id,
+                "date": self.date_start,
+                "payment_ref": "Statement line",
+                "partner_id": self.partner.id,
+                "amount": 500.0,
+            }
+        )
+        self.assertEqual(st_line.move_id.state, "posted")
+        # Reconcile the statement line the way the edit mode of the
+        # reconciliation widget does, replacing the items of the posted entry
+        _liquidity_lines, suspense_lines, _other_lines = st_line._seek_for_lines()
+        move = st_line.move_id
+        move.with_context(
+            skip_account_move_synchronization=True,
+            force_delete=True,
+            skip_invoice_sync=True,
+            skip_readonly_check=True,
+        ).write({"line_ids": [(2, line.id) for line in suspense_lines]})
+        self.env["account.move.line"].with_context(
+            check_move_validity=False,
+            skip_invoice_sync=True,
+        ).create(
+            {
+                "move_id": move.id,
+                "account_id": self.account200.id,
+                "partner_id": self.partner.id,
+                "credit": 500.0,
+            }
+        )
+        res_data = self._get_report_lines()
+        config_parameter.set_param("account_financial_report.use_month_balance", False)
+        expected_data = self._get_report_lines()
+        for account_id in (
+            self.account200.id,
+            suspense_lines.account_id.id,
+            self.company_data["default_journal_bank"].default_account_id.id,
+        ):
+            self.assertEqual(
+                self._get_account_lines(account_id, res_data["trial_balance"]),
+                self._get_account_lines(account_id, expected_data["trial_balance"]),
+            )
+        self.assertEqual(
+            self._get_account_lines(self.account200.id, res_data["trial_balance"])[
+                "final_balance"
+            ],
+            -500.0,
+        )
+        self.assertFalse(
+            self.env["account.move.line.month.balance"].search(
+                [("account_id", "=", suspense_lines.account_id.id)]
+            )
+        )
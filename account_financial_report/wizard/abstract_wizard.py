@@ -49,3 +49,19 @@ class AbstractWizard(models.AbstractModel):
         self.ensure_one()
         report_type = "xlsx"
         return self._export(report_type)
+
+    def button_export_pdf_async(self):
+        self.ensure_one()
+        return self._export_async("qweb-pdf")
+
+    def button_export_xlsx_async(self):
+        self.ensure_one()
+        return self._export_async("xlsx")
+
+    def _export_async(self, report_type):
+        """Render the report in background, or return it at once when an
+        identical report was already generated since the last ledger
+        change."""
+        return self.env["account.financial.report.job"]._enqueue(
+            self, self._export(report_type)
+        )
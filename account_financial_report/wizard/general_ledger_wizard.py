@@ -84,6 +84,12 @@ class GeneralLedgerReportWizard(models.TransientModel):
         string="Show Analytic Account",
         default=True,
     )
+    stream_move_lines = fields.Boolean(
+        string="Low memory mode",
+        help="Read the journal items by chunks while the report is written "
+        "instead of loading the whole period at once. Recommended for very "
+        "large ledgers. Grouping by taxes is not supported by this mode.",
+    )
     domain = fields.Char(
         string="Journal Items Domain",
         default=[],
@@ -308,6 +314,7 @@ class GeneralLedgerReportWizard(models.TransientModel):
             "unaffected_earnings_account": self.unaffected_earnings_account.id,
             "account_financial_report_lang": self.env.lang,
             "domain": self._get_account_move_lines_domain(),
+            "stream_move_lines": self.stream_move_lines,
         }
 
     def _export(self, report_type):
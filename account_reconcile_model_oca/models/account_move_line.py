@@ -0,0 +1,114 @@
+# Copyright 2024 Dixmit
+# License AGPL-3.0 or later (https://www.gnu.org/licenses/agpl).
+
+from odoo import models
+from odoo.tools import SQL
+
+
+class AccountMoveLine(models.Model):
+    _inherit = "account.move.line"
+
+    def init(self):
+        """Index the tokens matched by the invoice matching rules.
+
+        ``account_reconcile_model_matching_tokens`` returns the numerical tokens
+        of a text along with the text itself. The indexes on its result are
+        maintained by PostgreSQL whenever a journal item or entry is written or
+        reconciled. They let the invoice matching rules find the journal items
+        sharing a token with a statement line with an index probe, instead of
+        tokenizing all the open items on every search.
+        """
+        super().init()
+        self.env.cr.execute(
+            r"""
+            CREATE OR REPLACE FUNCTION account_reconcile_model_matching_tokens(
+                value varchar
+            ) RETURNS varchar[] LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+                SELECT CASE WHEN COALESCE(value, '') = '' THEN NULL ELSE
+                    ARRAY[value] || COALESCE(
+                        REGEXP_SPLIT_TO_ARRAY(
+                            SUBSTRING(
+                                REGEXP_REPLACE(value, '[^0-9\s]', '', 'g'),
+                                '\S(?:.*\S)*'
+                            ),
+                            '\s+'
+                        ),
+                        '{}'
+                    )
+                END
+            $$
+            """
+        )
+        # The open items of the previous index missed the foreign currency
+        # items left with a residual amount in their currency only.
+        self.env.cr.execute("DROP INDEX IF EXISTS account_move_line_matching_tokens_idx")
+        self.env.cr.execute(
+            """
+            CREATE INDEX IF NOT EXISTS account_move_line_open_matching_tokens_idx
+            ON account_move_line
+            USING gin (account_reconcile_model_matching_tokens(name))
+            WHERE reconciled IS NOT TRUE
+                AND (amount_residual != 0 OR amount_residual_currency != 0)
+            """
+        )
+        for field_name in ("name", "ref"):
+            self.env.cr.execute(
+                SQL(
+                    """
+                    CREATE INDEX IF NOT EXISTS %s ON account_move
+                    USING gin (account_reconcile_model_matching_tokens(%s))
+                    WHERE state = 'posted'
+                    """,
+                    SQL.identifier(f"account_move_{field_name}_matching_tokens_idx"),
+                    SQL.identifier(field_name),
+                )
+            )
+
+    def _get_matching_tokens_query(self, enabled_matches, tokens):
+        """Return a query selecting the ids of the journal items whose texts in
+        ``enabled_matches`` contain one of ``tokens``, using the indexes
+        created in ``init``. The result is a superset of the items the
+        invoice matching rules can match on these tokens.
+        :param enabled_matches: The (table alias, field) couples of
+          ``account.reconcile.model._get_invoice_matching_enabled_matches``.
+        :param tokens: A list of numerical or exact tokens.
+        """
+        queries = []
+        for table_alias, field_name in enabled_matches:
+            if table_alias == "account_move_line":
+                queries.append(
+                    SQL(
+                        """
+                        SELECT account_move_line.id
+                        FROM account_move_line
+                        WHERE account_move_line.reconciled IS NOT TRUE
+                            AND (
+                                account_move_line.amount_residual != 0
+                                OR account_move_line.amount_residual_currency != 0
+                            )
+                            AND account_reconcile_model_matching_tokens(
+                                account_move_line.%s
+                            ) && %s::varchar[]
+                        """,
+                        SQL.identifier(field_name),
+                        tokens,
+                    )
+                )
+            else:
+                queries.append(
+                    SQL(
+                        """
+                        SELECT account_move_line.id
+                        FROM account_move
+                        JOIN account_move_line
+                            ON account_move_line.move_id = account_move.id
+                        WHERE account_move.state = 'posted'
+                            AND account_reconcile_model_matching_tokens(
+                                account_move.%s
+                            ) && %s::varchar[]
+                        """,
+                        SQL.identifier(field_name),
+                        tokens,
+                    )
+                )
+        return SQL(" UNION ").join(queries)
@@ -4,6 +4,8 @@ from collections import defaultdict
 from dateutil.relativedelta import relativedelta
 
 from odoo import Command, fields, models, tools
+from odoo.osv import expression
+from odoo.tools import SQL
 
 
 class AccountReconcileModel(models.Model):
@@ -191,27 +193,11 @@ class AccountReconcileModel(models.Model):
                 continue
 
             if rec_model.rule_type == "invoice_matching":
-                rules_map = rec_model._get_invoice_matching_rules_map()
-                for rule_index in sorted(rules_map.keys()):
-                    for rule_method in rules_map[rule_index]:
-                        candidate_vals = rule_method(st_line, partner)
-                        if not candidate_vals:
-                            continue
-
-                        if candidate_vals.get("amls"):
-                            res = rec_model._get_invoice_matching_amls_result(
-                                st_line, partner, candidate_vals
-                            )
-                            if res:
-                                return {
-                                    **res,
-                                    "model": rec_model,
-                                }
-                        else:
-                            return {
-                                **candidate_vals,
-                                "model": rec_model,
-                            }
+                res = rec_model._apply_invoice_matching_rules(
+                    st_line, partner, rec_model._get_invoice_matching_rules_map()
+                )
+                if res:
+                    return res
 
             elif rec_model.rule_type == "writeoff_suggestion":
                 return {
@@ -221,6 +207,104 @@ class AccountReconcileModel(models.Model):
                 }
         return {}
 
+    def _apply_rules_batch(self, st_lines, partners=None):
+        """Batch variant of ``_apply_rules`` matching a whole recordset of
+        statement lines.
+
+        The candidates of the invoice matching rule are searched for all the
+        statement lines at once with
+        ``_get_invoice_matching_amls_candidates_batch``, the rules keep the
+        priority given by ``_get_invoice_matching_rules_map``. All the lines are
+        matched against the same state of the journal items, so the same
+        journal item may be proposed for several lines: callers reconciling the
+        results one after the other must check the items are still open.
+        :param st_lines: The statement lines to match.
+        :param partners: A dict mapping statement line ids to the partner to
+          consider. Lines missing from it use ``_retrieve_partner``.
+        :return: A dict mapping each statement line id with the result of
+          ``_apply_rules`` for this line.
+        """
+        partners = dict(partners or {})
+        for st_line in st_lines:
+            if st_line.id not in partners:
+                partners[st_line.id] = st_line._retrieve_partner()
+        results = {}
+        available_models = self.filtered(
+            lambda m: m.rule_type != "writeoff_button"
+        ).sorted()
+        for rec_model in available_models:
+            st_lines_todo = st_lines.filtered(
+                lambda line, rec_model=rec_model: line.id not in results
+                and rec_model._is_applicable_for(line, partners[line.id])
+            )
+            if not st_lines_todo:
+                continue
+
+            if rec_model.rule_type == "invoice_matching":
+                rules_map = rec_model._get_invoice_matching_rules_map()
+                batch_candidates = (
+                    rec_model._get_invoice_matching_amls_candidates_batch(
+                        st_lines_todo, partners
+                    )
+                )
+                for st_line in st_lines_todo:
+                    res = rec_model._apply_invoice_matching_rules(
+                        st_line,
+                        partners[st_line.id],
+                        rules_map,
+                        batch_candidates=batch_candidates,
+                    )
+                    if res:
+                        results[st_line.id] = res
+
+            elif rec_model.rule_type == "writeoff_suggestion":
+                for st_line in st_lines_todo:
+                    results[st_line.id] = {
+                        "model": rec_model,
+                        "status": "write_off",
+                        "auto_reconcile": rec_model.auto_reconcile,
+                    }
+        return {st_line.id: results.get(st_line.id, {}) for st_line in st_lines}
+
+    def _apply_invoice_matching_rules(
+        self, st_line, partner, rules_map, batch_candidates=None
+    ):
+        """Evaluate the rules of ``rules_map`` by priority order and return the
+        result of the first one finding something.
+        :param batch_candidates: The result of
+          ``_get_invoice_matching_amls_candidates_batch``, used instead of
+          calling ``_get_invoice_matching_amls_candidates`` for each line.
+        """
+        self.ensure_one()
+        for rule_index in sorted(rules_map.keys()):
+            for rule_method in rules_map[rule_index]:
+                if (
+                    batch_candidates is not None
+                    and getattr(rule_method, "__func__", None)
+                    is AccountReconcileModel._get_invoice_matching_amls_candidates
+                ):
+                    candidate_vals = batch_candidates.get(st_line.id)
+                else:
+                    candidate_vals = rule_method(st_line, partner)
+                if not candidate_vals:
+                    continue
+
+                if candidate_vals.get("amls"):
+                    res = self._get_invoice_matching_amls_result(
+                        st_line, partner, candidate_vals
+                    )
+                    if res:
+                        return {
+                            **res,
+                            "model": self,
+                        }
+                else:
+                    return {
+                        **candidate_vals,
+                        "model": self,
+                    }
+        return {}
+
     def _is_applicable_for(self, st_line, partner):
         """Returns true iff this reconciliation model can be used to search for matches
         for the provided statement line and partner.
@@ -293,8 +377,20 @@ class AccountReconcileModel(models.Model):
 
         return True
 
-    def _get_invoice_matching_amls_domain(self, st_line, partner):
+    def _get_invoice_matching_amls_base_domain(self, st_line):
+        """Domain of the journal items that may be matched by this model, before
+        the conditions depending on the amount, currency and partner of the
+        statement line."""
         aml_domain = st_line._get_default_amls_matching_domain()
+        if self.past_months_limit:
+            date_limit = fields.Date.context_today(self) - relativedelta(
+                months=self.past_months_limit
+            )
+            aml_domain.append(("date", ">=", fields.Date.to_string(date_limit)))
+        return aml_domain
+
+    def _get_invoice_matching_amls_domain(self, st_line, partner):
+        aml_domain = self._get_invoice_matching_amls_base_domain(st_line)
 
         if st_line.amount > 0.0:
             aml_domain.append(("balance", ">", 0.0))
@@ -308,12 +404,6 @@ class AccountReconcileModel(models.Model):
         if partner:
             aml_domain.append(("partner_id", "=", partner.id))
 
-        if self.past_months_limit:
-            date_limit = fields.Date.context_today(self) - relativedelta(
-                months=self.past_months_limit
-            )
-            aml_domain.append(("date", ">=", fields.Date.to_string(date_limit)))
-
         return aml_domain
 
     def _get_st_line_text_values_for_matching(self, st_line):
@@ -405,6 +495,16 @@ class AccountReconcileModel(models.Model):
             exact_tokens,
             _text_tokens,
         ) = self._get_invoice_matching_st_line_tokens(st_line)
+        enabled_matches = self._get_invoice_matching_enabled_matches()
+        cte_where_clause = where_clause
+        cte_where_params = where_params
+        if (numerical_tokens or exact_tokens) and enabled_matches:
+            # Only tokenize the items found through the token indexes
+            tokens_query = self.env["account.move.line"]._get_matching_tokens_query(
+                enabled_matches, numerical_tokens + exact_tokens
+            )
+            cte_where_clause = f"{where_clause} AND account_move_line.id IN ({tokens_query.code})"  # noqa: E501
+            cte_where_params = where_params + list(tokens_query.params)
         if numerical_tokens or exact_tokens:
             aml_cte = rf"""
                 WITH aml_cte AS (
@@ -418,18 +518,10 @@ class AccountReconcileModel(models.Model):
                     FROM {from_clause}
                     JOIN account_move account_move_line__move_id
                         ON account_move_line__move_id.id = account_move_line.move_id
-                    WHERE {where_clause}
+                    WHERE {cte_where_clause}
                 )
             """  # noqa: E501
-            all_params += where_params
-
-        enabled_matches = []
-        if self.match_text_location_label:
-            enabled_matches.append(("account_move_line", "name"))
-        if self.match_text_location_note:
-            enabled_matches.append(("account_move_line__move_id", "name"))
-        if self.match_text_location_reference:
-            enabled_matches.append(("account_move_line__move_id", "ref"))
+            all_params += cte_where_params
 
         if numerical_tokens:
             for table_alias, field in enabled_matches:
@@ -548,6 +640,261 @@ class AccountReconcileModel(models.Model):
                 "amls": amls,
             }
 
+    def _get_invoice_matching_enabled_matches(self):
+        """Return the (table alias, field) of the journal items texts matched
+        with the statement line tokens."""
+        enabled_matches = []
+        if self.match_text_location_label:
+            enabled_matches.append(("account_move_line", "name"))
+        if self.match_text_location_note:
+            enabled_matches.append(("account_move_line__move_id", "name"))
+        if self.match_text_location_reference:
+            enabled_matches.append(("account_move_line__move_id", "ref"))
+        return enabled_matches
+
+    def _get_invoice_matching_amls_candidates_batch(self, st_lines, partners):
+        """Batch variant of ``_get_invoice_matching_amls_candidates``.
+
+        The journal items that may be matched are found through the token
+        indexes, tokenized once and joined with the tokens of all the statement
+        lines in a single query, instead of running one tokenizing query per
+        statement line. The conditions
+        depending on the statement line (amount sign, currency, partner) are
+        applied in the join. Statement lines without tokens to match fall back
+        to ``_get_invoice_matching_amls_candidates``.
+        :param st_lines: The statement lines to match.
+        :param partners: A dict mapping each statement line id to its partner.
+        :return: A dict mapping each statement line id to its candidates.
+        """
+        self.ensure_one()
+        assert self.rule_type == "invoice_matching"
+        enabled_matches = self._get_invoice_matching_enabled_matches()
+        res = {}
+        st_line_tokens = {}
+        for st_line in st_lines:
+            numerical_tokens, exact_tokens, _text_tokens = (
+                self._get_invoice_matching_st_line_tokens(st_line)
+            )
+            if enabled_matches and (numerical_tokens or exact_tokens):
+                st_line_tokens[st_line.id] = (numerical_tokens, exact_tokens)
+            else:
+                res[st_line.id] = self._get_invoice_matching_amls_candidates(
+                    st_line, partners[st_line.id]
+                )
+        if not st_line_tokens:
+            return res
+
+        self.env["account.move"].flush_model()
+        self.env["account.move.line"].flush_model()
+        token_lines = st_lines.browse(list(st_line_tokens))
+
+        # Only the items found through the token indexes are tokenized
+        tokens_query = self.env["account.move.line"]._get_matching_tokens_query(
+            enabled_matches,
+            list(
+                {
+                    token
+                    for numerical_tokens, exact_tokens in st_line_tokens.values()
+                    for token in numerical_tokens + exact_tokens
+                }
+            ),
+        )
+        # Journal items that may be matched, one group per company. The base
+        # domain excludes the items of the statement line it is computed for,
+        # the union of the domains of two lines excludes none of them.
+        group_queries = []
+        group_indexes = {}
+        for group_index, company in enumerate(token_lines.company_id):
+            company_lines = token_lines.filtered(
+                lambda line, company=company: line.company_id == company
+            )
+            group_indexes.update(dict.fromkeys(company_lines.ids, group_index))
+            domain = expression.OR(
+                [
+                    self._get_invoice_matching_amls_base_domain(line)
+                    for line in company_lines[:2]
+                ]
+            )
+            query = self.env["account.move.line"]._where_calc(domain)
+            query.add_where(SQL("account_move_line.id IN (%s)", tokens_query))
+            group_queries.append(
+                query.select(
+                    SQL("%s AS group_index", group_index),
+                    SQL("account_move_line.id AS id"),
+                )
+            )
+
+        token_queries = []
+        for table_alias, field in enabled_matches:
+            column = SQL.identifier(f"{table_alias}_{field}")
+            token_queries.append(
+                SQL(
+                    r"""
+                    SELECT
+                        aml_cte.*,
+                        'numerical' AS kind,
+                        UNNEST(
+                            REGEXP_SPLIT_TO_ARRAY(
+                                SUBSTRING(
+                                    REGEXP_REPLACE(%(column)s, '[^0-9\s]', '', 'g'),
+                                    '\S(?:.*\S)*'
+                                ),
+                                '\s+'
+                            )
+                        ) AS token
+                    FROM aml_cte
+                    WHERE %(column)s IS NOT NULL
+                    UNION ALL
+                    SELECT
+                        aml_cte.*,
+                        'exact' AS kind,
+                        %(column)s AS token
+                    FROM aml_cte
+                    WHERE COALESCE(%(column)s, '') != ''
+                    """,
+                    column=column,
+                )
+            )
+
+        line_columns = defaultdict(list)
+        token_columns = defaultdict(list)
+        for st_line in token_lines:
+            numerical_tokens, exact_tokens = st_line_tokens[st_line.id]
+            partner = partners[st_line.id]
+            line_columns["id"].append(st_line.id)
+            line_columns["group_index"].append(group_indexes[st_line.id])
+            line_columns["has_numerical"].append(bool(numerical_tokens))
+            line_columns["has_exact"].append(bool(exact_tokens))
+            line_columns["inbound"].append(st_line.amount > 0.0)
+            line_columns["currency_id"].append(
+                (st_line.foreign_currency_id or st_line.currency_id).id
+            )
+            line_columns["partner_id"].append(partner.id or None)
+            for token in set(numerical_tokens + exact_tokens):
+                token_columns["st_line_id"].append(st_line.id)
+                token_columns["token"].append(token)
+
+        direction = SQL("DESC" if self.matching_order == "new_first" else "ASC")
+        self._cr.execute(
+            SQL(
+                """
+                WITH aml_cte AS MATERIALIZED (
+                    SELECT
+                        grp.group_index,
+                        account_move_line.id,
+                        account_move_line.date,
+                        account_move_line.date_maturity,
+                        account_move_line.partner_id,
+                        account_move_line.currency_id,
+                        account_move_line.balance,
+                        account_move_line.statement_line_id,
+                        account_move_line.name AS account_move_line_name,
+                        account_move_line__move_id.name
+                            AS account_move_line__move_id_name,
+                        account_move_line__move_id.ref
+                            AS account_move_line__move_id_ref
+                    FROM (%(groups)s) grp
+                    JOIN account_move_line ON account_move_line.id = grp.id
+                    JOIN account_move account_move_line__move_id
+                        ON account_move_line__move_id.id = account_move_line.move_id
+                ),
+                aml_token AS (%(tokens)s),
+                st_line AS (
+                    SELECT * FROM UNNEST(
+                        %(line_ids)s::int[],
+                        %(line_group_indexes)s::int[],
+                        %(line_has_numerical)s::bool[],
+                        %(line_has_exact)s::bool[],
+                        %(line_inbound)s::bool[],
+                        %(line_currency_ids)s::int[],
+                        %(line_partner_ids)s::int[]
+                    ) AS line(
+                        id, group_index, has_numerical, has_exact, inbound,
+                        currency_id, partner_id
+                    )
+                ),
+                st_token AS (
+                    SELECT * FROM UNNEST(
+                        %(token_st_line_ids)s::int[], %(tokens_values)s::varchar[]
+                    ) AS token(st_line_id, token)
+                ),
+                matching AS (
+                    SELECT
+                        st_line.id AS st_line_id,
+                        aml_token.id,
+                        aml_token.date,
+                        aml_token.date_maturity,
+                        COUNT(*) AS nb_match
+                    FROM st_line
+                    JOIN st_token ON st_token.st_line_id = st_line.id
+                    JOIN aml_token
+                        ON aml_token.group_index = st_line.group_index
+                        AND aml_token.token = st_token.token
+                        AND (
+                            (aml_token.kind = 'numerical' AND st_line.has_numerical)
+                            OR (aml_token.kind = 'exact' AND st_line.has_exact)
+                        )
+                    WHERE aml_token.statement_line_id IS DISTINCT FROM st_line.id
+                        AND CASE
+                            WHEN st_line.inbound THEN aml_token.balance > 0.0
+                            ELSE aml_token.balance < 0.0
+                        END
+                        AND (
+                            st_line.partner_id IS NULL
+                            OR aml_token.partner_id = st_line.partner_id
+                        )
+                        AND (
+                            NOT %(same_currency)s
+                            OR aml_token.currency_id = st_line.currency_id
+                        )
+                    GROUP BY
+                        st_line.id,
+                        aml_token.id,
+                        aml_token.date,
+                        aml_token.date_maturity
+                )
+                SELECT
+                    st_line_id,
+                    ARRAY_AGG(
+                        id ORDER BY
+                            nb_match DESC,
+                            date_maturity %(direction)s,
+                            date %(direction)s,
+                            id %(direction)s
+                    )
+                FROM matching
+                GROUP BY st_line_id
+                """,
+                groups=SQL(" UNION ALL ").join(group_queries),
+                tokens=SQL(" UNION ALL ").join(token_queries),
+                line_ids=line_columns["id"],
+                line_group_indexes=line_columns["group_index"],
+                line_has_numerical=line_columns["has_numerical"],
+                line_has_exact=line_columns["has_exact"],
+                line_inbound=line_columns["inbound"],
+                line_currency_ids=line_columns["currency_id"],
+                line_partner_ids=line_columns["partner_id"],
+                token_st_line_ids=token_columns["st_line_id"],
+                tokens_values=token_columns["token"],
+                same_currency=bool(self.match_same_currency),
+                direction=direction,
+            )
+        )
+        candidate_ids = dict(self._cr.fetchall())
+        for st_line_id in st_line_tokens:
+            if candidate_ids.get(st_line_id):
+                res[st_line_id] = {
+                    "allow_auto_reconcile": True,
+                    "amls": self.env["account.move.line"].browse(
+                        candidate_ids[st_line_id]
+                    ),
+                }
+            else:
+                # As in _get_invoice_matching_amls_candidates, no other journal
+                # item is proposed when the text matching found nothing.
+                res[st_line_id] = None
+        return res
+
     def _get_invoice_matching_rules_map(self):
         """Get a mapping <priority_order, rule> that could be overridden in others
         modules.
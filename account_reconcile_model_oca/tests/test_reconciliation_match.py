@@ -283,6 +283,12 @@ class TestReconciliationMatchingRules(AccountTestInvoicingCommon):
         for statement_line, expected_values in expected_values_list.items():
             res = rules._apply_rules(statement_line, statement_line._retrieve_partner())
             self.assertDictEqual(res, expected_values)
+        # The batch matching must give the same results
+        batch_res = rules._apply_rules_batch(
+            self.env["account.bank.statement.line"].concat(*expected_values_list)
+        )
+        for statement_line, expected_values in expected_values_list.items():
+            self.assertDictEqual(batch_res[statement_line.id], expected_values)
 
     def test_matching_fields(self):
         # Check without restriction.
@@ -1621,3 +1627,22 @@ class TestReconciliationMatchingRules(AccountTestInvoicingCommon):
                     },
                 },
             )
+
+    def test_matching_tokens_index(self):
+        self.env.cr.execute(
+            "SELECT account_reconcile_model_matching_tokens(%s)",
+            ["INV/2019/0001 ref 42"],
+        )
+        self.assertEqual(
+            self.env.cr.fetchone()[0], ["INV/2019/0001 ref 42", "20190001", "42"]
+        )
+        self.env.flush_all()
+        move_name = self.invoice_line_1.move_id.name
+        self.env.cr.execute(
+            self.env["account.move.line"]._get_matching_tokens_query(
+                [("account_move_line__move_id", "name")], [move_name, "no match"]
+            )
+        )
+        self.assertIn(
+            self.invoice_line_1.id, [row[0] for row in self.env.cr.fetchall()]
+        )
@@ -26,6 +26,7 @@
         "views/account_move.xml",
         "views/account_account.xml",
         "views/account_bank_statement.xml",
+        "data/ir_cron_data.xml",
     ],
     "demo": ["demo/demo.xml"],
     "post_init_hook": "post_init_hook",
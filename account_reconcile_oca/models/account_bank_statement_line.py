@@ -1,6 +1,8 @@
 # Copyright 2023 Dixmit
 # License AGPL-3.0 or later (https://www.gnu.org/licenses/agpl).
 
+import logging
+import time
 from collections import defaultdict
 
 from dateutil import rrule
@@ -12,6 +14,9 @@ from odoo.fields import first
 from odoo.tools import LazyTranslate, float_compare, float_is_zero
 
 _lt = LazyTranslate(__name__, default_lang="en_US")
+_logger = logging.getLogger(__name__)
+
+AUTO_RECONCILE_BATCH_SIZE = 500
 
 
 class AccountBankStatementLine(models.Model):
@@ -824,19 +829,20 @@ class AccountBankStatementLine(models.Model):
                     "line_ids": lines_to_remove,
                 }
             )
-            for line_vals in data:
-                if line_vals["kind"] == "liquidity":
-                    continue
-                line = (
-                    self.env["account.move.line"]
-                    .with_context(
-                        check_move_validity=False,
-                        skip_sync_invoice=True,
-                        skip_invoice_sync=True,
-                        validate_analytic=True,
-                    )
-                    .create(self._reconcile_move_line_vals(line_vals))
+            data = [line_vals for line_vals in data if line_vals["kind"] != "liquidity"]
+            lines = (
+                self.env["account.move.line"]
+                .with_context(
+                    check_move_validity=False,
+                    skip_sync_invoice=True,
+                    skip_invoice_sync=True,
+                    validate_analytic=True,
                 )
+                .create(
+                    [self._reconcile_move_line_vals(line_vals) for line_vals in data]
+                )
+            )
+            for line_vals, line in zip(data, lines, strict=True):
                 if line_vals.get("counterpart_line_ids"):
                     to_reconcile.append(
                         self.env["account.move.line"].browse(
@@ -893,16 +899,20 @@ class AccountBankStatementLine(models.Model):
                     ]
                 }
             )
-            for line_vals in data:
-                if line_vals["kind"] == "liquidity":
-                    continue
-                if line_vals["kind"] == "suspense":
-                    raise UserError(_("No supense lines are allowed when reconciling"))
-                line = (
-                    self.env["account.move.line"]
-                    .with_context(check_move_validity=False, skip_invoice_sync=True)
-                    .create(self._reconcile_move_line_vals(line_vals, move.id))
+            data = [line_vals for line_vals in data if line_vals["kind"] != "liquidity"]
+            if any(line_vals["kind"] == "suspense" for line_vals in data):
+                raise UserError(_("No supense lines are allowed when reconciling"))
+            lines = (
+                self.env["account.move.line"]
+                .with_context(check_move_validity=False, skip_invoice_sync=True)
+                .create(
+                    [
+                        self._reconcile_move_line_vals(line_vals, move.id)
+                        for line_vals in data
+                    ]
                 )
+            )
+            for line_vals, line in zip(data, lines, strict=True):
                 if line_vals.get("counterpart_line_ids") and line.account_id.reconcile:
                     to_reconcile[line.account_id.id] |= (
                         self.env["account.move.line"].browse(
@@ -975,53 +985,182 @@ class AccountBankStatementLine(models.Model):
             "_test_account_reconcile_oca"
         ):
             return result
-        models = self.env["account.reconcile.model"].search(
+        result._auto_reconcile()
+        return result
+
+    def _get_auto_reconcile_models(self):
+        return self.env["account.reconcile.model"].search(
             [
                 ("rule_type", "in", ["invoice_matching", "writeoff_suggestion"]),
-                ("company_id", "in", result.company_id.ids),
+                ("company_id", "in", self.company_id.ids),
                 ("auto_reconcile", "=", True),
             ]
         )
-        for record in result:
-            res = models._apply_rules(record, record._retrieve_partner())
-            if not res:
-                continue
-            liquidity_lines, suspense_lines, other_lines = record._seek_for_lines()
-            data = []
-            for line in liquidity_lines:
-                reconcile_auxiliary_id, lines = record._get_reconcile_line(
-                    line,
-                    "liquidity",
-                    move=True,
-                )
-                data += lines
-            reconcile_auxiliary_id = 1
-            if res.get("status", "") == "write_off":
-                data = record._recompute_suspense_line(
-                    *record._reconcile_data_by_model(
-                        data, res["model"], reconcile_auxiliary_id
-                    ),
-                    self.manual_reference,
+
+    def _auto_reconcile(self, reconcile_models=None):
+        """Reconcile the statement lines matched by the auto reconcile models.
+
+        The models are fetched once and the candidates of all the lines are
+        searched at once with ``_apply_rules_batch``. When a candidate was
+        already used by a previous line of the batch, the rules are applied
+        again on the current state of the journal items.
+        :return: The reconciled statement lines.
+        """
+        if reconcile_models is None:
+            reconcile_models = self._get_auto_reconcile_models()
+        reconciled = self.browse()
+        if not reconcile_models:
+            return reconciled
+        used_aml_ids = set()
+        for company in self.company_id:
+            records = self.filtered(lambda r, company=company: r.company_id == company)
+            company_models = reconcile_models.filtered(
+                lambda m, company=company: m.company_id == company
+            )
+            partners = {record.id: record._retrieve_partner() for record in records}
+            results = company_models._apply_rules_batch(records, partners=partners)
+            for record in records:
+                res = results[record.id]
+                if res.get("amls") and used_aml_ids.intersection(res["amls"].ids):
+                    res = company_models._apply_rules(record, partners[record.id])
+                if not res:
+                    continue
+                if record._auto_reconcile_from_result(res):
+                    reconciled |= record
+                    if res.get("amls"):
+                        used_aml_ids.update(res["amls"].ids)
+        return reconciled
+
+    def _auto_reconcile_from_result(self, res):
+        """Reconcile the statement line with the result of ``_apply_rules``.
+        :return: True if the statement line has been reconciled.
+        """
+        self.ensure_one()
+        liquidity_lines, _suspense_lines, _other_lines = self._seek_for_lines()
+        data = []
+        for line in liquidity_lines:
+            reconcile_auxiliary_id, lines = self._get_reconcile_line(
+                line,
+                "liquidity",
+                move=True,
+            )
+            data += lines
+        reconcile_auxiliary_id = 1
+        if res.get("status", "") == "write_off":
+            data = self._recompute_suspense_line(
+                *self._reconcile_data_by_model(
+                    data, res["model"], reconcile_auxiliary_id
+                ),
+                self.manual_reference,
+            )
+        elif res.get("amls"):
+            amount = self.amount_currency or self.amount
+            for line in res.get("amls", []):
+                reconcile_auxiliary_id, line_datas = self._get_reconcile_line(
+                    line, "other", is_counterpart=True, max_amount=amount, move=True
                 )
-            elif res.get("amls"):
-                amount = self.amount_currency or self.amount
-                for line in res.get("amls", []):
-                    reconcile_auxiliary_id, line_datas = record._get_reconcile_line(
-                        line, "other", is_counterpart=True, max_amount=amount, move=True
-                    )
-                    amount -= sum(line_data.get("amount") for line_data in line_datas)
-                    data += line_datas
-                data = record._recompute_suspense_line(
-                    data,
-                    reconcile_auxiliary_id,
-                    self.manual_reference,
+                amount -= sum(line_data.get("amount") for line_data in line_datas)
+                data += line_datas
+            data = self._recompute_suspense_line(
+                data,
+                reconcile_auxiliary_id,
+                self.manual_reference,
+            )
+        if not data.get("can_reconcile"):
+            return False
+        getattr(self, f"_reconcile_bank_line_{self.journal_id.reconcile_mode}")(
+            self._prepare_reconcile_line_data(data["data"])
+        )
+        return True
+
+    @api.model
+    def _get_auto_reconcile_batch_size(self):
+        return int(
+            self.env["ir.config_parameter"]
+            .sudo()
+            .get_param(
+                "account_reconcile_oca.auto_reconcile_batch_size",
+                AUTO_RECONCILE_BATCH_SIZE,
+            )
+        )
+
+    def _auto_reconcile_batch(self, reconcile_models):
+        """Auto reconcile a batch of statement lines in a savepoint. When the
+        batch fails, its lines are reconciled one by one so a failing line
+        doesn't block the others.
+        :return: The reconciled statement lines.
+        """
+        try:
+            with self.env.cr.savepoint():
+                return self._auto_reconcile(reconcile_models)
+        except Exception:
+            _logger.exception(
+                "Auto reconciliation of a batch of %s statement lines failed, "
+                "retrying line by line",
+                len(self),
+            )
+            self.env.invalidate_all(flush=False)
+        reconciled = self.browse()
+        for line in self:
+            try:
+                with self.env.cr.savepoint():
+                    reconciled |= line._auto_reconcile(reconcile_models)
+            except Exception:
+                _logger.exception(
+                    "Auto reconciliation of statement line %s failed", line.id
                 )
-            if not data.get("can_reconcile"):
-                continue
-            getattr(record, f"_reconcile_bank_line_{record.journal_id.reconcile_mode}")(
-                self._prepare_reconcile_line_data(data["data"])
+                self.env.invalidate_all(flush=False)
+        return reconciled
+
+    def _auto_reconcile_batches(self, commit=False):
+        """Auto reconcile the statement lines by batches, logging the
+        throughput of each batch.
+        :param commit: Commit the transaction after each batch.
+        :return: The reconciled statement lines.
+        """
+        batch_size = self._get_auto_reconcile_batch_size()
+        reconcile_models = self._get_auto_reconcile_models()
+        reconciled = self.browse()
+        for index in range(0, len(self), batch_size):
+            batch = self[index : index + batch_size]
+            start = time.perf_counter()
+            batch_reconciled = batch._auto_reconcile_batch(reconcile_models)
+            duration = time.perf_counter() - start
+            _logger.info(
+                "Auto reconciled %s of %s statement lines in %.2fs (%.1f lines/s)",
+                len(batch_reconciled),
+                len(batch),
+                duration,
+                len(batch) / duration if duration else 0.0,
             )
-        return result
+            reconciled |= batch_reconciled
+            if commit:
+                self.env.cr.commit()
+            self.env.invalidate_all()
+        return reconciled
+
+    def action_auto_reconcile(self):
+        reconciled = self.filtered(
+            lambda r: not r.is_reconciled
+        )._auto_reconcile_batches()
+        return {
+            "type": "ir.actions.client",
+            "tag": "display_notification",
+            "params": {
+                "type": "success" if reconciled else "warning",
+                "message": _(
+                    "%(reconciled)s of %(total)s statement lines reconciled.",
+                    reconciled=len(reconciled),
+                    total=len(self),
+                ),
+                "next": {"type": "ir.actions.act_window_close"},
+            },
+        }
+
+    @api.model
+    def _cron_auto_reconcile(self):
+        lines = self.search([("is_reconciled", "=", False)], order="date, id")
+        lines._auto_reconcile_batches(commit=not tools.config["test_enable"])
 
     def _synchronize_to_moves(self, changed_fields):
         """We want to avoid to change stuff (mainly amounts ) in accounting entries
@@ -1,6 +1,8 @@
 import time
+from unittest.mock import patch
 
 from odoo import Command
+from odoo.exceptions import UserError
 from odoo.tests import Form, tagged
 
 from odoo.addons.account_reconcile_model_oca.tests.common import (
@@ -629,6 +631,107 @@ class TestReconciliationWidget(TestAccountReconciliationCommon):
         )
         self.assertTrue(bank_stmt_line.is_reconciled)
 
+    def test_auto_reconcile_batches(self):
+        """
+        Testing the bulk auto reconciliation of existing statement lines
+        """
+        bank_stmt = self.acc_bank_stmt_model.create(
+            {
+                "journal_id": self.bank_journal_euro.id,
+                "date": time.strftime("%Y-07-15"),
+                "name": "test",
+            }
+        )
+        bank_stmt_lines = self.acc_bank_stmt_line_model.create(
+            [
+                {
+                    "name": "DEMO WRITEOFF",
+                    "payment_ref": f"DEMO WRITEOFF {index}",
+                    "journal_id": self.bank_journal_euro.id,
+                    "statement_id": bank_stmt.id,
+                    "amount": 100 + index,
+                    "date": time.strftime("%Y-07-15"),
+                }
+                for index in range(3)
+            ]
+        )
+        self.assertFalse(any(bank_stmt_lines.mapped("is_reconciled")))
+        self.env["account.reconcile.model"].create(
+            {
+                "name": "write-off model suggestion",
+                "rule_type": "writeoff_suggestion",
+                "match_label": "contains",
+                "match_label_param": "DEMO WRITEOFF",
+                "auto_reconcile": True,
+                "line_ids": [
+                    Command.create({"account_id": self.current_assets_account.id})
+                ],
+            }
+        )
+        self.env["ir.config_parameter"].sudo().set_param(
+            "account_reconcile_oca.auto_reconcile_batch_size", 2
+        )
+        action = bank_stmt_lines.action_auto_reconcile()
+        self.assertEqual(action["params"]["type"], "success")
+        self.assertTrue(all(bank_stmt_lines.mapped("is_reconciled")))
+
+    def test_auto_reconcile_batches_failing_line(self):
+        """
+        A statement line failing to reconcile doesn't block the other lines
+        of its batch nor the next batches
+        """
+        bank_stmt = self.acc_bank_stmt_model.create(
+            {
+                "journal_id": self.bank_journal_euro.id,
+                "date": time.strftime("%Y-07-15"),
+                "name": "test",
+            }
+        )
+        bank_stmt_lines = self.acc_bank_stmt_line_model.create(
+            [
+                {
+                    "name": "DEMO WRITEOFF",
+                    "payment_ref": f"DEMO WRITEOFF {index}",
+                    "journal_id": self.bank_journal_euro.id,
+                    "statement_id": bank_stmt.id,
+                    "amount": 100 + index,
+                    "date": time.strftime("%Y-07-15"),
+                }
+                for index in range(4)
+            ]
+        )
+        self.env["account.reconcile.model"].create(
+            {
+                "name": "write-off model suggestion",
+                "rule_type": "writeoff_suggestion",
+                "match_label": "contains",
+                "match_label_param": "DEMO WRITEOFF",
+                "auto_reconcile": True,
+                "line_ids": [
+                    Command.create({"account_id": self.current_assets_account.id})
+                ],
+            }
+        )
+        self.env["ir.config_parameter"].sudo().set_param(
+            "account_reconcile_oca.auto_reconcile_batch_size", 2
+        )
+        failing_line = bank_stmt_lines[0]
+        line_class = type(self.acc_bank_stmt_line_model)
+        auto_reconcile_from_result = line_class._auto_reconcile_from_result
+
+        def _auto_reconcile_from_result(record, res):
+            if record == failing_line:
+                raise UserError("Broken statement line")
+            return auto_reconcile_from_result(record, res)
+
+        with patch.object(
+            line_class, "_auto_reconcile_from_result", _auto_reconcile_from_result
+        ):
+            reconciled = bank_stmt_lines._auto_reconcile_batches()
+        self.assertEqual(reconciled, bank_stmt_lines - failing_line)
+        self.assertFalse(failing_line.is_reconciled)
+        self.assertTrue(all((bank_stmt_lines - failing_line).mapped("is_reconciled")))
+
     def test_reconcile_invoice_keep(self):
         """
         We want to test how the keep mode works, keeping the original move lines.
@@ -199,6 +199,7 @@ class OnlineBankStatementProvider(models.Model):
         debug = self.env.context.get("account_statement_online_import_debug")
         debug_data = []
         for provider in self:
+            periods = []
             statement_date_since = provider._get_statement_date_since(date_since)
             while statement_date_since < date_until:
                 # Note that statement_date_until is exclusive, while date_until is
@@ -221,10 +222,10 @@ class OnlineBankStatementProvider(models.Model):
                 if debug:
                     debug_data += data
                 else:
-                    provider._create_or_update_statement(
-                        data, statement_date_since, statement_date_until
-                    )
+                    periods.append((data, statement_date_since, statement_date_until))
                 statement_date_since = statement_date_until
+            if periods:
+                provider._create_or_update_statements(periods)
             if is_scheduled:
                 provider._schedule_next_run()
         return debug_data
@@ -259,8 +260,48 @@ class OnlineBankStatementProvider(models.Model):
             subject=_("Issue with Online Bank Statement self"),
         )
 
+    def _create_or_update_statements(self, periods):
+        """Create or update the bank statements of several periods at once.
+
+        The existing statements of all periods are read in one query, and the
+        statement of a period is used as the previous statement of the next
+        one, so that its start balance does not need another search.
+
+        :param periods: list of (data, statement_date_since, statement_date_until)
+        :return: the created or updated statements
+        """
+        self.ensure_one()
+        AccountBankStatement = self.env["account.bank.statement"]
+        names = [self.make_statement_name(since) for _data, since, _until in periods]
+        existing_statements = {
+            statement.name: statement
+            for statement in AccountBankStatement.search(
+                [("journal_id", "=", self.journal_id.id), ("name", "in", names)]
+            )
+        }
+        statements = AccountBankStatement
+        previous_statement = None
+        for name, (data, since, until) in zip(names, periods):
+            statement = self._create_or_update_statement(
+                data,
+                since,
+                until,
+                previous_statement=previous_statement,
+                statement=existing_statements.get(name, AccountBankStatement),
+            )
+            statements |= statement
+            previous_statement = (
+                statement or existing_statements.get(name) or previous_statement
+            )
+        return statements
+
     def _create_or_update_statement(
-        self, data, statement_date_since, statement_date_until
+        self,
+        data,
+        statement_date_since,
+        statement_date_until,
+        previous_statement=None,
+        statement=None,
     ):
         """Create or update bank statement with the data retrieved from provider.
 
@@ -270,6 +311,10 @@ class OnlineBankStatementProvider(models.Model):
 
         However we can still ensure unique and predictable names, so we wil use that
         to find existing statements.
+
+        previous_statement and statement can be given when they are already
+        known, an empty recordset meaning there is none; they are searched
+        otherwise.
         """
         self.ensure_one()
         if not data:
@@ -292,8 +337,12 @@ class OnlineBankStatementProvider(models.Model):
             statement_values.update(
                 {"line_ids": [[0, False, line] for line in filtered_lines]}
             )
-        self._update_statement_balances(statement_values)
-        statement = self._statement_create_or_write(statement_values)
+        self._update_statement_balances(
+            statement_values, previous_statement=previous_statement
+        )
+        statement = self._statement_create_or_write(
+            statement_values, statement=statement
+        )
         return statement
 
     def make_statement_name(self, statement_date_since):
@@ -304,24 +353,27 @@ class OnlineBankStatementProvider(models.Model):
             statement_date_since.strftime("%Y-%m-%d"),
         )
 
-    def _statement_create_or_write(self, statement_values):
-        """Final creation of statement if new, else write."""
-        AccountBankStatement = self.env["account.bank.statement"]
-        is_scheduled = self.env.context.get("scheduled")
+    def _statement_create_or_write(self, statement_values, statement=None):
+        """Final creation of statement if new, else write.
+
+        The lines are created in a single create, without tracking.
+        """
+        AccountBankStatement = self.env["account.bank.statement"].with_context(
+            tracking_disable=True,
+        )
         if not self.create_statement:
             return self._online_create_statement_lines(statement_values)
-        if is_scheduled:
-            AccountBankStatement = AccountBankStatement.with_context(
-                tracking_disable=True,
+        if statement is None:
+            statement_name = statement_values["name"]
+            statement = AccountBankStatement.search(
+                [
+                    ("journal_id", "=", self.journal_id.id),
+                    ("name", "=", statement_name),
+                ],
+                limit=1,
             )
-        statement_name = statement_values["name"]
-        statement = AccountBankStatement.search(
-            [
-                ("journal_id", "=", self.journal_id.id),
-                ("name", "=", statement_name),
-            ],
-            limit=1,
-        )
+        else:
+            statement = statement.with_context(tracking_disable=True)
         if not statement:
             statement_values["journal_id"] = self.journal_id.id
             statement = AccountBankStatement.with_context(
@@ -332,12 +384,9 @@ class OnlineBankStatementProvider(models.Model):
         return statement
 
     def _online_create_statement_lines(self, statement_values):
-        AccountBankStatementLine = self.env["account.bank.statement.line"]
-        is_scheduled = self.env.context.get("scheduled")
-        if is_scheduled:
-            AccountBankStatementLine = AccountBankStatementLine.with_context(
-                tracking_disable=True,
-            )
+        AccountBankStatementLine = self.env[
+            "account.bank.statement.line"
+        ].with_context(tracking_disable=True)
         lines = [line[2] for line in statement_values.get("line_ids", [])]
         AccountBankStatementLine.create(lines)
         return self.env["account.bank.statement"]  # Return empty statement
@@ -349,11 +398,15 @@ class OnlineBankStatementProvider(models.Model):
         statement_date_since,
         statement_date_until,
     ):
-        """Get lines from line data, but only for the right date."""
-        AccountBankStatementLine = self.env["account.bank.statement.line"]
+        """Get lines from line data, but only for the right date.
+
+        Lines already imported are skipped, their unique_import_id is checked
+        for the whole batch in one query.
+        """
         provider_tz = timezone(self.tz) if self.tz else utc
         journal = self.journal_id
         speeddict = journal._statement_line_import_speeddict()
+        dated_lines = []
         filtered_lines = []
         lines_before_since = 0
         lines_after_until = 0
@@ -385,13 +438,22 @@ class OnlineBankStatementProvider(models.Model):
             journal._statement_line_import_update_unique_import_id(
                 line_values, self.account_number
             )
+            dated_lines.append(line_values)
+        imported_ids = self._get_imported_unique_ids(
+            {
+                line["unique_import_id"]
+                for line in dated_lines
+                if line.get("unique_import_id")
+            }
+        )
+        for line_values in dated_lines:
             unique_import_id = line_values.get("unique_import_id")
             if unique_import_id:
-                if AccountBankStatementLine.sudo().search(
-                    [("unique_import_id", "=", unique_import_id)], limit=1
-                ):
+                if unique_import_id in imported_ids:
                     lines_not_unique += 1
                     continue
+                # Also skip the duplicates within the batch
+                imported_ids.add(unique_import_id)
             if not line_values.get("payment_ref"):
                 line_values["payment_ref"] = line_values.get("ref")
             line_values["journal_id"] = self.journal_id.id
@@ -419,20 +481,38 @@ class OnlineBankStatementProvider(models.Model):
                 )
         return filtered_lines
 
-    def _update_statement_balances(self, statement_values):
-        """Update statement balance_ start/end/end_real."""
+    def _get_imported_unique_ids(self, unique_import_ids):
+        """Return the unique_import_ids already imported, in one query."""
+        if not unique_import_ids:
+            return set()
+        lines = (
+            self.env["account.bank.statement.line"]
+            .sudo()
+            .search_fetch(
+                [("unique_import_id", "in", list(unique_import_ids))],
+                ["unique_import_id"],
+            )
+        )
+        return set(lines.mapped("unique_import_id"))
+
+    def _update_statement_balances(self, statement_values, previous_statement=None):
+        """Update statement balance_ start/end/end_real.
+
+        previous_statement is searched when not given.
+        """
         AccountBankStatement = self.env["account.bank.statement"]
         if "balance_start" in statement_values:
             statement_values["balance_start"] = float(statement_values["balance_start"])
         else:
             # Take balance_end of previous statement as start of this one.
-            previous_statement = AccountBankStatement.search(
-                [
-                    ("journal_id", "=", self.journal_id.id),
-                    ("name", "<", statement_values["name"]),
-                ],
-                limit=1,
-            )
+            if previous_statement is None:
+                previous_statement = AccountBankStatement.search(
+                    [
+                        ("journal_id", "=", self.journal_id.id),
+                        ("name", "<", statement_values["name"]),
+                    ],
+                    limit=1,
+                )
             if previous_statement and previous_statement.balance_end:
                 statement_values["balance_start"] = previous_statement.balance_end
         if "balance_end_real" in statement_values:
@@ -390,6 +390,14 @@ class TestAccountBankAccountStatementImportOnline(common.TransactionCase):
         self.assertEqual(statements[1].balance_end, 200)
         self.assertEqual(len(statements[1].line_ids), 1)
 
+    def test_pull_skip_duplicates_within_batch(self):
+        lines, statement_values = self._get_statement_line_data(date(2021, 8, 10))
+        with mock.patch(mock_obtain_statement_data) as mock_data:
+            mock_data.side_effect = [(lines + [dict(lines[0])], statement_values)]
+            self.provider._pull(datetime(2021, 8, 10), datetime(2021, 8, 11))
+        self._getExpectedStatements(1)
+        self._getExpectedLines(1)
+
     def test_dont_create_statement(self):
         self.provider.statement_creation_mode = "monthly"
         self.provider.create_statement = False
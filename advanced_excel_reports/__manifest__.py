@@ -32,7 +32,10 @@
     'website': "https://www.cybrosys.com",
     'depends': ['sale_management', 'account', 'stock'],
     'data': [
-        'data/ir_action_data.xml'
+        'security/ir.model.access.csv',
+        'security/excel_report_job_security.xml',
+        'data/ir_action_data.xml',
+        'data/ir_cron_data.xml',
     ],
     'assets':
         {
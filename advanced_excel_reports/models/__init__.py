@@ -19,6 +19,8 @@
 #    If not, see <http://www.gnu.org/licenses/>.
 #
 #############################################################################
+from . import excel_report_mixin
+from . import excel_report_job
 from . import account_move
 from . import sale_order
 from . import stock_picking
@@ -19,126 +19,131 @@
 #    If not, see <http://www.gnu.org/licenses/>.
 #
 #############################################################################
-import io
-import json
-import xlsxwriter
-from odoo import models
-from odoo.tools import json_default
+from odoo import models, _
 
 
 class AccountMove(models.Model):
     """ Added function for printing excel report
             which is coming from a server action """
-    _inherit = "account.move"
+    _name = "account.move"
+    _inherit = ["account.move", "excel.report.mixin"]
 
-    def print_excel_report(self):
-        """ Function is used to print the Excel report
-            It will pass the invoice data through js file to
-            print Excel file"""
-        # Take the ids of the selected invoices
-        data = self._context['active_ids']
-        return {
-            'type': 'ir.actions.report',
-            'report_type': 'xlsx',
-            'data': {'model': 'account.move',
-                     'output_format': 'xlsx',
-                     'options': json.dumps(data,
-                                           default=json_default),
-                     'report_name': 'Invoice Excel Report', }, }
+    def _get_excel_report_name(self):
+        """ Return the name of the report file """
+        return _('Invoice Excel Report')
 
-    def get_xlsx_report(self, datas, response):
-        """ From this function we can create and design the Excel file template
-         and the map the values in the corresponding cells
-         :param datas: Selected record ids
-         :param response: Response after creating excel
+    def _get_excel_report_prefetch(self):
+        """ Return the fields of the invoices and their lines used in the
+            report """
+        return [
+            ('', ['name', 'move_type', 'company_id', 'payment_reference',
+                  'invoice_payment_term_id', 'fiscal_position_id', 'user_id',
+                  'invoice_incoterm_id', 'invoice_date', 'currency_id',
+                  'partner_id', 'journal_id', 'state', 'amount_total',
+                  'invoice_line_ids']),
+            ('company_id', ['name']),
+            ('invoice_payment_term_id', ['name']),
+            ('fiscal_position_id', ['name']),
+            ('user_id', ['partner_id']),
+            ('user_id.partner_id', ['name']),
+            ('invoice_incoterm_id', ['name']),
+            ('currency_id', ['name', 'symbol']),
+            ('journal_id', ['name']),
+            ('partner_id', ['name', 'street', 'state_id', 'zip',
+                            'country_id', 'phone']),
+            ('partner_id.state_id', ['name']),
+            ('partner_id.country_id', ['name']),
+            ('invoice_line_ids', ['product_id', 'name', 'quantity',
+                                  'account_id', 'discount', 'price_unit',
+                                  'tax_ids', 'price_subtotal']),
+            ('invoice_line_ids.product_id', ['product_tmpl_id']),
+            ('invoice_line_ids.product_id.product_tmpl_id', ['name']),
+            ('invoice_line_ids.account_id', ['code', 'name']),
+            ('invoice_line_ids.tax_ids', ['name']),
+        ]
+
+    def _write_excel_sheet(self, workbook, formats):
+        """ Design the sheet of the invoice and map the values in the
+            corresponding cells
+         :param workbook: Workbook where the sheet is added
+         :param formats: Cell formats of the workbook
          """
-        output = io.BytesIO()
-        workbook = xlsxwriter.Workbook(output, {'in_memory': True})
-        # for printing multiple sheet per file, iterate the invoices
-        for account_move in self.env['account.move'].browse(datas):
-            # Set file title as invoice when it is invoice and set bill
-            # if the move_type is out_invoice
-            account_name = 'INVOICE - ' + account_move.name if \
-                account_move.move_type == 'out_invoice' else \
-                'VENDOR BILL - ' + account_move.name
-            company_name = 'Company Name : ' + account_move.company_id.name
-            # Copy the value to a variable set black if it is null
-            # instead of printing 'FALSE' in the report
-            ref = str(
-                account_move.payment_reference) if \
-                account_move.payment_reference is not False else ''
-            # Copy the value to a variable set black if it is null
-            # instead of printing 'FALSE' in the report
-            payment_term = str(
-                account_move.invoice_payment_term_id.name) if \
-                account_move.invoice_payment_term_id.name is not False else ''
-            # Copy the value to a variable set black if it is null instead
-            # of printing 'FALSE' in the report
-            fiscal_position = str(
-                account_move.fiscal_position_id.name) if \
-                account_move.fiscal_position_id.name is not False else ''
-            # Copy the value to a variable set black if it is null
-            # instead of printing 'FALSE' in the report
-            sale_person = account_move.user_id.name if \
-                account_move.user_id.name is not False else ''
-            # Copy the value to a variable set black if it is null
-            # instead of printing 'FALSE' in the report
-            incoterm = account_move.invoice_incoterm_id.name if \
-                account_move.invoice_incoterm_id.name is not False else ''
-            invoice_date = str(account_move.invoice_date)
-            currency_symbol = account_move.currency_id.symbol
-            sheet = workbook.add_worksheet(
-                account_move.name)  # Set sheet name as Invoice/Bill name
-            sheet.set_column(0, 8, 20)
-            head = workbook.add_format(
-                {'align': 'center', 'bold': True, 'font_size': '20px'})
-            txt = workbook.add_format(
-                {'align': 'center', 'bold': True})
-            txt_border = workbook.add_format(
-                {'align': 'center', 'bold': True, 'border': 1})
-            border = workbook.add_format({'border': 1})
-            sheet.merge_range('B2:E3', account_name, head)
-            sheet.merge_range('B4:E4', company_name, txt)
-            sheet.write('A6', 'Customer/Vendor Name', txt)
-            sheet.write('B6', account_move.partner_id.name)
-            sheet.write('B7', account_move.partner_id.street)
-            sheet.write('B8', account_move.partner_id.state_id.name)
-            sheet.write('B9', account_move.partner_id.zip)
-            sheet.write('B10', account_move.partner_id.country_id.name)
-            sheet.write('B11', account_move.partner_id.phone)
-            sheet.write('D6', 'Date', txt)
-            sheet.write('D7', 'Payment Term', txt)
-            sheet.write('D8', 'Journal', txt)
-            sheet.write('D9', 'Currency', txt)
-            sheet.write('D10', 'State', txt)
-            sheet.write('E6', invoice_date)
-            sheet.write('E7', payment_term)
-            sheet.write('E8', account_move.journal_id.name)
-            sheet.write('E9', account_move.currency_id.name)
-            sheet.write('E10', account_move.state)
-            sheet.write('A13', 'Sales Persons', txt)
-            sheet.write('A14', sale_person)
-            sheet.write('B13', 'Source Document', txt)
-            sheet.write('B14', ref)
-            sheet.write('C13', 'Fiscal Position', txt)
-            sheet.write('C14', fiscal_position)
-            sheet.write('D13', 'Incoterm', txt)
-            sheet.write('D14', incoterm)
-            sheet.write('A16', 'Product', txt_border)
-            sheet.write('B16', 'Description', txt_border)
-            sheet.write('C16', 'Quantity', txt_border)
-            sheet.write('D16', 'Account', txt_border)
-            sheet.write('E16', 'Discount %', txt_border)
-            sheet.write('F16', 'Unit Price', txt_border)
-            sheet.write('G16', 'Tax', txt_border)
-            sheet.write('H16', 'Subtotal', txt_border)
-            row = 17
-            self._add_invoice_line_to_excel(sheet, account_move, row, border, txt_border,
-                               currency_symbol)
-        workbook.close()
-        output.seek(0)
-        response.stream.write(output.read())
-        output.close()
+        account_move = self
+        # Set file title as invoice when it is invoice and set bill
+        # if the move_type is out_invoice
+        account_name = 'INVOICE - ' + account_move.name if \
+            account_move.move_type == 'out_invoice' else \
+            'VENDOR BILL - ' + account_move.name
+        company_name = 'Company Name : ' + account_move.company_id.name
+        # Copy the value to a variable set black if it is null
+        # instead of printing 'FALSE' in the report
+        ref = str(
+            account_move.payment_reference) if \
+            account_move.payment_reference is not False else ''
+        # Copy the value to a variable set black if it is null
+        # instead of printing 'FALSE' in the report
+        payment_term = str(
+            account_move.invoice_payment_term_id.name) if \
+            account_move.invoice_payment_term_id.name is not False else ''
+        # Copy the value to a variable set black if it is null instead
+        # of printing 'FALSE' in the report
+        fiscal_position = str(
+            account_move.fiscal_position_id.name) if \
+            account_move.fiscal_position_id.name is not False else ''
+        # Copy the value to a variable set black if it is null
+        # instead of printing 'FALSE' in the report
+        sale_person = account_move.user_id.name if \
+            account_move.user_id.name is not False else ''
+        # Copy the value to a variable set black if it is null
+        # instead of printing 'FALSE' in the report
+        incoterm = account_move.invoice_incoterm_id.name if \
+            account_move.invoice_incoterm_id.name is not False else ''
+        invoice_date = str(account_move.invoice_date)
+        currency_symbol = account_move.currency_id.symbol
+        sheet = workbook.add_worksheet(self._get_excel_sheet_name(
+            workbook, account_move.name))  # Set sheet name as Invoice/Bill name
+        sheet.set_column(0, 8, 20)
+        txt = formats['txt']
+        txt_border = formats['txt_border']
+        sheet.merge_range('B2:E3', account_name, formats['head'])
+        sheet.merge_range('B4:E4', company_name, txt)
+        sheet.write('A6', 'Customer/Vendor Name', txt)
+        sheet.write('B6', account_move.partner_id.name)
+        sheet.write('B7', account_move.partner_id.street)
+        sheet.write('B8', account_move.partner_id.state_id.name)
+        sheet.write('B9', account_move.partner_id.zip)
+        sheet.write('B10', account_move.partner_id.country_id.name)
+        sheet.write('B11', account_move.partner_id.phone)
+        sheet.write('D6', 'Date', txt)
+        sheet.write('D7', 'Payment Term', txt)
+        sheet.write('D8', 'Journal', txt)
+        sheet.write('D9', 'Currency', txt)
+        sheet.write('D10', 'State', txt)
+        sheet.write('E6', invoice_date)
+        sheet.write('E7', payment_term)
+        sheet.write('E8', account_move.journal_id.name)
+        sheet.write('E9', account_move.currency_id.name)
+        sheet.write('E10', account_move.state)
+        sheet.write('A13', 'Sales Persons', txt)
+        sheet.write('A14', sale_person)
+        sheet.write('B13', 'Source Document', txt)
+        sheet.write('B14', ref)
+        sheet.write('C13', 'Fiscal Position', txt)
+        sheet.write('C14', fiscal_position)
+        sheet.write('D13', 'Incoterm', txt)
+        sheet.write('D14', incoterm)
+        sheet.write('A16', 'Product', txt_border)
+        sheet.write('B16', 'Description', txt_border)
+        sheet.write('C16', 'Quantity', txt_border)
+        sheet.write('D16', 'Account', txt_border)
+        sheet.write('E16', 'Discount %', txt_border)
+        sheet.write('F16', 'Unit Price', txt_border)
+        sheet.write('G16', 'Tax', txt_border)
+        sheet.write('H16', 'Subtotal', txt_border)
+        row = 17
+        self._add_invoice_line_to_excel(sheet, account_move, row,
+                                        formats['border'], txt_border,
+                                        currency_symbol)
 
     def _add_invoice_line_to_excel(self, sheet, account_move, row, border, txt_border,
                       currency_symbol):
@@ -153,9 +158,7 @@ class AccountMove(models.Model):
         """
         for line in account_move.invoice_line_ids:
             # For adding value of the invoice lines
-            tax = str(
-                line.tax_ids.name) if line.tax_ids.name \
-                                      is not False else ''
+            tax = ', '.join(line.tax_ids.mapped('name'))
             sheet.write(row, 0, line.product_id.name, border)
             sheet.write(row, 1, line.name, border)
             sheet.write(row, 2, line.quantity, border)
@@ -172,3 +175,22 @@ class AccountMove(models.Model):
         sheet.write(row, 7,
                     str(currency_symbol) + str(account_move.amount_total),
                     border)
+
+    def _get_excel_table_header(self):
+        """ Return the column titles of the single sheet layout """
+        return ['Number', 'Customer/Vendor Name', 'Date', 'Currency', 'State',
+                'Product', 'Description', 'Quantity', 'Account', 'Discount %',
+                'Unit Price', 'Tax', 'Subtotal']
+
+    def _get_excel_table_rows(self):
+        """ Return one row per invoice line in the single sheet layout """
+        self.ensure_one()
+        invoice = [self.name, self.partner_id.name or '',
+                   str(self.invoice_date or ''), self.currency_id.name,
+                   self.state]
+        return [invoice + [line.product_id.name or '', line.name or '',
+                           line.quantity, line.account_id.display_name or '',
+                           line.discount, line.price_unit,
+                           ', '.join(line.tax_ids.mapped('name')),
+                           line.price_subtotal]
+                for line in self.invoice_line_ids] or [invoice]
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+#############################################################################
+#
+#    Cybrosys Technologies Pvt. Ltd.
+#
+#    Copyright (C) 2024-TODAY Cybrosys Technologies(<https://www.cybrosys.com>)
+#    Author: Cybrosys Techno Solutions(<https://www.cybrosys.com>)
+#
+#    You can modify it under the terms of the GNU LESSER
+#    GENERAL PUBLIC LICENSE (LGPL v3), Version 3.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU LESSER GENERAL PUBLIC LICENSE (LGPL v3) for more details.
+#
+#    You should have received a copy of the GNU LESSER GENERAL PUBLIC LICENSE
+#    (LGPL v3) along with this program.
+#    If not, see <http://www.gnu.org/licenses/>.
+#
+#############################################################################
+import base64
+import io
+import json
+import logging
+import zipfile
+from odoo import api, fields, models, _
+from odoo.tools import split_every
+
+_logger = logging.getLogger(__name__)
+
+# Documents per workbook of the zip file
+WORKBOOK_SIZE = 100
+
+
+class ExcelReportJob(models.Model):
+    """ Excel report of a large selection, made in background as a zip file
+        of workbooks and sent to the inbox of the user """
+    _name = 'excel.report.job'
+    _description = 'Excel Report Job'
+    _inherit = ['mail.thread']
+    _order = 'id desc'
+
+    name = fields.Char(string='Name', compute='_compute_name', store=True,
+                       help='Name of the report')
+    model_name = fields.Char(string='Model', required=True,
+                             help='Model of the documents of the report')
+    record_ids = fields.Text(string='Records', required=True,
+                             help='Ids of the documents of the report')
+    layout = fields.Selection([('sheets', 'One Sheet per Document'),
+                               ('table', 'Single Sheet')],
+                              string='Layout', default='sheets',
+                              required=True, help='Layout of the workbooks')
+    user_id = fields.Many2one('res.users', string='User', required=True,
+                              default=lambda self: self.env.user,
+                              help='User requesting the report')
+    state = fields.Selection([('pending', 'Pending'), ('done', 'Done'),
+                              ('failed', 'Failed')], string='State',
+                             default='pending', required=True,
+                             help='State of the report')
+    attachment_id = fields.Many2one('ir.attachment', string='Report',
+                                    help='Zip file of the workbooks')
+    error = fields.Text(string='Error', help='Error of the failed report')
+
+    @api.depends('model_name')
+    def _compute_name(self):
+        """ Name the job after the report of its model """
+        for job in self:
+            job.name = job.model_name and self.env[
+                job.model_name]._get_excel_report_name()
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        """ Start the report in background """
+        jobs = super().create(vals_list)
+        self.env.ref(
+            'advanced_excel_reports.ir_cron_process_excel_report_jobs'
+        )._trigger()
+        return jobs
+
+    @api.model
+    def _cron_process_jobs(self):
+        """ Make the pending reports """
+        for job in self.search([('state', '=', 'pending')]):
+            try:
+                with self.env.cr.savepoint():
+                    job._process()
+            except Exception as error:
+                _logger.exception('Excel report job %s failed', job.id)
+                job.write({'state': 'failed', 'error': str(error)})
+
+    def _process(self):
+        """ Write the workbooks of the documents, WORKBOOK_SIZE documents
+            each, in a zip file and send it to the user """
+        self.ensure_one()
+        records = self.env[self.model_name].with_user(self.user_id).browse(
+            json.loads(self.record_ids)).exists()
+        report_name = records._get_excel_report_name()
+        output = io.BytesIO()
+        with zipfile.ZipFile(output, 'w', zipfile.ZIP_DEFLATED) as archive:
+            for index, ids in enumerate(split_every(WORKBOOK_SIZE, records.ids),
+                                        1):
+                workbook = io.BytesIO()
+                records.browse(ids)._write_excel_workbook(workbook,
+                                                          self.layout)
+                archive.writestr('%s %s.xlsx' % (report_name, index),
+                                 workbook.getvalue())
+                # Release the documents already written from the cache
+                self.env.invalidate_all()
+        attachment = self.env['ir.attachment'].create({
+            'name': '%s.zip' % report_name,
+            'datas': base64.b64encode(output.getvalue()),
+            'mimetype': 'application/zip',
+            'res_model': self._name,
+            'res_id': self.id,
+        })
+        self.write({'state': 'done', 'attachment_id': attachment.id})
+        self.message_notify(
+            partner_ids=self.user_id.partner_id.ids,
+            subject=report_name,
+            body=_('The report of the %s selected records is ready.',
+                   len(records)),
+            attachment_ids=attachment.ids,
+        )
@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+#############################################################################
+#
+#    Cybrosys Technologies Pvt. Ltd.
+#
+#    Copyright (C) 2024-TODAY Cybrosys Technologies(<https://www.cybrosys.com>)
+#    Author: Cybrosys Techno Solutions(<https://www.cybrosys.com>)
+#
+#    You can modify it under the terms of the GNU LESSER
+#    GENERAL PUBLIC LICENSE (LGPL v3), Version 3.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU LESSER GENERAL PUBLIC LICENSE (LGPL v3) for more details.
+#
+#    You should have received a copy of the GNU LESSER GENERAL PUBLIC LICENSE
+#    (LGPL v3) along with this program.
+#    If not, see <http://www.gnu.org/licenses/>.
+#
+#############################################################################
+import json
+import re
+import xlsxwriter
+from odoo import api, models, _
+from odoo.tools import json_default
+
+# Selections larger than this are exported in background as a zip file
+BACKGROUND_LIMIT = 200
+INVALID_SHEET_CHARS = re.compile(r'[\[\]:*?/\\]')
+
+
+class ExcelReportMixin(models.AbstractModel):
+    """ Batched rendering of the Excel reports of the documents. The
+        documents inheriting it give the fields to prefetch, the sheet of one
+        document and the rows of the single sheet layout """
+    _name = 'excel.report.mixin'
+    _description = 'Excel Report Mixin'
+
+    def _get_excel_report_name(self):
+        """ Return the name of the report file """
+        return _('Excel Report')
+
+    def _get_excel_report_prefetch(self):
+        """ Return the fields to prefetch for the report, as a list of
+            (path, field names) where path is the relation from the documents
+            to the records to prefetch, empty for the documents themselves.
+            Each path is read in one query for the whole selection """
+        return []
+
+    def _write_excel_sheet(self, workbook, formats):
+        """ Write the sheet of one document, by default the rows of the
+            single sheet layout in a sheet named after the document
+        :param workbook: Workbook where the sheet is added
+        :param formats: Cell formats of the workbook
+        """
+        sheet = workbook.add_worksheet(self._get_excel_sheet_name(
+            workbook, self.display_name))
+        self._write_excel_table_header(sheet, formats)
+        self._write_excel_table_rows(sheet, formats)
+
+    def _get_excel_table_header(self):
+        """ Return the column titles of the single sheet layout """
+        return []
+
+    def _get_excel_table_rows(self):
+        """ Return the rows of one document in the single sheet layout """
+        return []
+
+    def print_excel_report(self):
+        """ Function is used to print the Excel report
+            It will pass the selected record ids through js file to print
+            Excel file, or create a background job returning a zip file for
+            large selections"""
+        # Take the ids of the selected records
+        record_ids = self._context['active_ids']
+        layout = self._context.get('excel_report_layout', 'sheets')
+        background_limit = int(self.env['ir.config_parameter'].sudo(
+        ).get_param('advanced_excel_reports.background_limit',
+                    BACKGROUND_LIMIT))
+        if len(record_ids) > background_limit:
+            self.env['excel.report.job'].create({
+                'model_name': self._name,
+                'record_ids': json.dumps(record_ids),
+                'layout': layout,
+            })
+            return {
+                'type': 'ir.actions.client',
+                'tag': 'display_notification',
+                'params': {
+                    'message': _('The report of the %s records is prepared in '
+                                 'background, you will find it in your inbox.',
+                                 len(record_ids)),
+                    'type': 'info',
+                    'sticky': False,
+                }
+            }
+        return {
+            'type': 'ir.actions.report',
+            'report_type': 'xlsx',
+            'data': {'model': self._name,
+                     'output_format': 'xlsx',
+                     'options': json.dumps({'ids': record_ids,
+                                            'layout': layout},
+                                           default=json_default),
+                     'report_name': self._get_excel_report_name(), }, }
+
+    def get_xlsx_report(self, datas, response):
+        """ Write the report of the selected records to the response
+         :param datas: Selected record ids, or a dictionary of the ids and
+            the layout
+         :param response: Response after creating excel
+         """
+        if isinstance(datas, dict):
+            records = self.browse(datas['ids'])
+            layout = datas.get('layout', 'sheets')
+        else:
+            records = self.browse(datas)
+            layout = 'sheets'
+        records._write_excel_workbook(response.stream, layout)
+
+    @api.model
+    def _get_excel_formats(self, workbook):
+        """ Create the cell formats once per workbook, they are shared by all
+            the sheets """
+        return {
+            'head': workbook.add_format(
+                {'align': 'center', 'bold': True, 'font_size': '20px'}),
+            'txt': workbook.add_format({'align': 'center', 'bold': True}),
+            'txt_border': workbook.add_format(
+                {'align': 'center', 'bold': True, 'border': 1}),
+            'border': workbook.add_format({'border': 1}),
+        }
+
+    @api.model
+    def _get_excel_sheet_name(self, workbook, name):
+        """ Return a sheet name accepted by Excel: without the forbidden
+            characters, at most 31 characters long and unique in the
+            workbook """
+        name = INVALID_SHEET_CHARS.sub('-', name or '')[:31] or 'Sheet'
+        sheet_name, index = name, 1
+        while workbook.get_worksheet_by_name(sheet_name):
+            index += 1
+            suffix = ' (%s)' % index
+            sheet_name = name[:31 - len(suffix)] + suffix
+        return sheet_name
+
+    def _prefetch_excel_report(self):
+        """ Read all the fields used by the report for all the documents,
+            one query per related model instead of one per document """
+        for path, field_names in self._get_excel_report_prefetch():
+            records = self.mapped(path) if path else self
+            # The other fields are computed, in batch, when read
+            records.fetch([name for name in field_names
+                           if records._fields[name].store])
+
+    @api.model
+    def _write_excel_table_header(self, sheet, formats):
+        """ Write the column titles of the single sheet layout in the first
+            row of sheet """
+        header = self._get_excel_table_header()
+        if header:
+            sheet.set_column(0, len(header) - 1, 20)
+        for col, title in enumerate(header):
+            sheet.write(0, col, title, formats['txt_border'])
+
+    def _write_excel_table_rows(self, sheet, formats):
+        """ Write the rows of the documents below the column titles """
+        row = 1
+        for record in self:
+            for values in record._get_excel_table_rows():
+                for col, value in enumerate(values):
+                    sheet.write(row, col, value, formats['border'])
+                row += 1
+
+    def _write_excel_workbook(self, output, layout='sheets'):
+        """ Write the workbook of the documents to output
+        :param output: File object receiving the workbook
+        :param layout: 'sheets' for one sheet per document, 'table' for a
+            single sheet with one row per document line
+        """
+        workbook = xlsxwriter.Workbook(output, {'in_memory': True})
+        formats = self._get_excel_formats(workbook)
+        self._prefetch_excel_report()
+        if layout == 'table':
+            sheet = workbook.add_worksheet(self._get_excel_sheet_name(
+                workbook, self._get_excel_report_name()))
+            self._write_excel_table_header(sheet, formats)
+            self._write_excel_table_rows(sheet, formats)
+        else:
+            # for printing multiple sheet per file, iterate the documents
+            for record in self:
+                record._write_excel_sheet(workbook, formats)
+        workbook.close()
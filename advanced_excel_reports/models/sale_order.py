@@ -19,113 +19,116 @@
 #    If not, see <http://www.gnu.org/licenses/>.
 #
 #############################################################################
-import io
-import json
-import xlsxwriter
-from odoo import models
-from odoo.tools import json_default
+from odoo import models, _
 
 
 class SaleOrder(models.Model):
     """ Added a function that to print sale order excel report
             which is added through server action """
-    _inherit = "sale.order"
+    _name = "sale.order"
+    _inherit = ["sale.order", "excel.report.mixin"]
 
-    def print_excel_report(self):
-        """ Function is used to print the Excel report
-                    It will pass the sale order data through js file to
-                    print Excel file"""
-        # Take the ids of the selected sale orders
-        data = self._context['active_ids']
-        return {
-            'type': 'ir.actions.report',
-            'report_type': 'xlsx',
-            'data': {'model': 'sale.order',
-                     'output_format': 'xlsx',
-                     'options': json.dumps(data,
-                                           default=json_default),
-                     'report_name': 'Sale/Quotation Excel Report', }, }
+    def _get_excel_report_name(self):
+        """ Return the name of the report file """
+        return _('Sale/Quotation Excel Report')
 
-    def get_xlsx_report(self, datas, response):
-        """ From this function we can create and design the Excel file template
-                 and the map the values in the corresponding cells
-            :param datas:Selected record ids
-            :param response: Response after creating excel
+    def _get_excel_report_prefetch(self):
+        """ Return the fields of the sale orders and their lines used in the
+            report """
+        return [
+            ('', ['name', 'company_id', 'client_order_ref', 'payment_term_id',
+                  'fiscal_position_id', 'date_order', 'currency_id',
+                  'partner_id', 'pricelist_id', 'state', 'team_id', 'user_id',
+                  'amount_total', 'order_line']),
+            ('company_id', ['name']),
+            ('payment_term_id', ['name']),
+            ('fiscal_position_id', ['name']),
+            ('currency_id', ['name', 'symbol']),
+            ('pricelist_id', ['name']),
+            ('team_id', ['name']),
+            ('user_id', ['partner_id']),
+            ('user_id.partner_id', ['name']),
+            ('partner_id', ['name', 'street', 'state_id', 'zip',
+                            'country_id', 'phone']),
+            ('partner_id.state_id', ['name']),
+            ('partner_id.country_id', ['name']),
+            ('order_line', ['product_id', 'name', 'product_uom_qty',
+                            'qty_delivered', 'qty_invoiced', 'price_unit',
+                            'tax_id', 'price_subtotal']),
+            ('order_line.product_id', ['product_tmpl_id']),
+            ('order_line.product_id.product_tmpl_id', ['name']),
+            ('order_line.tax_id', ['name']),
+        ]
+
+    def _write_excel_sheet(self, workbook, formats):
+        """ Design the sheet of the sale order and map the values in the
+            corresponding cells
+            :param workbook: Workbook where the sheet is added
+            :param formats: Cell formats of the workbook
         """
-        output = io.BytesIO()
-        workbook = xlsxwriter.Workbook(output, {'in_memory': True})
-        # for printing multiple sheet per file, iterate the sale orders
-        for sale in self.env['sale.order'].browse(datas):
-            sale_name = 'SALE ORDER - ' + sale.name
-            company_name = 'Company Name : ' + sale.company_id.name
-            # Copy the value to a variable set black if it is null
-            # instead of printing 'FALSE' in the report
-            ref = str(
-                sale.client_order_ref) if \
-                sale.client_order_ref is not False else ''
-            # Copy the value to a variable set black if it is null instead
-            # of printing 'FALSE' in the report
-            payment_term = str(
-                sale.payment_term_id.name) if \
-                sale.payment_term_id.name is not False else ''
-            # Copy the value to a variable set black if it is null instead
-            # of printing 'FALSE' in the report
-            fiscal_position = str(
-                sale.fiscal_position_id.name) if \
-                sale.fiscal_position_id.name is not False else ''
-            sheet = workbook.add_worksheet(
-                sale.name)  # set the sheet name as sale order name
-            sheet.set_column(0, 8, 20)
-            sale_date = str(sale.date_order)
-            currency_symbol = sale.currency_id.symbol
-            head = workbook.add_format(
-                {'align': 'center', 'bold': True, 'font_size': '20px'})
-            txt = workbook.add_format({'align': 'center', 'bold': True})
-            txt_border = workbook.add_format(
-                {'align': 'center', 'bold': True, 'border': 1})
-            border = workbook.add_format({'border': 1})
-            sheet.merge_range('B2:E3', sale_name, head)
-            sheet.merge_range('B4:E4', company_name, txt)
-            sheet.write('A6', 'Customer Name', txt)
-            sheet.write('B6', sale.partner_id.name)
-            sheet.write('B7', sale.partner_id.street)
-            sheet.write('B8', sale.partner_id.state_id.name)
-            sheet.write('B9', sale.partner_id.zip)
-            sheet.write('B10', sale.partner_id.country_id.name)
-            sheet.write('B11', sale.partner_id.phone)
-            sheet.write('D6', 'Date', txt)
-            sheet.write('D7', 'Payment Term', txt)
-            sheet.write('D8', 'Price List', txt)
-            sheet.write('D9', 'State', txt)
-            sheet.write('E6', sale_date)
-            sheet.write('E7', payment_term)
-            sheet.write('E8', sale.pricelist_id.name)
-            sheet.write('E9', sale.state)
-            sheet.write('A13', 'Sales Team', txt)
-            sheet.write('A14', sale.team_id.name)
-            sheet.write('B13', 'Sales Persons', txt)
-            sheet.write('B14', sale.user_id.name)
-            sheet.write('C13', 'Source Document', txt)
-            sheet.write('C14', ref)
-            sheet.write('D13', 'Fiscal Position', txt)
-            sheet.write('D14', fiscal_position)
-            sheet.write('A16', 'Product', txt_border)
-            sheet.write('B16', 'Description', txt_border)
-            sheet.write('C16', 'Quantity', txt_border)
-            sheet.write('D16', 'Delivered', txt_border)
-            sheet.write('E16', 'Invoiced', txt_border)
-            sheet.write('F16', 'Unit Price', txt_border)
-            sheet.write('G16', 'Tax', txt_border)
-            sheet.write('H16', 'Subtotal', txt_border)
-            row = 17
-            # calling this function for adding sale order line data to the
-            # Excel sheet
-            self._add_order_line_to_excel(sheet, sale, row, border, txt_border,
-                                          currency_symbol)
-        workbook.close()
-        output.seek(0)
-        response.stream.write(output.read())
-        output.close()
+        sale = self
+        sale_name = 'SALE ORDER - ' + sale.name
+        company_name = 'Company Name : ' + sale.company_id.name
+        # Copy the value to a variable set black if it is null
+        # instead of printing 'FALSE' in the report
+        ref = str(
+            sale.client_order_ref) if \
+            sale.client_order_ref is not False else ''
+        # Copy the value to a variable set black if it is null instead
+        # of printing 'FALSE' in the report
+        payment_term = str(
+            sale.payment_term_id.name) if \
+            sale.payment_term_id.name is not False else ''
+        # Copy the value to a variable set black if it is null instead
+        # of printing 'FALSE' in the report
+        fiscal_position = str(
+            sale.fiscal_position_id.name) if \
+            sale.fiscal_position_id.name is not False else ''
+        sheet = workbook.add_worksheet(self._get_excel_sheet_name(
+            workbook, sale.name))  # set the sheet name as sale order name
+        sheet.set_column(0, 8, 20)
+        sale_date = str(sale.date_order)
+        currency_symbol = sale.currency_id.symbol
+        txt = formats['txt']
+        txt_border = formats['txt_border']
+        sheet.merge_range('B2:E3', sale_name, formats['head'])
+        sheet.merge_range('B4:E4', company_name, txt)
+        sheet.write('A6', 'Customer Name', txt)
+        sheet.write('B6', sale.partner_id.name)
+        sheet.write('B7', sale.partner_id.street)
+        sheet.write('B8', sale.partner_id.state_id.name)
+        sheet.write('B9', sale.partner_id.zip)
+        sheet.write('B10', sale.partner_id.country_id.name)
+        sheet.write('B11', sale.partner_id.phone)
+        sheet.write('D6', 'Date', txt)
+        sheet.write('D7', 'Payment Term', txt)
+        sheet.write('D8', 'Price List', txt)
+        sheet.write('D9', 'State', txt)
+        sheet.write('E6', sale_date)
+        sheet.write('E7', payment_term)
+        sheet.write('E8', sale.pricelist_id.name)
+        sheet.write('E9', sale.state)
+        sheet.write('A13', 'Sales Team', txt)
+        sheet.write('A14', sale.team_id.name)
+        sheet.write('B13', 'Sales Persons', txt)
+        sheet.write('B14', sale.user_id.name)
+        sheet.write('C13', 'Source Document', txt)
+        sheet.write('C14', ref)
+        sheet.write('D13', 'Fiscal Position', txt)
+        sheet.write('D14', fiscal_position)
+        sheet.write('A16', 'Product', txt_border)
+        sheet.write('B16', 'Description', txt_border)
+        sheet.write('C16', 'Quantity', txt_border)
+        sheet.write('D16', 'Delivered', txt_border)
+        sheet.write('E16', 'Invoiced', txt_border)
+        sheet.write('F16', 'Unit Price', txt_border)
+        sheet.write('G16', 'Tax', txt_border)
+        sheet.write('H16', 'Subtotal', txt_border)
+        row = 17
+        # calling this function for adding sale order line data to the
+        # Excel sheet
+        self._add_order_line_to_excel(sheet, sale, row, formats['border'],
+                                      txt_border, currency_symbol)
 
     def _add_order_line_to_excel(self, sheet, sale, row, border, txt_border,
                                  currency_symbol):
@@ -141,8 +144,7 @@ class SaleOrder(models.Model):
         for line in sale.order_line:
             # For adding value of the sale order lines
 
-            tax = str(
-                line.tax_id.name) if line.tax_id.name is not False else ''
+            tax = ', '.join(line.tax_id.mapped('name'))
             sheet.write(row, 0, line.product_id.name, border)
             sheet.write(row, 1, line.name, border)
             sheet.write(row, 2, line.product_uom_qty, border)
@@ -158,3 +160,21 @@ class SaleOrder(models.Model):
         sheet.write(row, 6, 'Total Amount', txt_border)
         sheet.write(row, 7, str(currency_symbol) + str(sale.amount_total),
                     border)
+
+    def _get_excel_table_header(self):
+        """ Return the column titles of the single sheet layout """
+        return ['Order', 'Customer Name', 'Date', 'Currency', 'State',
+                'Product', 'Description', 'Quantity', 'Delivered', 'Invoiced',
+                'Unit Price', 'Tax', 'Subtotal']
+
+    def _get_excel_table_rows(self):
+        """ Return one row per order line in the single sheet layout """
+        self.ensure_one()
+        order = [self.name, self.partner_id.name or '', str(self.date_order),
+                 self.currency_id.name, self.state]
+        return [order + [line.product_id.name or '', line.name or '',
+                         line.product_uom_qty, line.qty_delivered,
+                         line.qty_invoiced, line.price_unit,
+                         ', '.join(line.tax_id.mapped('name')),
+                         line.price_subtotal]
+                for line in self.order_line] or [order]
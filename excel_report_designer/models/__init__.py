@@ -21,3 +21,4 @@
 #
 ################################################################################
 from . import report_excel
+from . import excel_report_export
@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+################################################################################
+#
+#   Cybrosys Technologies Pvt. Ltd.
+#
+#   Copyright (C) 2024-TODAY Cybrosys Technologies (<https://www.cybrosys.com>).
+#   Author: Cybrosys Techno Solutions (<https://www.cybrosys.com>)
+#
+#   This program is free software: you can modify
+#   it under the terms of the GNU Affero General Public License (AGPL) as
+#   published by the Free Software Foundation, either version 3 of the
+#   License, or (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Affero General Public License for more details.
+#
+#   You should have received a copy of the GNU Affero General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+################################################################################
+import datetime
+from odoo import api, fields, models
+from odoo.tools import split_every
+
+try:
+    from odoo.tools.misc import xlsxwriter
+except ImportError:
+    import xlsxwriter
+
+# Records read and written at a time
+EXPORT_BATCH_SIZE = 1000
+
+
+class ExcelReportExport(models.AbstractModel):
+    """This is used to write the designer reports to the response. The rows
+    are read in batches and written through a constant memory workbook, so
+    the size of a report does not depend on the available memory"""
+    _name = 'excel.report.export'
+    _description = 'Excel Report Export'
+
+    @api.model
+    def _get_report_domain(self, data):
+        """Returns the domain of the date filter of the report"""
+        domain = []
+        if data['date_field']:
+            if data['start_date']:
+                domain.append((data['date_field'], '>=', data['start_date']))
+            if data['end_date']:
+                domain.append((data['date_field'], '<=', data['end_date']))
+            if not data['start_date'] and not data['end_date']:
+                # Kept from the former report: a date filter without any
+                # date prints nothing
+                domain.append(('id', '=', False))
+        return domain
+
+    @api.model
+    def _get_report_fields(self, data):
+        """Returns the name, type and label of the report fields in the
+        report order"""
+        field_ids = [int(field_id) for field_id in
+                     data['field_order'].strip('][').split(', ') if field_id]
+        report_fields = self.env['ir.model.fields'].browse(field_ids)
+        model = self.env[data['model_name']]
+        return [(field.name, field.ttype, field.field_description)
+                for field in report_fields if field.name in model._fields]
+
+    @api.model
+    def _get_display_names(self, model, values):
+        """Returns the display names of the records of model referenced by
+        the x2many values, read in one go"""
+        ids = {record_id for record_ids in values for record_id in record_ids}
+        if not ids:
+            return {}
+        return {
+            record['id']: record['display_name']
+            for record in self.env[model].browse(ids).read(['display_name'])
+        }
+
+    @api.model
+    def _get_record_rows(self, row, report_fields, display_names):
+        """Returns the cells of a record as rows of values, one row per line
+        of its one2many fields"""
+        columns = []
+        for name, ttype, label in report_fields:
+            value = row[name]
+            if ttype == 'one2many':
+                columns.append([display_names[name].get(record_id, '')
+                                for record_id in value])
+            elif ttype == 'many2many':
+                columns.append([', '.join(
+                    display_names[name].get(record_id, '')
+                    for record_id in value)])
+            elif ttype == 'many2one':
+                columns.append([value and value[1] or ''])
+            elif ttype == 'boolean':
+                columns.append(['Yes' if value else ' '])
+            elif value is False:
+                columns.append([''])
+            else:
+                columns.append([value])
+        occupied_rows = max([len(column) for column in columns] + [1])
+        return [[column[i] if i < len(column) else None for column in columns]
+                for i in range(occupied_rows)]
+
+    @api.model
+    def _write_xlsx_report(self, data, domain, response):
+        """Writes the report of the records of domain to the response"""
+        # The workbook keeps only the current row in memory and writes the
+        # file straight to the response when closed
+        workbook = xlsxwriter.Workbook(response.stream,
+                                       {'constant_memory': True})
+        sheet = workbook.add_worksheet()
+        # Formats
+        format1 = workbook.add_format(
+            {'font_size': 15, 'align': 'center', 'bold': True})
+        format1.set_font_color('#000080')
+        format2 = workbook.add_format(
+            {'font_size': 11, 'bold': True, 'border': 1, 'bg_color': '#928E8E'})
+        format4 = workbook.add_format(
+            {'font_size': 10, 'num_format': 'yyyy-m-d', 'align': 'center',
+             'bold': True})
+        format5 = workbook.add_format(
+            {'font_size': 10, 'border': 1, 'text_wrap': True})
+        format9 = workbook.add_format(
+            {'font_size': 10, 'num_format': 'yyyy-m-d'})
+        format10 = workbook.add_format(
+            {'font_size': 10, 'num_format': 'yyyy-m-d', 'border': 1})
+        format2.set_align('center')
+        format4.set_align('right')
+
+        sheet.merge_range(1, 1, 1, len(data['field_label']) + 1,
+                          data['report_name'], format1)
+        sheet.write(2, 0, "Date :", format4)
+        sheet.write(2, 1, fields.Datetime.today(), format4)
+        if data['date_field']:
+            sheet.write(3, 0, data['date_name'], format4)
+            if data['start_date']:
+                sheet.write(3, 1, "From:", format4)
+                sheet.write(3, 2, data['start_date'], format9)
+            else:
+                sheet.write(3, 2, "", format9)
+            if data['end_date']:
+                sheet.write(3, 3, "To:", format4)
+                sheet.write(3, 4, data['end_date'], format9)
+            else:
+                sheet.write(3, 4, "", format9)
+        report_fields = self._get_report_fields(data)
+        row_num = 5
+        sheet.write(row_num, 1, "SL No", format2)
+        for col_num, (name, ttype, label) in enumerate(report_fields, 2):
+            sheet.write(row_num, col_num, label, format2)
+        row_num += 1
+
+        model = self.env[data['model_name']]
+        field_names = [name for name, ttype, label in report_fields]
+        x2many_fields = [(name, model._fields[name].comodel_name)
+                         for name, ttype, label in report_fields
+                         if ttype in ('one2many', 'many2many')]
+        sl_no = 1
+        for ids in split_every(EXPORT_BATCH_SIZE, model.search(domain).ids):
+            rows = model.browse(ids).read(field_names)
+            display_names = {
+                name: self._get_display_names(
+                    comodel, [row[name] for row in rows])
+                for name, comodel in x2many_fields
+            }
+            for row in rows:
+                sheet.write(row_num, 1, sl_no, format5)
+                for cells in self._get_record_rows(row, report_fields,
+                                                   display_names):
+                    for col_num, value in enumerate(cells, 2):
+                        if value is None:
+                            continue
+                        cell_format = format10 if isinstance(
+                            value, datetime.date) else format5
+                        try:
+                            sheet.write(row_num, col_num, value, cell_format)
+                        except Exception:
+                            sheet.write(row_num, col_num, "", format5)
+                    row_num += 1
+                sl_no += 1
+            # Release the records of the batch from the cache
+            self.env.invalidate_all()
+        workbook.close()
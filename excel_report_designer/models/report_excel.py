@@ -21,14 +21,7 @@
 #
 ################################################################################
 from odoo import api, fields, models, _
-
-try:
-    from odoo.tools.misc import xlsxwriter
-except ImportError:
-    import xlsxwriter
-import io
 import json
-import datetime
 from odoo.tools import json_default
 
 
@@ -133,176 +126,9 @@ class ReportExcel(models.Model):
 
     def get_xlsx_report(self, data, response):
         """this is used to print the report of all records"""
-        output = io.BytesIO()
-        workbook = xlsxwriter.Workbook(output, {'in_memory': True})
-        sheet = workbook.add_worksheet()
-        # Formats
-        format1 = workbook.add_format(
-            {'font_size': 15, 'align': 'center', 'bold': True})
-        format1.set_font_color('#000080')
-        format2 = workbook.add_format(
-            {'font_size': 11, 'bold': True, 'border': 1, 'bg_color': '#928E8E'})
-        format4 = workbook.add_format(
-            {'font_size': 10, 'num_format': 'yyyy-m-d', 'align': 'center',
-             'bold': True})
-        format5 = workbook.add_format(
-            {'font_size': 10, 'border': 1, 'text_wrap': True})
-        format6 = workbook.add_format({'font_size': 10, 'bold': True})
-        format8 = workbook.add_format({'font_size': 10, 'border': 1})
-        format9 = workbook.add_format(
-            {'font_size': 10, 'num_format': 'yyyy-m-d'})
-        format10 = workbook.add_format(
-            {'font_size': 10, 'num_format': 'yyyy-m-d', 'border': 1})
-
-        format2.set_align('center')
-        format4.set_align('right')
-        format6.set_align('right')
-        format8.set_align('left')
-
-        sheet.merge_range(1, 1, 1, len(data['field_label']) + 1,
-                          data['report_name'], format1)
-        sheet.write(2, 0, "Date :", format4)
-        sheet.write(2, 1, fields.Datetime.today(), format4)
-        if data['date_field']:
-            sheet.write(3, 0, data['date_name'], format4)
-            if data['start_date']:
-                sheet.write(3, 1, "From:", format4)
-                sheet.write(3, 2, data['start_date'], format9)
-            else:
-                sheet.write(3, 2, "", format9)
-            if data['end_date']:
-                sheet.write(3, 3, "To:", format4)
-                sheet.write(3, 4, data['end_date'], format9)
-            else:
-                sheet.write(3, 4, "", format9)
-        sl_no = 1
-        sheet.write(5, 1, "SL No", format2)
-        row_num = 5
-        col_num = 2
-        order = data['field_order'].strip('][').split(', ')
-        for field_id in order:
-            field_name = self.env['ir.model.fields'].browse(
-                int(field_id)).field_description
-            sheet.write(row_num, col_num, field_name, format2)
-            col_num += 1
-        row_num += 1
-        records = []
-        if data['date_field']:
-            if data['start_date'] and data['end_date']:
-                records = self.env[data['model_name']].search([
-                    (data['date_field'], '>=', data['start_date']),
-                    (data['date_field'], '<=', data['end_date'])])
-            elif data['start_date'] and not data['end_date']:
-                records = self.env[data['model_name']].search([
-                    (data['date_field'], '>=', data['start_date'])])
-            elif not data['start_date'] and data['end_date']:
-                records = self.env[data['model_name']].search([
-                    (data['date_field'], '<=', data['end_date'])])
-        else:
-            records = self.env[data['model_name']].search([])
-        new_table = []
-        for record in records:
-            order = data['field_order'].strip('][').split(', ')
-            record_dict = {}
-            for field_id in order:
-                field = self.env['ir.model.fields'].browse(int(field_id))
-                field_name = field.name
-                field_type = self.env['ir.model.fields'].browse(
-                    int(field_id)).ttype
-                if field_type in ['many2many']:
-                    one2many_values = ', '.join(
-                        record[field_name].mapped('name'))
-                    record_dict[field] = [one2many_values]
-                elif field_type in ['one2many']:
-                    o2m_list = []
-                    for rec in record[field_name]:
-                        if rec:
-                            o2m_list.append(rec)
-                        else:
-                            o2m_list.append('')
-                    record_dict[field] = o2m_list
-                else:
-                    record_dict[field] = [record[field_name]]
-            new_table.append(record_dict)
-        for record in new_table:
-            col_num = 1
-            sheet.write(row_num, col_num, sl_no, format5)
-            col_num += 1
-            occupied_rows = max(len(value) for value in record.values())
-            for field in record:
-                field_type = self.env['ir.model.fields'].browse(
-                    int(field.id)).ttype
-                if not field_type in ['one2many', 'many2many']:
-                    try:
-                        if isinstance(record[field][0], datetime.date):
-                            sheet.write(row_num, col_num, record[field][0],
-                                        format10)
-                        elif isinstance(record[field][0], bool):
-                            if not field:
-                                sheet.write(row_num, col_num, " ", format5)
-                            else:
-                                sheet.write(row_num, col_num, "Yes", format5)
-                        else:
-                            sheet.write(row_num, col_num, record[field][0],
-                                        format5)
-                    except Exception as e:
-                        if 'display_name' in record[field][0]:
-                            sheet.write(row_num, col_num,
-                                        record[field][0].display_name, format5)
-                        else:
-                            sheet.write(row_num, col_num, "", format5)
-                elif field_type == 'one2many':
-                    for i in range(occupied_rows):
-                        if len(record[field]) > i:
-                            try:
-                                if isinstance(record[field][i], datetime.date):
-                                    sheet.write(row_num + i, col_num,
-                                                record[field][i], format10)
-                                elif isinstance(record[field][i], bool):
-                                    if not field:
-                                        sheet.write(row_num + i, col_num, "NO",
-                                                    format5)
-                                    else:
-                                        sheet.write(row_num + i, col_num, "Yes",
-                                                    format5)
-                                else:
-                                    sheet.write(row_num + i, col_num,
-                                                record[field][i], format5)
-                            except Exception as e:
-                                if 'display_name' in record[field][i]:
-                                    sheet.write(row_num + i, col_num,
-                                                record[field][i].display_name, format5)
-                                else:
-                                    sheet.write(row_num + i, col_num, "",
-                                                format5)
-                elif field_type == 'many2many':
-                    if record[field]:
-                        try:
-                            if isinstance(record[field], datetime.date):
-                                sheet.write(row_num, col_num, record[field][0],
-                                            format10)
-                            elif isinstance(record[field], bool):
-                                if not field:
-                                    sheet.write(row_num, col_num, " ", format5)
-                                else:
-                                    sheet.write(row_num, col_num, "Yes",
-                                                format5)
-                            else:
-                                sheet.write(row_num, col_num, record[field][0],
-                                            format5)
-                        except Exception as e:
-                            if 'display_name' in record[field][0]:
-                                sheet.write(row_num, col_num,
-                                            record[field].display_name, format5)
-                            else:
-                                sheet.write(row_num, col_num, "", format5)
-                col_num += 1
-            row_num += occupied_rows
-            sl_no += 1
-        workbook.close()
-        output.seek(0)
-        response.stream.write(output.read())
-        output.close()
+        export = self.env['excel.report.export']
+        export._write_xlsx_report(data, export._get_report_domain(data),
+                                  response)
 
     def create_model_action(self):
         """ Create a contextual action for each server action."""
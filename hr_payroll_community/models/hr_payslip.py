@@ -20,6 +20,7 @@
 #    If not, see <http://www.gnu.org/licenses/>.
 #
 #############################################################################
+from collections import defaultdict
 from datetime import date, datetime, time
 from dateutil.relativedelta import relativedelta
 from odoo import api, fields, models, tools, _
@@ -31,6 +32,144 @@ import babel
 ROUNDING_FACTOR = 16
 
 
+class PayslipHistory(object):
+    """Sums of the done payslips of a group of employees, used by the
+    inputs, worked_days and payslip objects of the salary rules.
+
+    The first sum asked for a code loads that code for all the employees in
+    one grouped query, so a payslip batch runs one query per code instead of
+    one per rule, payslip and call."""
+
+    QUERIES = {
+        'input': """
+            SELECT hp.employee_id, hp.date_from, hp.date_to,
+            COALESCE(sum(pi.amount), 0)
+            FROM hr_payslip as hp
+            JOIN hr_payslip_input as pi ON pi.payslip_id = hp.id
+            WHERE hp.employee_id = ANY(%s) AND hp.state = 'done'
+            AND pi.code = %s
+            GROUP BY hp.employee_id, hp.date_from, hp.date_to""",
+        'worked_days': """
+            SELECT hp.employee_id, hp.date_from, hp.date_to,
+            COALESCE(sum(pi.number_of_days), 0),
+            COALESCE(sum(pi.number_of_hours), 0)
+            FROM hr_payslip as hp
+            JOIN hr_payslip_worked_days as pi ON pi.payslip_id = hp.id
+            WHERE hp.employee_id = ANY(%s) AND hp.state = 'done'
+            AND pi.code = %s
+            GROUP BY hp.employee_id, hp.date_from, hp.date_to""",
+        'line': """
+            SELECT hp.employee_id, hp.date_from, hp.date_to,
+            COALESCE(sum(case when hp.credit_note = False then (pl.total)
+            else (-pl.total) end), 0)
+            FROM hr_payslip as hp
+            JOIN hr_payslip_line as pl ON pl.slip_id = hp.id
+            WHERE hp.employee_id = ANY(%s) AND hp.state = 'done'
+            AND pl.code = %s
+            GROUP BY hp.employee_id, hp.date_from, hp.date_to""",
+    }
+
+    def __init__(self, env, employee_ids):
+        """Function for getting env and the employees of the batch"""
+        self.env = env
+        self.employee_ids = list(employee_ids)
+        self._sums = {}
+
+    def _load(self, kind, code):
+        """Function for loading the sums of a code for all the employees,
+        grouped by employee and payslip period"""
+        if (kind, code) not in self._sums:
+            for model in ('hr.payslip', 'hr.payslip.input',
+                          'hr.payslip.worked.days', 'hr.payslip.line'):
+                self.env[model].flush_model()
+            self.env.cr.execute(self.QUERIES[kind],
+                                (self.employee_ids, code))
+            sums = self._sums[kind, code] = defaultdict(list)
+            for employee_id, date_from, date_to, *values in \
+                    self.env.cr.fetchall():
+                sums[employee_id].append((date_from, date_to, values))
+        return self._sums[kind, code]
+
+    def sum(self, kind, employee_id, code, from_date, to_date=None):
+        """
+        @return: returns the sums of the done payslips of the employee
+        within from_date and to_date for the code, or None if there is none
+        """
+        if to_date is None:
+            to_date = fields.Date.today()
+        from_date = fields.Date.to_date(from_date)
+        to_date = fields.Date.to_date(to_date)
+        res = None
+        for date_from, date_to, values in self._load(kind, code).get(
+                employee_id, []):
+            if date_from >= from_date and date_to <= to_date:
+                res = values if res is None else [
+                    total + value for total, value in zip(res, values)]
+        return res
+
+
+class BrowsableObject(object):
+    """Class for Browsable Object"""
+
+    def __init__(self, employee_id, dict, env, history=None):
+        """Function for getting employee_id,dict and env"""
+        self.employee_id = employee_id
+        self.dict = dict
+        self.env = env
+        self.history = history or PayslipHistory(env, [employee_id])
+
+    def __getattr__(self, attr):
+        """Function for return dict"""
+        return attr in self.dict and self.dict.__getitem__(attr) or 0.0
+
+
+class InputLine(BrowsableObject):
+    """a class that will be used into the python code, mainly for
+    usability purposes"""
+
+    def sum(self, code, from_date, to_date=None):
+        """Function for getting sum of Payslip with respect to
+         from_date,to_date fields"""
+        res = self.history.sum('input', self.employee_id, code, from_date,
+                               to_date)
+        return res and res[0] or 0.0
+
+
+class WorkedDays(BrowsableObject):
+    """a class that will be used into the python code, mainly for
+    usability purposes"""
+
+    def _sum(self, code, from_date, to_date=None):
+        """Function for getting sum of Payslip days with respect to
+         from_date,to_date fields"""
+        return self.history.sum('worked_days', self.employee_id, code,
+                                from_date, to_date)
+
+    def sum(self, code, from_date, to_date=None):
+        """Function for getting sum of Payslip with respect to
+         from_date,to_date fields"""
+        res = self._sum(code, from_date, to_date)
+        return res and res[0] or 0.0
+
+    def sum_hours(self, code, from_date, to_date=None):
+        """Function for getting sum of Payslip hours with respect to
+         from_date,to_date fields"""
+        res = self._sum(code, from_date, to_date)
+        return res and res[1] or 0.0
+
+
+class Payslips(BrowsableObject):
+    """a class that will be used into the python code, mainly for
+    usability purposes"""
+
+    def sum(self, code, from_date, to_date=None):
+        """Function for getting sum of Payslip with respect to
+         from_date,to_date fields"""
+        res = self.history.sum('line', self.employee_id, code, from_date,
+                               to_date)
+        return res and res[0] or 0.0
+
+
 class HrPayslip(models.Model):
     """Create new model for getting total Payroll Sheet for an Employee"""
     _name = 'hr.payslip'
@@ -51,7 +190,7 @@ class HrPayslip(models.Model):
     number = fields.Char(string='Reference', copy=False,
                          help="References for Payslip", )
     employee_id = fields.Many2one(comodel_name='hr.employee', string='Employee',
-                                  required=True,
+                                  required=True, index=True,
                                   help="Choose Employee for Payslip")
     date_from = fields.Date(string='Date From', required=True,
                             help="Start date for Payslip",
@@ -205,21 +344,27 @@ class HrPayslip(models.Model):
         return self.env['hr.contract'].search(clause_final).ids
 
     def action_compute_sheet(self):
-        """Function for compute Payslip sheet"""
+        """Function for compute Payslip sheet. The payslips are computed
+        together: the history of their employees is loaded once for all of
+        them and the payslip lines are created in one go"""
+        history = PayslipHistory(self.env, self.employee_id.ids)
+        # delete old payslip lines
+        self.line_ids.unlink()
+        lines = []
         for payslip in self:
-            number = payslip.number or self.env['ir.sequence'].next_by_code(
-                'salary.slip')
-            # delete old payslip lines
-            payslip.line_ids.unlink()
+            if not payslip.number:
+                payslip.number = self.env['ir.sequence'].next_by_code(
+                    'salary.slip')
             # set the list of contract for which the rules have to be applied
             # if we don't give the contract, then the rules to apply should be
             # for all current contracts of the employee
             contract_ids = payslip.contract_id.ids or \
                            self.get_contract(payslip.employee_id,
                                              payslip.date_from, payslip.date_to)
-            lines = [(0, 0, line) for line in
-                     self._get_payslip_lines(contract_ids, payslip.id)]
-            payslip.write({'line_ids': lines, 'number': number})
+            lines += [dict(line, slip_id=payslip.id) for line in
+                      self._get_payslip_lines(contract_ids, payslip.id,
+                                              history=history)]
+        self.env['hr.payslip.line'].create(lines)
         return True
 
     @api.model
@@ -334,8 +479,9 @@ class HrPayslip(models.Model):
         return res
 
     @api.model
-    def _get_payslip_lines(self, contract_ids, payslip_id):
-        """Function for getting Payslip Lines"""
+    def _get_payslip_lines(self, contract_ids, payslip_id, history=None):
+        """Function for getting Payslip Lines. history is the PayslipHistory
+        shared by the payslips computed together"""
 
         def _sum_salary_rule_category(localdict, category, amount):
             """Function for getting total sum of Salary Rule Category"""
@@ -349,109 +495,29 @@ class HrPayslip(models.Model):
                       category.code] + amount or amount
             return localdict
 
-        class BrowsableObject(object):
-            """Class for Browsable Object"""
-
-            def __init__(self, employee_id, dict, env):
-                """Function for getting employee_id,dict and env"""
-                self.employee_id = employee_id
-                self.dict = dict
-                self.env = env
-
-            def __getattr__(self, attr):
-                """Function for return dict"""
-                return attr in self.dict and self.dict.__getitem__(attr) or 0.0
-
-        class InputLine(BrowsableObject):
-            """a class that will be used into the python code, mainly for
-            usability purposes"""
-
-            def sum(self, code, from_date, to_date=None):
-                """Function for getting sum of Payslip with respect to
-                 from_date,to_date fields"""
-                if to_date is None:
-                    to_date = fields.Date.today()
-                self.env.cr.execute("""
-                    SELECT sum(amount) as sum
-                    FROM hr_payslip as hp, hr_payslip_input as pi
-                    WHERE hp.employee_id = %s AND hp.state = 'done'
-                    AND hp.date_from >= %s AND hp.date_to <= %s AND hp.id = 
-                    pi.payslip_id AND pi.code = %s""",
-                                    (self.employee_id, from_date, to_date,
-                                        code))
-                return self.env.cr.fetchone()[0] or 0.0
-
-        class WorkedDays(BrowsableObject):
-            """a class that will be used into the python code, mainly for
-            usability purposes"""
-
-            def _sum(self, code, from_date, to_date=None):
-                """Function for getting sum of Payslip days with respect to
-                 from_date,to_date fields"""
-                if to_date is None:
-                    to_date = fields.Date.today()
-                self.env.cr.execute("""
-                    SELECT sum(number_of_days) as number_of_days, 
-                    sum(number_of_hours) as number_of_hours
-                    FROM hr_payslip as hp, hr_payslip_worked_days as pi
-                    WHERE hp.employee_id = %s AND hp.state = 'done'
-                    AND hp.date_from >= %s AND hp.date_to <= %s AND hp.id = 
-                    pi.payslip_id AND pi.code = %s""",
-                                    (self.employee_id, from_date, to_date,
-                                        code))
-                return self.env.cr.fetchone()
-
-            def sum(self, code, from_date, to_date=None):
-                """Function for getting sum of Payslip with respect to
-                 from_date,to_date fields"""
-                res = self._sum(code, from_date, to_date)
-                return res and res[0] or 0.0
-
-            def sum_hours(self, code, from_date, to_date=None):
-                """Function for getting sum of Payslip hours with respect to
-                 from_date,to_date fields"""
-                res = self._sum(code, from_date, to_date)
-                return res and res[1] or 0.0
-
-        class Payslips(BrowsableObject):
-            """a class that will be used into the python code, mainly for
-            usability purposes"""
-
-            def sum(self, code, from_date, to_date=None):
-                """Function for getting sum of Payslip with respect to
-                 from_date,to_date fields"""
-                if to_date is None:
-                    to_date = fields.Date.today()
-                self.env.cr.execute("""SELECT sum(case when hp.credit_note = 
-                False then (pl.total) else (-pl.total) end)
-                FROM hr_payslip as hp, hr_payslip_line as pl
-                WHERE hp.employee_id = %s AND hp.state = 'done'
-                AND hp.date_from >= %s AND hp.date_to <= %s AND hp.id 
-                = pl.slip_id AND pl.code = %s""",
-                                    (
-                                        self.employee_id, from_date, to_date,
-                                        code))
-                res = self.env.cr.fetchone()
-                return res and res[0] or 0.0
-
         # we keep a dict with the result because a value can be overwritten
         # by another rule with the same code
         result_dict = {}
         rules_dict = {}
         worked_days_dict = {}
         inputs_dict = {}
-        blacklist = []
+        blacklist = set()
         payslip = self.env['hr.payslip'].browse(payslip_id)
+        history = history or PayslipHistory(self.env, payslip.employee_id.ids)
         for worked_days_line in payslip.worked_days_line_ids:
             worked_days_dict[worked_days_line.code] = worked_days_line
         for input_line in payslip.input_line_ids:
             inputs_dict[input_line.code] = input_line
-        categories = BrowsableObject(payslip.employee_id.id, {}, self.env)
-        inputs = InputLine(payslip.employee_id.id, inputs_dict, self.env)
+        categories = BrowsableObject(payslip.employee_id.id, {}, self.env,
+                                     history)
+        inputs = InputLine(payslip.employee_id.id, inputs_dict, self.env,
+                           history)
         worked_days = WorkedDays(payslip.employee_id.id, worked_days_dict,
-                                 self.env)
-        payslips = Payslips(payslip.employee_id.id, payslip, self.env)
-        rules = BrowsableObject(payslip.employee_id.id, rules_dict, self.env)
+                                 self.env, history)
+        payslips = Payslips(payslip.employee_id.id, payslip, self.env,
+                            history)
+        rules = BrowsableObject(payslip.employee_id.id, rules_dict, self.env,
+                                history)
         baselocaldict = {'categories': categories, 'rules': rules,
                          'payslip': payslips, 'worked_days': worked_days,
                          'inputs': inputs}
@@ -522,8 +588,8 @@ class HrPayslip(models.Model):
                     }
                 else:
                     # blacklist this rule and its children
-                    blacklist += [id for id, seq in
-                                  rule._recursive_search_of_rules()]
+                    blacklist.update(id for id, seq in
+                                     rule._recursive_search_of_rules())
         return list(result_dict.values())
 
     # YTI
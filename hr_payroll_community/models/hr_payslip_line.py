@@ -33,7 +33,7 @@ class HrPayslipLine(models.Model):
     _order = 'contract_id, sequence'
 
     slip_id = fields.Many2one('hr.payslip', string='Pay Slip',
-                              required=True,
+                              required=True, index=True,
                               ondelete='cascade',
                               help="Choose Payslip for line")
     salary_rule_id = fields.Many2one('hr.salary.rule', string='Rule',
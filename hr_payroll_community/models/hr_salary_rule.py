@@ -20,10 +20,11 @@
 #    If not, see <http://www.gnu.org/licenses/>.
 #
 #############################################################################
-from odoo import api, fields, models, _
+from odoo import api, fields, models, tools, _
 from odoo.addons import decimal_precision as dp
 from odoo.exceptions import UserError, ValidationError
-from odoo.tools.safe_eval import safe_eval
+from odoo.tools.safe_eval import _BUILTINS, _SAFE_OPCODES, check_values, \
+    test_expr, unsafe_eval
 
 
 class HrSalaryRule(models.Model):
@@ -169,6 +170,27 @@ class HrSalaryRule(models.Model):
             children_rules += rule.child_ids._recursive_search_of_rules()
         return [(rule.id, rule.sequence) for rule in self] + children_rules
 
+    @api.model
+    @tools.ormcache('expression', 'mode')
+    def _compile_expression(self, expression, mode):
+        """
+        @param expression: python source of a rule field
+        @param mode: 'eval' for an expression, 'exec' for a code block
+        @return: returns the code object of the expression, checked the same
+        way as safe_eval does. It is cached on the source, so every version
+        of a rule is compiled only once.
+        """
+        return test_expr(expression, _SAFE_OPCODES, mode=mode)
+
+    @api.model
+    def _eval_expression(self, expression, localdict, mode='eval'):
+        """Function for evaluating a rule expression in localdict like
+        safe_eval(..., nocopy=True) does, from its compiled code"""
+        check_values(localdict)
+        localdict['__builtins__'] = dict(_BUILTINS)
+        return unsafe_eval(self._compile_expression(expression or '', mode),
+                           localdict)
+
     # TODO should add some checks on the type of result (should be float)
     def _compute_rule(self, localdict):
         """
@@ -183,7 +205,7 @@ class HrSalaryRule(models.Model):
             if rec.amount_select == 'fix':
                 try:
                     return rec.amount_fix, float(
-                        safe_eval(rec.quantity, localdict)), 100.0
+                        rec._eval_expression(rec.quantity, localdict)), 100.0
                 except:
                     raise UserError(
                         _('Wrong quantity defined for salary rule %s (%s).') % (
@@ -191,8 +213,9 @@ class HrSalaryRule(models.Model):
             elif rec.amount_select == 'percentage':
                 try:
                     return (
-                        float(safe_eval(rec.amount_percentage_base, localdict)),
-                        float(safe_eval(rec.quantity, localdict)),
+                        float(rec._eval_expression(rec.amount_percentage_base,
+                                                   localdict)),
+                        float(rec._eval_expression(rec.quantity, localdict)),
                         rec.amount_percentage)
                 except:
                     raise UserError(
@@ -201,8 +224,8 @@ class HrSalaryRule(models.Model):
                             rec.name, rec.code))
             else:
                 try:
-                    safe_eval(rec.amount_python_compute, localdict, mode='exec',
-                              nocopy=True)
+                    rec._eval_expression(rec.amount_python_compute,
+                                         localdict, mode='exec')
                     return (float(localdict['result']),
                             'result_qty' in localdict and
                             localdict['result_qty'] or 1.0, 'result_rate'
@@ -224,7 +247,8 @@ class HrSalaryRule(models.Model):
             return True
         elif self.condition_select == 'range':
             try:
-                result = safe_eval(self.condition_range, localdict)
+                result = self._eval_expression(self.condition_range,
+                                               localdict)
                 return (
                             self.condition_range_min <= result <= self.condition_range_max or False)
             except:
@@ -234,8 +258,8 @@ class HrSalaryRule(models.Model):
                         self.name, self.code))
         else:  # python code
             try:
-                safe_eval(self.condition_python, localdict, mode='exec',
-                          nocopy=True)
+                self._eval_expression(self.condition_python, localdict,
+                                      mode='exec')
                 return 'result' in localdict and localdict['result'] or False
             except:
                 raise UserError(
@@ -37,7 +37,6 @@ class HrPayslipEmployees(models.TransientModel):
 
     def action_compute_sheet(self):
         """Function for compute Payslip Sheet"""
-        payslips = self.env['hr.payslip']
         [data] = self.read()
         active_id = self.env.context.get('active_id')
         if active_id:
@@ -48,6 +47,7 @@ class HrPayslipEmployees(models.TransientModel):
         if not data['employee_ids']:
             raise UserError(
                 _("You must select employee(s) to generate payslip(s)."))
+        vals_list = []
         for employee in self.env['hr.employee'].browse(data['employee_ids']):
             slip_data = (
                 self.env['hr.payslip'].onchange_employee_id(
@@ -68,6 +68,7 @@ class HrPayslipEmployees(models.TransientModel):
                 'credit_note': run_data.get('credit_note'),
                 'company_id': employee.company_id.id,
             }
-            payslips += self.env['hr.payslip'].create(res)
+            vals_list.append(res)
+        payslips = self.env['hr.payslip'].create(vals_list)
         payslips.action_compute_sheet()
         return {'type': 'ir.actions.act_window_close'}
@@ -36,6 +36,7 @@
         'python': ['pyzk'], },
     'data': [
         'security/ir.model.access.csv',
+        'data/ir_cron_data.xml',
         'views/biometric_device_details_views.xml',
         'views/hr_employee_views.xml',
         'views/daily_attendance_views.xml',
@@ -21,6 +21,8 @@
 ################################################################################
 import datetime
 import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
 import pytz
 from odoo import api, fields, models, _
 from odoo.exceptions import UserError, ValidationError
@@ -31,6 +33,41 @@ try:
 except ImportError:
     _logger.error("Please Install pyzk library.")
 
+# Devices polled at the same time by the scheduled download
+MAX_POLL_WORKERS = 8
+DEFAULT_TIMEOUT = 15
+# Failed polls in a row after which a device is skipped for a while
+CIRCUIT_BREAKER_THRESHOLD = 3
+CIRCUIT_BREAKER_DELAY = datetime.timedelta(minutes=5)
+CIRCUIT_BREAKER_MAX_DELAY = datetime.timedelta(days=1)
+
+
+def fetch_device_logs(device_ip, port_number, timeout, device_time):
+    """Read the users and the attendance log of a device. It runs in the
+    poller threads, so it only talks to the device and never to the database.
+    :return: dictionary with the users, the attendance, the error if any and
+        the duration of the poll in seconds"""
+    start = time.monotonic()
+    result = {'users': [], 'attendance': [], 'error': False}
+    try:
+        zk = ZK(device_ip, port=port_number, timeout=timeout, password=0,
+                force_udp=False, ommit_ping=False)
+        conn = zk.connect()
+        try:
+            conn.set_time(device_time)
+            conn.disable_device()  # Device Cannot be used during this time.
+            try:
+                result['users'] = conn.get_users()
+                result['attendance'] = conn.get_attendance() or []
+            finally:
+                conn.enable_device()
+        finally:
+            conn.disconnect()
+    except Exception as error:
+        result['error'] = str(error) or error.__class__.__name__
+    result['duration'] = time.monotonic() - start
+    return result
+
 
 class BiometricDeviceDetails(models.Model):
     """Model for configuring and connect the biometric device with odoo"""
@@ -48,6 +85,42 @@ class BiometricDeviceDetails(models.Model):
                                  default=lambda
                                      self: self.env.user.company_id.id,
                                  help='Current Company')
+    last_attendance_time = fields.Datetime(
+        string='Last Downloaded Punch', readonly=True, copy=False,
+        help='Time of the last punch downloaded from the device, the next '
+             'download only processes the punches from this time on')
+    connection_timeout = fields.Integer(
+        string='Connection Timeout', default=DEFAULT_TIMEOUT,
+        help='Seconds to wait for the device during the scheduled download')
+    last_poll_time = fields.Datetime(
+        string='Last Poll', readonly=True, copy=False,
+        help='Time of the last scheduled download of the device')
+    last_poll_duration = fields.Float(
+        string='Poll Duration (s)', readonly=True, copy=False,
+        help='Seconds taken to read the device at the last scheduled download')
+    last_poll_punches = fields.Integer(
+        string='New Punches', readonly=True, copy=False,
+        help='Punches created at the last scheduled download')
+    last_poll_error = fields.Char(
+        string='Last Error', readonly=True, copy=False,
+        help='Error of the last scheduled download, if it failed')
+    poll_failure_count = fields.Integer(
+        string='Failed Polls', readonly=True, copy=False,
+        help='Scheduled downloads failed in a row')
+    poll_blocked_until = fields.Datetime(
+        string='Skipped Until', readonly=True, copy=False,
+        help='The scheduled download skips the device until this time after '
+             'too many failed polls')
+    attendance_lag = fields.Float(
+        string='Attendance Lag (h)', compute='_compute_attendance_lag',
+        help='Hours since the last punch downloaded from the device')
+
+    def _compute_attendance_lag(self):
+        """Compute the hours since the last downloaded punch"""
+        now = fields.Datetime.now()
+        for info in self:
+            info.attendance_lag = info.last_attendance_time and (
+                now - info.last_attendance_time).total_seconds() / 3600
 
     def device_connect(self, zk):
         """Function for connecting the device with Odoo"""
@@ -134,6 +207,7 @@ class BiometricDeviceDetails(models.Model):
                         # Clearing data from attendance log
                         self._cr.execute(
                             """delete from zk_machine_attendance""")
+                        info.last_attendance_time = False
                         conn.disconnect()
                     else:
                         raise UserError(
@@ -148,15 +222,69 @@ class BiometricDeviceDetails(models.Model):
 
     @api.model
     def cron_download(self):
+        """Download the attendance of all the devices"""
         machines = self.env['biometric.device.details'].search([])
+        machines._poll_devices()
+
+    def _poll_devices(self):
+        """Read the logs of the devices in parallel, then apply the staged
+        punches to Odoo device by device. Devices failing too many times in a
+        row are skipped for a growing delay"""
+        now = fields.Datetime.now()
+        machines = self.filtered(lambda machine: not (
+                machine.poll_blocked_until and
+                machine.poll_blocked_until > now))
+        if not machines:
+            return
+        user_tz = self.env.context.get('tz') or self.env.user.tz or 'UTC'
+        device_time = pytz.utc.localize(now).astimezone(
+            pytz.timezone(user_tz))
+        with ThreadPoolExecutor(max_workers=min(
+                len(machines), MAX_POLL_WORKERS)) as executor:
+            futures = {
+                machine.id: executor.submit(
+                    fetch_device_logs, machine.device_ip,
+                    machine.port_number,
+                    machine.connection_timeout or DEFAULT_TIMEOUT,
+                    device_time)
+                for machine in machines
+            }
         for machine in machines:
-            machine.action_download_attendance()
+            result = futures[machine.id].result()
+            error = result['error']
+            punches = 0
+            if not error:
+                try:
+                    with self.env.cr.savepoint():
+                        punches = machine._process_attendance(
+                            result['users'], result['attendance'])
+                except Exception as process_error:
+                    error = str(process_error)
+            vals = {
+                'last_poll_time': now,
+                'last_poll_duration': result['duration'],
+                'last_poll_punches': punches,
+                'last_poll_error': error,
+                'poll_failure_count': 0,
+                'poll_blocked_until': False,
+            }
+            if error:
+                _logger.warning("Attendance download of %s failed: %s",
+                                machine.name, error)
+                failures = machine.poll_failure_count + 1
+                vals['poll_failure_count'] = failures
+                if failures >= CIRCUIT_BREAKER_THRESHOLD:
+                    vals['poll_blocked_until'] = now + min(
+                        CIRCUIT_BREAKER_DELAY * 2 ** min(
+                            failures - CIRCUIT_BREAKER_THRESHOLD, 10),
+                        CIRCUIT_BREAKER_MAX_DELAY)
+            machine.write(vals)
 
     def action_download_attendance(self):
-        """Function to download attendance records from the device"""
+        """Function to download attendance records from the device. Only the
+        punches from the last downloaded punch of the device on are
+        processed"""
         _logger.info("++++++++++++Cron Executed++++++++++++++++++++++")
-        zk_attendance = self.env['zk.machine.attendance']
-        hr_attendance = self.env['hr.attendance']
         for info in self:
             machine_ip = info.device_ip
             zk_port = info.port_number
@@ -170,87 +298,123 @@ class BiometricDeviceDetails(models.Model):
                     _("Pyzk module not Found. Please install it"
                       "with 'pip3 install pyzk'."))
             conn = self.device_connect(zk)
-            self.action_set_timezone()
+            info.action_set_timezone()
             if conn:
                 conn.disable_device()  # Device Cannot be used during this time.
-                user = conn.get_users()
-                attendance = conn.get_attendance()
+                try:
+                    user = conn.get_users()
+                    attendance = conn.get_attendance()
+                finally:
+                    conn.enable_device()
+                    conn.disconnect()
                 if attendance:
-                    for each in attendance:
-                        atten_time = each.timestamp
-                        local_tz = pytz.timezone(
-                            self.env.user.partner_id.tz or 'GMT')
-                        local_dt = local_tz.localize(atten_time, is_dst=None)
-                        utc_dt = local_dt.astimezone(pytz.utc)
-                        utc_dt = utc_dt.strftime("%Y-%m-%d %H:%M:%S")
-                        atten_time = datetime.datetime.strptime(
-                            utc_dt, "%Y-%m-%d %H:%M:%S")
-                        atten_time = fields.Datetime.to_string(atten_time)
-                        for uid in user:
-                            if uid.user_id == each.user_id:
-                                get_user_id = self.env['hr.employee'].search(
-                                    [('device_id_num', '=', each.user_id)])
-                                if get_user_id:
-                                    duplicate_atten_ids = zk_attendance.search(
-                                        [('device_id_num', '=', each.user_id),
-                                         ('punching_time', '=', atten_time)])
-                                    if not duplicate_atten_ids:
-                                        zk_attendance.create({
-                                            'employee_id': get_user_id.id,
-                                            'device_id_num': each.user_id,
-                                            'attendance_type': str(each.status),
-                                            'punch_type': str(each.punch),
-                                            'punching_time': atten_time,
-                                            'address_id': info.address_id.id
-                                        })
-                                        att_var = hr_attendance.search([(
-                                            'employee_id', '=', get_user_id.id),
-                                            ('check_out', '=', False)])
-                                        if each.punch == 0:  # check-in
-                                            if not att_var:
-                                                hr_attendance.create({
-                                                    'employee_id':
-                                                        get_user_id.id,
-                                                    'check_in': atten_time
-                                                })
-                                        if each.punch == 1:  # check-out
-                                            if len(att_var) == 1:
-                                                att_var.write({
-                                                    'check_out': atten_time
-                                                })
-                                            else:
-                                                att_var1 = hr_attendance.search(
-                                                    [('employee_id', '=',
-                                                      get_user_id.id)])
-                                                if att_var1:
-                                                    att_var1[-1].write({
-                                                        'check_out': atten_time
-                                                    })
-                                else:
-                                    employee = self.env['hr.employee'].create({
-                                        'device_id_num': each.user_id,
-                                        'name': uid.name
-                                    })
-                                    zk_attendance.create({
-                                        'employee_id': employee.id,
-                                        'device_id_num': each.user_id,
-                                        'attendance_type': str(each.status),
-                                        'punch_type': str(each.punch),
-                                        'punching_time': atten_time,
-                                        'address_id': info.address_id.id
-                                    })
-                                    hr_attendance.create({
-                                        'employee_id': employee.id,
-                                        'check_in': atten_time
-                                    })
-                    conn.disconnect
-                    return True
+                    info._process_attendance(user, attendance)
                 else:
                     raise UserError(_('Unable to get the attendance log, please'
                                       'try again later.'))
             else:
                 raise UserError(_('Unable to connect, please check the'
                                   'parameters and network connections.'))
+        return True
+
+    def _process_attendance(self, users, attendance):
+        """Create the attendances of the punches newer than the last
+        downloaded punch of the device.
+        :param users: users of the device
+        :param attendance: attendance log of the device
+        :return: number of punches created"""
+        self.ensure_one()
+        zk_attendance = self.env['zk.machine.attendance']
+        hr_attendance = self.env['hr.attendance']
+        local_tz = pytz.timezone(self.env.user.partner_id.tz or 'GMT')
+        device_users = {uid.user_id: uid for uid in users}
+        punches = []
+        for each in attendance:
+            if each.user_id not in device_users:
+                continue
+            atten_time = local_tz.localize(
+                each.timestamp, is_dst=None).astimezone(pytz.utc).replace(
+                tzinfo=None)
+            # Punches of the last downloaded second are read again, the
+            # duplicate check below skips the ones already created
+            if self.last_attendance_time and \
+                    atten_time < self.last_attendance_time:
+                continue
+            punches.append((atten_time, each))
+        if not punches:
+            return 0
+        punches.sort(key=lambda punch: punch[0])
+        # Remove the punches already downloaded
+        device_ids = list({each.user_id for atten_time, each in punches})
+        existing = {
+            (attendance.device_id_num, attendance.punching_time)
+            for attendance in zk_attendance.search_fetch([
+                ('device_id_num', 'in', device_ids),
+                ('punching_time', '>=', punches[0][0]),
+                ('punching_time', '<=', punches[-1][0]),
+            ], ['device_id_num', 'punching_time'])
+        }
+        new_punches = []
+        for atten_time, each in punches:
+            if (each.user_id, atten_time) not in existing:
+                existing.add((each.user_id, atten_time))
+                new_punches.append((atten_time, each))
+        # Employees of the device users, created for the unknown users
+        employees = {}
+        for employee in self.env['hr.employee'].search(
+                [('device_id_num', 'in', device_ids)]):
+            employees.setdefault(employee.device_id_num, employee)
+        missing_ids = [device_id for device_id in device_ids
+                       if device_id not in employees]
+        if missing_ids:
+            for employee in self.env['hr.employee'].create([{
+                'device_id_num': device_id,
+                'name': device_users[device_id].name,
+            } for device_id in missing_ids]):
+                employees[employee.device_id_num] = employee
+        zk_attendance.create([{
+            'employee_id': employees[each.user_id].id,
+            'device_id_num': each.user_id,
+            'attendance_type': str(each.status),
+            'punch_type': str(each.punch),
+            'punching_time': atten_time,
+            'address_id': self.address_id.id
+        } for atten_time, each in new_punches])
+        # Check in and check out the employees in the order of the punches,
+        # the check in of the open attendances are created at the end
+        open_attendances = {}
+        for attendance in hr_attendance.search([
+                ('employee_id', 'in', [employee.id for employee in
+                                       employees.values()]),
+                ('check_out', '=', False)]):
+            open_attendances.setdefault(attendance.employee_id.id,
+                                        hr_attendance)
+            open_attendances[attendance.employee_id.id] |= attendance
+        check_in_vals = []
+        for atten_time, each in new_punches:
+            employee_id = employees[each.user_id].id
+            att_var = open_attendances.get(employee_id, hr_attendance)
+            if each.punch == 0:  # check-in
+                if not att_var:
+                    vals = {'employee_id': employee_id, 'check_in': atten_time}
+                    check_in_vals.append(vals)
+                    open_attendances[employee_id] = vals
+            if each.punch == 1:  # check-out
+                if isinstance(att_var, dict):
+                    att_var['check_out'] = atten_time
+                    del open_attendances[employee_id]
+                elif len(att_var) == 1:
+                    att_var.write({'check_out': atten_time})
+                    del open_attendances[employee_id]
+                else:
+                    att_var1 = hr_attendance.search(
+                        [('employee_id', '=', employee_id)])
+                    if att_var1:
+                        att_var1[-1].write({'check_out': atten_time})
+                        open_attendances[employee_id] = att_var - att_var1[-1]
+        hr_attendance.create(check_in_vals)
+        self.last_attendance_time = punches[-1][0]
+        return len(new_punches)
 
     def action_restart_device(self):
         """For restarting the device"""
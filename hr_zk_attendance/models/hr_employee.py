@@ -26,5 +26,5 @@ class HrEmployee(models.Model):
     """Inherit the model to add field"""
     _inherit = 'hr.employee'
 
-    device_id_num = fields.Char(string='Biometric Device ID',
+    device_id_num = fields.Char(string='Biometric Device ID', index=True,
                                 help="Give the biometric device id")
@@ -50,3 +50,10 @@ class ZkMachineAttendance(models.Model):
                                     help="Punching time in the device")
     address_id = fields.Many2one('res.partner', string='Working Address',
                                  help="Working address of the employee")
+
+    def init(self):
+        """Index used to skip the punches already downloaded"""
+        self._cr.execute("""
+            CREATE INDEX IF NOT EXISTS zk_machine_attendance_device_time_idx
+            ON zk_machine_attendance (device_id_num, punching_time)
+        """)
@@ -43,10 +43,12 @@
         'security/ir.model.access.csv',
         'data/mx_reconcile_rule_data.xml',
         'data/mx_reconcile_rule_unified_data.xml',
+        'data/ir_cron_data.xml',
         'views/mx_reconcile_rule_views.xml',
         'views/mx_reconcile_relation_rule_views.xml',
         'views/mx_reconcile_rule_unified_views.xml',
         'views/mx_reconcile_log_views.xml',
+        'views/mx_auto_reconcile_job_views.xml',
         'views/account_bank_statement_line_views.xml',
         'views/account_payment_views.xml',
         'wizard/mx_auto_reconcile_wizard_views.xml',
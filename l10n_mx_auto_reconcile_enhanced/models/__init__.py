@@ -4,5 +4,7 @@ from . import mx_reconcile_rule
 from . import mx_reconcile_relation_rule
 from . import mx_reconcile_rule_unified
 from . import mx_reconcile_log
+from . import mx_auto_reconcile_mixin
+from . import mx_auto_reconcile_job
 from . import account_bank_statement_line
 from . import account_payment
@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+
+from odoo import fields, models, api
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+import logging
+
+_logger = logging.getLogger(__name__)
+
+# Ejecuciones en proceso sin avance en este tiempo se consideran perdidas
+# (reinicio del servidor, worker terminado)
+STALE_JOB_MINUTES = 60
+MAX_ATTEMPTS = 3
+
+
+class MxAutoReconcileJob(models.Model):
+    """
+    Conciliación automática encolada desde el wizard para ejecutarse en
+    segundo plano.
+
+    Es un modelo regular para que la ejecución y sus resultados no dependan
+    de la vida del wizard transitorio.
+    """
+    _name = 'mx.auto.reconcile.job'
+    _inherit = ['mx.auto.reconcile.mixin']
+    _description = 'Conciliación Automática en Segundo Plano'
+    _order = 'id desc'
+
+    user_id = fields.Many2one(
+        'res.users',
+        string='Usuario',
+        default=lambda self: self.env.user,
+        required=True,
+        readonly=True,
+    )
+    state = fields.Selection([
+        ('pending', 'En Cola'),
+        ('running', 'En Proceso'),
+        ('done', 'Terminado'),
+        ('failed', 'Error'),
+    ], string='Estado', default='pending', required=True, readonly=True)
+    progress = fields.Float(string='Avance (%)', readonly=True)
+    last_item_id = fields.Integer(readonly=True)
+    attempt = fields.Integer(string='Intentos', readonly=True)
+
+    suggestion_ids = fields.Many2many(
+        'account.bank.statement.line',
+        'mx_auto_reconcile_job_suggestion_rel',
+        string='Líneas con Sugerencias',
+        readonly=True,
+    )
+    unmatched_ids = fields.Many2many(
+        'account.bank.statement.line',
+        'mx_auto_reconcile_job_unmatched_rel',
+        string='Líneas Sin Match',
+        readonly=True,
+    )
+    total_suggestions = fields.Integer(
+        string='Sugerencias',
+        compute='_compute_results',
+        store=True,
+    )
+    total_unmatched = fields.Integer(
+        string='Sin Match',
+        compute='_compute_results',
+        store=True,
+    )
+    total_processed = fields.Integer(
+        string='Total Procesados',
+        compute='_compute_results',
+        store=True,
+    )
+
+    @api.depends('suggestion_ids', 'unmatched_ids')
+    def _compute_results(self):
+        for job in self:
+            job.total_suggestions = len(job.suggestion_ids)
+            job.total_unmatched = len(job.unmatched_ids)
+            job.total_processed = job.total_suggestions + job.total_unmatched
+
+    @api.model
+    def _get_background_workers(self):
+        return int(self.env['ir.config_parameter'].sudo().get_param(
+            'l10n_mx_auto_reconcile_enhanced.background_workers', 4))
+
+    @api.model
+    def _requeue_stale_jobs(self):
+        """Reencolar las ejecuciones en proceso perdidas por una ejecución anterior"""
+        stale_jobs = self.search([
+            ('state', '=', 'running'),
+            ('write_date', '<', fields.Datetime.now() - timedelta(minutes=STALE_JOB_MINUTES)),
+        ])
+        failed_jobs = stale_jobs.filtered(lambda job: job.attempt >= MAX_ATTEMPTS)
+        failed_jobs.state = 'failed'
+        for job in failed_jobs:
+            job.with_user(job.user_id)._notify_progress(
+                'La conciliación se interrumpió demasiadas veces', notification_type='danger')
+        (stale_jobs - failed_jobs).state = 'pending'
+
+    @api.model
+    def _cron_run_background(self):
+        """Ejecutar las conciliaciones encoladas"""
+        self._requeue_stale_jobs()
+        for job in self.search([('state', '=', 'pending')], order='id'):
+            job = job.with_user(job.user_id).with_company(job.company_id)
+            try:
+                job._run_background()
+            except Exception as e:
+                _logger.exception(f"Error en la conciliación en segundo plano {job.id}")
+                self.env.cr.rollback()
+                job.state = 'failed'
+                job._notify_progress(f'Error en la conciliación: {e}', notification_type='danger')
+            if not self.env.registry.in_test_mode():
+                self.env.cr.commit()
+
+    def _run_background(self):
+        """
+        Procesar todos los items en lotes de ``batch_size``.
+
+        Los lotes se califican en paralelo, cada uno en su propio cursor de
+        sólo lectura. Los resultados se escriben en el orden de los lotes,
+        con un commit por lote para no mantener una transacción larga.
+        """
+        self.ensure_one()
+        self.write({
+            'state': 'running',
+            'attempt': self.attempt + 1,
+        })
+
+        # Lotes de items con paginación por llave (sólo ids), una ejecución
+        # reencolada continúa después del último lote guardado
+        chunks = []
+        after_id = self.last_item_id
+        while True:
+            items, has_more_items = self._get_unreconciled_items(after_id=after_id, limit=self.batch_size)
+            if items:
+                chunks.append(items.ids)
+                after_id = items[-1].id
+            if not has_more_items:
+                break
+
+        # Los cursores de los workers deben ver el estado de la ejecución
+        self._commit_background()
+
+        workers = self._get_background_workers()
+        if workers > 1 and len(chunks) > 1 and not self.env.registry.in_test_mode():
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                # ``map`` devuelve los resultados en el orden de los lotes
+                results = executor.map(self._score_chunk_in_new_cursor, chunks)
+                self._merge_background_results(chunks, results)
+        else:
+            results = (
+                self._score_items(self.env['account.bank.statement.line'].browse(chunk))
+                for chunk in chunks
+            )
+            self._merge_background_results(chunks, results)
+
+        self.write({
+            'state': 'done',
+            'progress': 100.0,
+        })
+        self._notify_progress(
+            f'Conciliación completada. Procesados: {self.total_processed} | '
+            f'Sugerencias: {self.total_suggestions} | Sin match: {self.total_unmatched}',
+            notification_type='success',
+        )
+
+    def _score_chunk_in_new_cursor(self, item_ids):
+        """Calificar un lote de items en un cursor propio de sólo lectura"""
+        with self.env.registry.cursor(readonly=True) as cr:
+            job = self.with_env(self.env(cr=cr))
+            matches = job._score_items(job.env['account.bank.statement.line'].browse(item_ids))
+            # Los registros se devuelven sin referencias al cursor del worker
+            return [
+                dict(match, source=match['source'].id, invoice=match['invoice'].id,
+                     rule=(match['rule']._name, match['rule'].id))
+                for match in matches
+            ]
+
+    def _merge_background_results(self, chunks, results):
+        total = len(chunks)
+        for index, (item_ids, matches) in enumerate(zip(chunks, results), start=1):
+            items = self.env['account.bank.statement.line'].browse(item_ids)
+            for match in matches:
+                if not isinstance(match['source'], int):
+                    continue
+                rule_model, rule_id = match['rule']
+                match.update(
+                    source=items.browse(match['source']),
+                    invoice=self.env['account.move'].browse(match['invoice']),
+                    rule=self.env[rule_model].browse(rule_id),
+                )
+            self._classify_results(items, matches)
+            self.write({
+                'last_item_id': item_ids[-1],
+                'progress': index * 100.0 / total,
+            })
+            self._notify_progress(f'Lote {index} de {total} procesado')
+            self._commit_background()
+
+    def _commit_background(self):
+        if not self.env.registry.in_test_mode():
+            self.env.cr.commit()
+
+    def _notify_progress(self, message, notification_type='info'):
+        self.env.user.partner_id._bus_send('simple_notification', {
+            'type': notification_type,
+            'title': 'Conciliación Automática',
+            'message': message,
+        })
+
+    def action_review_suggestions(self):
+        """Abrir vista OCA con sugerencias"""
+        self.ensure_one()
+        return {
+            'type': 'ir.actions.act_window',
+            'name': 'Revisar Sugerencias de Conciliación',
+            'res_model': 'account.bank.statement.line',
+            'view_mode': 'kanban',
+            'view_id': self.env.ref('account_reconcile_oca.bank_statement_line_reconcile_view').id,
+            'domain': [('id', 'in', self.suggestion_ids.ids)],
+            'context': {
+                'view_ref': 'account_reconcile_oca.bank_statement_line_form_reconcile_view',
+            },
+            'target': 'current',
+        }
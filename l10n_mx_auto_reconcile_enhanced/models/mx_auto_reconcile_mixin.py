@@ -0,0 +1,327 @@
+# -*- coding: utf-8 -*-
+
+from odoo import fields, models, _
+from odoo.exceptions import UserError
+from odoo.tools import SQL
+import logging
+
+_logger = logging.getLogger(__name__)
+
+# Facturas leídas por consulta al aplicar las reglas
+INVOICE_BATCH_SIZE = 10000
+
+
+class MxAutoReconcileMixin(models.AbstractModel):
+    """
+    Parámetros y motor de la conciliación automática, compartidos por el
+    wizard y por las ejecuciones en segundo plano.
+
+    Los modelos que lo heredan definen ``suggestion_ids`` y ``unmatched_ids``
+    con sus propias tablas de relación.
+    """
+    _name = 'mx.auto.reconcile.mixin'
+    _description = 'Motor de Conciliación Automática'
+
+    date_from = fields.Date(
+        string='Fecha Desde',
+        required=True,
+        default=fields.Date.context_today,
+    )
+    date_to = fields.Date(
+        string='Fecha Hasta',
+        required=True,
+        default=fields.Date.context_today,
+    )
+    company_id = fields.Many2one(
+        'res.company',
+        string='Compañía',
+        required=True,
+        default=lambda self: self.env.company,
+    )
+    journal_ids = fields.Many2many(
+        'account.journal',
+        string='Diarios',
+        domain="[('type', '=', 'bank')]",
+    )
+
+    # Opciones
+    source_type = fields.Selection([
+        ('statement_lines', 'Líneas Bancarias'),
+        ('payments', 'Pagos'),
+        ('both', 'Ambos'),
+    ], string='Tipo de Origen', default='statement_lines', required=True)
+
+    only_unreconciled = fields.Boolean(
+        string='Solo No Conciliados',
+        default=True,
+    )
+    apply_direct_rules = fields.Boolean(
+        string='Aplicar Reglas Directas',
+        default=True,
+    )
+    apply_relation_rules = fields.Boolean(
+        string='Aplicar Reglas por Relación',
+        default=True,
+    )
+    min_match_score = fields.Float(
+        string='Score Mínimo (%)',
+        default=80.0,
+        help='Score mínimo para considerar un match',
+    )
+    batch_size = fields.Integer(
+        string='Tamaño del Lote',
+        default=2000,
+        help='Número máximo de items procesados en cada ejecución',
+    )
+
+    def _get_reconcile_params(self):
+        """Valores de los parámetros de la conciliación, para copiarlos a otra ejecución"""
+        self.ensure_one()
+        return {
+            'date_from': self.date_from,
+            'date_to': self.date_to,
+            'company_id': self.company_id.id,
+            'journal_ids': [(6, 0, self.journal_ids.ids)],
+            'source_type': self.source_type,
+            'only_unreconciled': self.only_unreconciled,
+            'apply_direct_rules': self.apply_direct_rules,
+            'apply_relation_rules': self.apply_relation_rules,
+            'min_match_score': self.min_match_score,
+            'batch_size': self.batch_size,
+        }
+
+    def _check_target_invoices(self):
+        if not self.env['account.move'].search(self._get_target_invoices_domain(), limit=1):
+            raise UserError(_('No se encontraron facturas para conciliar.\n\n'
+                            'Verifique que existan facturas publicadas con estado de pago "No Pagado" o "Parcialmente Pagado".'))
+
+    def _score_items(self, items):
+        """
+        Aplicar las reglas a los items contra todas las facturas objetivo.
+
+        Sólo lee datos, por lo que puede ejecutarse en otro cursor.
+
+        :return: Lista de matches (ver ``_apply_direct_rules``)
+        """
+        all_matches = []
+
+        for invoices in self._iter_target_invoices():
+            _logger.info(f"Facturas objetivo en lote: {len(invoices)}")
+
+            if self.apply_direct_rules:
+                _logger.info("Aplicando reglas directas...")
+                direct_matches = self._apply_direct_rules(items, invoices)
+                _logger.info(f"Reglas directas: {len(direct_matches)} matches encontrados")
+                all_matches.extend(direct_matches)
+
+            if self.apply_relation_rules:
+                _logger.info("Aplicando reglas por relación...")
+                relation_matches = self._apply_relation_rules(items, invoices)
+                _logger.info(f"Reglas por relación: {len(relation_matches)} matches encontrados")
+                all_matches.extend(relation_matches)
+
+        _logger.info(f"Total de matches encontrados: {len(all_matches)}")
+        return all_matches
+
+    def _get_unreconciled_items(self, after_id=0, limit=None):
+        """
+        Obtener items sin conciliar con paginación por llave.
+
+        Las líneas bancarias del período y las líneas conciliadas con los
+        pagos del período se resuelven en una sola consulta.
+
+        :param after_id: Id del último item ya procesado
+        :param limit: Número máximo de items
+        :return: Tupla (líneas bancarias ordenadas por id, hay más items)
+        """
+        StatementLine = self.env['account.bank.statement.line']
+        item_queries = []
+
+        if self.source_type in ('statement_lines', 'both'):
+            line_query = StatementLine._search(self._get_statement_line_domain())
+            item_queries.append(SQL(
+                "SELECT id FROM account_bank_statement_line WHERE id IN %s",
+                line_query.subselect(),
+            ))
+
+        if self.source_type in ('payments', 'both'):
+            item_queries.append(self._get_payment_statement_lines_query())
+
+        if not item_queries:
+            return StatementLine, False
+
+        self.env.cr.execute(SQL(
+            """
+            SELECT items.id
+            FROM (%(items)s) AS items(id)
+            WHERE items.id > %(after_id)s
+            GROUP BY items.id
+            ORDER BY items.id
+            %(limit)s
+            """,
+            items=SQL(" UNION ").join(item_queries),
+            after_id=after_id or 0,
+            limit=SQL("LIMIT %s", limit + 1) if limit else SQL(),
+        ))
+        item_ids = [row[0] for row in self.env.cr.fetchall()]
+        has_more_items = bool(limit) and len(item_ids) > limit
+        if has_more_items:
+            item_ids = item_ids[:limit]
+        _logger.info(f"Items en el lote: {len(item_ids)} (pendientes: {has_more_items})")
+        return StatementLine.browse(item_ids), has_more_items
+
+    def _get_statement_line_domain(self):
+        """Dominio de las líneas bancarias del período"""
+        domain = [
+            ('date', '>=', self.date_from),
+            ('date', '<=', self.date_to),
+            ('company_id', '=', self.company_id.id),
+        ]
+
+        if self.journal_ids:
+            domain.append(('journal_id', 'in', self.journal_ids.ids))
+
+        if self.only_unreconciled:
+            domain.append(('is_reconciled', '=', False))
+
+        return domain
+
+    def _get_payment_statement_lines_query(self):
+        """Consulta de las líneas bancarias conciliadas con los pagos del período"""
+        payment_domain = [
+            ('date', '>=', self.date_from),
+            ('date', '<=', self.date_to),
+            ('company_id', '=', self.company_id.id),
+            ('state', '=', 'posted'),
+        ]
+
+        if self.journal_ids:
+            payment_domain.append(('journal_id', 'in', self.journal_ids.ids))
+
+        payment_query = self.env['account.payment']._search(payment_domain)
+        return SQL(
+            """
+            SELECT st_line.id
+            FROM account_payment payment
+            JOIN account_move_line pay_line ON pay_line.move_id = payment.move_id
+            JOIN account_partial_reconcile partial
+                ON pay_line.id IN (partial.debit_move_id, partial.credit_move_id)
+            JOIN account_move_line st_aml
+                ON st_aml.id IN (partial.debit_move_id, partial.credit_move_id)
+                AND st_aml.id != pay_line.id
+            JOIN account_bank_statement_line st_line ON st_line.move_id = st_aml.move_id
+            WHERE payment.id IN %(payment_ids)s
+            """,
+            payment_ids=payment_query.subselect(),
+        )
+
+    def _get_target_invoices_domain(self):
+        return [
+            ('state', '=', 'posted'),
+            ('payment_state', 'in', ['not_paid', 'partial']),
+            ('company_id', '=', self.company_id.id),
+        ]
+
+    def _iter_target_invoices(self, batch_size=INVOICE_BATCH_SIZE):
+        """Recorrer las facturas objetivo por lotes con paginación por llave"""
+        domain = self._get_target_invoices_domain()
+        last_id = 0
+        while True:
+            invoices = self.env['account.move'].search(
+                domain + [('id', '>', last_id)], order='id', limit=batch_size,
+            )
+            if not invoices:
+                return
+            yield invoices
+            if len(invoices) < batch_size:
+                return
+            last_id = invoices[-1].id
+
+    def _apply_direct_rules(self, items, invoices):
+        """Aplicar reglas directas"""
+        rules = self.env['mx.reconcile.rule'].search([
+            ('active', '=', True),
+            ('source_model', '=', 'statement_line'),
+        ], order='sequence, priority desc')
+
+        all_matches = []
+        for rank, rule in enumerate(rules):
+            matches = rule.apply_rule(items, invoices)
+            for source, invoice, score in matches:
+                if score >= self.min_match_score:
+                    all_matches.append({
+                        'source': source,
+                        'invoice': invoice,
+                        'score': score,
+                        'rule': rule,
+                        'rule_type': 'direct',
+                        'rule_priority': (0, rank),
+                    })
+        return all_matches
+
+    def _apply_relation_rules(self, items, invoices):
+        """Aplicar reglas por relación"""
+        rules = self.env['mx.reconcile.relation.rule'].search([
+            ('active', '=', True),
+        ], order='sequence, priority desc')
+
+        all_matches = []
+        for rank, rule in enumerate(rules):
+            matches = rule.apply_relation_rule(items, invoices)
+            for source, invoice, score, related_doc in matches:
+                if score >= self.min_match_score:
+                    all_matches.append({
+                        'source': source,
+                        'invoice': invoice,
+                        'score': score,
+                        'rule': rule,
+                        'rule_type': 'relation',
+                        'rule_priority': (1, rank),
+                        'related_doc': related_doc,
+                    })
+        return all_matches
+
+    def _classify_results(self, items, matches):
+        """Clasificar resultados en sugerencias y sin match"""
+        # Orden determinista: mejor score primero, luego prioridad de la regla
+        matches = sorted(matches, key=lambda m: (
+            m['source'].id, -m['score'], m['rule_priority'], m['invoice'].id,
+        ))
+
+        suggestion_ids = set()
+        log_vals = []
+
+        for match in matches:
+            source = match['source']
+
+            # Sugerir a cada línea su mejor match
+            if source.id not in suggestion_ids:
+                source.write({
+                    'suggested_invoice_id': match['invoice'].id,
+                    'reconcile_match_score': match['score'],
+                    'reconcile_rule_id': match['rule'].id if match['rule_type'] == 'direct' else False,
+                })
+                suggestion_ids.add(source.id)
+
+            log_vals.append({
+                'statement_line_id': source.id,
+                'invoice_id': match['invoice'].id,
+                'rule_id': match['rule'].id if match['rule_type'] == 'direct' else False,
+                'relation_rule_id': match['rule'].id if match['rule_type'] == 'relation' else False,
+                'rule_type': match['rule_type'],
+                'match_score': match['score'],
+                'state': 'confirmed' if match['score'] >= 95.0 else 'pending',
+            })
+
+        # Crear logs en una sola operación
+        self.env['mx.reconcile.log'].create(log_vals)
+
+        # Items sin match
+        suggestions = items.browse(sorted(suggestion_ids))
+        unmatched = items - suggestions
+
+        # Acumular con los lotes anteriores de la misma ejecución
+        self.write({
+            'suggestion_ids': [(4, line_id) for line_id in suggestions.ids],
+            'unmatched_ids': [(4, line_id) for line_id in unmatched.ids],
+        })
@@ -2,12 +2,136 @@
 
 from odoo import fields, models, api, _
 from odoo.exceptions import ValidationError
+from odoo.osv import expression
+from odoo.tools import SQL
 import re
 import logging
+import math
+from collections import defaultdict
 from difflib import SequenceMatcher
 
 _logger = logging.getLogger(__name__)
 
+INVOICE_MOVE_TYPES = ('out_invoice', 'in_invoice', 'out_refund', 'in_refund')
+
+# Condición SQL entre el valor del documento intermedio y el valor del pago
+RELATION_SQL_OPERATORS = {
+    '=': "docs.value = v.value",
+    'in': "docs.value = v.value",
+    'ilike': "docs.value ILIKE '%%' || v.value || '%%'",
+    '=ilike': "docs.value ILIKE '%%' || v.value || '%%'",
+    'like': "docs.value LIKE '%%' || v.value || '%%'",
+}
+
+# Similitud mínima de trigramas para proponer un candidato fuzzy
+TRIGRAM_MIN_SIMILARITY = 0.2
+
+
+def _trigrams(value):
+    """Trigramas del valor con bordes, al estilo de pg_trgm"""
+    padded = f'  {value} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class MatchIndex:
+    """
+    Índice de valores normalizados para no comparar cada valor buscado
+    contra todos los registros.
+
+    Propone como candidatos los valores iguales, los contenidos en el valor
+    buscado, los que lo contienen y los que comparten suficientes trigramas.
+    Sólo los candidatos se comparan con ``compare``, y el resultado se guarda
+    por valor buscado.
+    """
+
+    def __init__(self, compare, min_score):
+        self.compare = compare
+        self.min_score = min_score
+        self.records_by_value = defaultdict(list)
+        self.values_by_trigram = defaultdict(set)
+        self.values_by_length = defaultdict(set)
+        self.trigrams_by_value = {}
+        self._cache = {}
+
+    def add(self, value, record):
+        if value not in self.records_by_value:
+            trigrams = _trigrams(value)
+            self.trigrams_by_value[value] = trigrams
+            for trigram in trigrams:
+                self.values_by_trigram[trigram].add(value)
+            self.values_by_length[len(value)].add(value)
+        self.records_by_value[value].append(record)
+
+    def search(self, value):
+        """
+        :return: Lista de tuplas (record, valor_indexado, score) en el orden
+            en que se agregaron los registros
+        """
+        if value not in self._cache:
+            scores = []
+            for candidate in self._get_candidates(value):
+                score = self.compare(value, candidate)
+                if score >= self.min_score:
+                    scores.append((candidate, score))
+            self._cache[value] = scores
+        results = [
+            (position, record, candidate, score)
+            for candidate, score in self._cache[value]
+            for position, record in self.records_by_value[candidate]
+        ]
+        return [result[1:] for result in sorted(results, key=lambda r: r[0])]
+
+    def _get_candidates(self, value):
+        ratio = self.min_score / 100.0
+        if ratio <= 0:
+            return set(self.records_by_value)
+        candidates = set()
+        length = len(value)
+        if value in self.records_by_value:
+            candidates.add(value)
+        # Valores contenidos en el buscado (score = largo menor / largo mayor)
+        for sub_length in range(max(math.ceil(length * ratio), 1), length):
+            for start in range(length - sub_length + 1):
+                sub_value = value[start:start + sub_length]
+                if sub_value in self.records_by_value:
+                    candidates.add(sub_value)
+        # Valores que contienen al buscado
+        max_length = math.floor(length / ratio)
+        if length >= 3:
+            postings = sorted(
+                (self.values_by_trigram.get(value[i:i + 3], set())
+                 for i in range(length - 2)),
+                key=len,
+            )
+            containing = set(postings[0]).intersection(*postings[1:])
+            candidates.update(
+                candidate for candidate in containing
+                if len(candidate) <= max_length and value in candidate
+            )
+        else:
+            for candidate_length in range(length + 1, max_length + 1):
+                candidates.update(
+                    candidate for candidate in self.values_by_length.get(candidate_length, ())
+                    if value in candidate
+                )
+        # Candidatos fuzzy: SequenceMatcher.ratio() <= 2 * menor / (suma de largos)
+        trigrams = _trigrams(value)
+        shared = defaultdict(int)
+        for trigram in trigrams:
+            for candidate in self.values_by_trigram.get(trigram, ()):
+                shared[candidate] += 1
+        for candidate, count in shared.items():
+            if candidate in candidates:
+                continue
+            candidate_length = len(candidate)
+            if 2 * min(length, candidate_length) < ratio * (length + candidate_length):
+                continue
+            similarity = count / max(len(trigrams), len(self.trigrams_by_value[candidate]))
+            if similarity >= TRIGRAM_MIN_SIMILARITY:
+                candidates.add(candidate)
+        return candidates
+
+
 class MxReconcileRuleUnified(models.Model):
     """Sistema unificado de conciliación - Más simple y flexible"""
     _name = 'mx.reconcile.rule.unified'
@@ -168,6 +292,17 @@ class MxReconcileRuleUnified(models.Model):
     def _apply_direct_match(self, payments, invoices):
         """Búsqueda directa: Pago → Factura"""
         matches = []
+        regex = self._get_extract_regex()
+
+        # Indexar facturas una sola vez por valor normalizado
+        index = MatchIndex(self._compare_values, self.min_score)
+        for position, invoice in enumerate(invoices):
+            invoice_value = self._get_field_value(invoice, self.invoice_search_field_id)
+            if not invoice_value:
+                continue
+            invoice_value = self._normalize_value(invoice_value)
+            if invoice_value:
+                index.add(invoice_value, (position, invoice))
 
         for payment in payments:
             # Obtener valor del campo del pago
@@ -177,29 +312,21 @@ class MxReconcileRuleUnified(models.Model):
 
             # Extraer valor si hay patrón
             if self.extract_pattern:
-                payment_value = self._extract_with_pattern(payment_value)
+                payment_value = self._extract_with_pattern(payment_value, regex)
                 if not payment_value:
                     continue
 
             # Normalizar
             payment_value = self._normalize_value(payment_value)
+            if not payment_value:
+                continue
 
             _logger.debug(f"Buscando coincidencia para: {payment_value}")
 
-            # Buscar en facturas
-            for invoice in invoices:
-                invoice_value = self._get_field_value(invoice, self.invoice_search_field_id)
-                if not invoice_value:
-                    continue
-
-                invoice_value = self._normalize_value(invoice_value)
-
-                # Comparar
-                score = self._compare_values(payment_value, invoice_value)
-
-                if score >= self.min_score:
-                    _logger.info(f"  ✓ Match: {payment.id} → {invoice.id} (score: {score}%)")
-                    matches.append((payment, invoice, score, f'Directo: {payment_value} = {invoice_value}'))
+            # Buscar en el índice de facturas
+            for invoice, invoice_value, score in index.search(payment_value):
+                _logger.debug(f"  ✓ Match: {payment.id} → {invoice.id} (score: {score}%)")
+                matches.append((payment, invoice, score, f'Directo: {payment_value} = {invoice_value}'))
 
         _logger.info(f"[DIRECTO] {len(matches)} matches encontrados")
         return matches
@@ -207,49 +334,41 @@ class MxReconcileRuleUnified(models.Model):
     def _apply_relation_match(self, payments, invoices):
         """Búsqueda por relación: Pago → Documento → Factura"""
         matches = []
+        regex = self._get_extract_regex()
 
+        # Obtener valores normalizados de todos los pagos
+        payment_values = []
         for payment in payments:
-            # Obtener valor del campo del pago
             payment_value = self._get_field_value(payment, self.payment_search_field_id)
             if not payment_value:
                 continue
 
             # Extraer valor si hay patrón
             if self.extract_pattern:
-                payment_value = self._extract_with_pattern(payment_value)
+                payment_value = self._extract_with_pattern(payment_value, regex)
                 if not payment_value:
                     continue
 
             # Normalizar
             payment_value = self._normalize_value(payment_value)
+            payment_values.append((payment, payment_value))
 
-            _logger.debug(f"Buscando {self.relation_model} con: {payment_value}")
-
-            # Construir dominio de búsqueda para documento intermedio
-            search_field_name = self.relation_search_field_id.name if self.relation_search_field_id else 'name'
-            domain = self._build_search_domain(search_field_name, payment_value)
-
-            # Agregar filtro adicional de documentos
-            domain = domain + self._parse_domain(self.relation_domain)
-
-            # Buscar documentos intermedios
-            related_docs = self.env[self.relation_model].search(domain)
+        # Buscar todos los documentos intermedios de una vez
+        docs_by_value = self._search_relation_docs({value for _payment, value in payment_values})
+        related_docs = self.env[self.relation_model].concat(*docs_by_value.values())
+        invoices_by_doc = self._get_relation_invoices(related_docs)
 
+        for payment, payment_value in payment_values:
+            related_docs = docs_by_value.get(payment_value)
             if not related_docs:
-                _logger.debug(f"  No se encontraron {self.relation_model}")
+                _logger.debug(f"  No se encontraron {self.relation_model} para {payment_value}")
                 continue
 
             _logger.debug(f"  Encontrados {len(related_docs)} documentos: {related_docs.mapped('name')}")
 
             # Obtener facturas desde documentos intermedios
-            relation_invoices = self.env['account.move']
-            for doc in related_docs:
-                doc_invoices = getattr(doc, self.relation_to_invoice_field, self.env['account.move'])
-                relation_invoices |= doc_invoices
-
-            # Filtrar solo facturas válidas (no borradores, etc)
-            relation_invoices = relation_invoices.filtered(
-                lambda inv: inv.move_type in ('out_invoice', 'in_invoice', 'out_refund', 'in_refund')
+            relation_invoices = self.env['account.move'].concat(
+                *(invoices_by_doc[doc.id] for doc in related_docs)
             )
 
             # Intersección con facturas objetivo
@@ -260,12 +379,88 @@ class MxReconcileRuleUnified(models.Model):
             for invoice in matching_invoices:
                 score = 85.0  # Score alto por match por relación
                 doc_info = f"{self.relation_model}: {related_docs[0].name}"
-                _logger.info(f"  ✓ Match por relación: {payment.id} → {invoice.id} via {doc_info}")
+                _logger.debug(f"  ✓ Match por relación: {payment.id} → {invoice.id} via {doc_info}")
                 matches.append((payment, invoice, score, doc_info))
 
         _logger.info(f"[RELACIÓN] {len(matches)} matches encontrados")
         return matches
 
+    def _search_relation_docs(self, values):
+        """
+        Buscar los documentos intermedios de todos los valores de pago.
+
+        Con un campo almacenado de texto se resuelve con una sola consulta
+        que cruza los valores con los documentos; en otro caso se hace una
+        búsqueda por valor.
+
+        :return: Diccionario {valor: documentos}
+        """
+        RelationModel = self.env[self.relation_model]
+        search_field_name = self.relation_search_field_id.name if self.relation_search_field_id else 'name'
+        relation_domain = self._parse_domain(self.relation_domain)
+        values = [value for value in values if value]
+        if not values:
+            return {}
+
+        field = RelationModel._fields.get(search_field_name)
+        operator = RELATION_SQL_OPERATORS.get(self.comparison_operator)
+        if not (field and field.store and field.type in ('char', 'text') and operator):
+            return {
+                value: RelationModel.search(
+                    self._build_search_domain(search_field_name, value) + relation_domain
+                )
+                for value in values
+            }
+
+        query = RelationModel._search(relation_domain)
+        docs_query = query.select(
+            SQL.identifier(RelationModel._table, 'id'),
+            SQL('%s AS value', RelationModel._field_to_sql(RelationModel._table, search_field_name, query)),
+        )
+        self.env.cr.execute(SQL(
+            """
+            SELECT v.value, docs.id
+            FROM unnest(%(values)s::text[]) AS v(value)
+            JOIN (%(docs_query)s) AS docs ON %(operator)s
+            """,
+            values=values,
+            docs_query=docs_query,
+            operator=SQL(operator),
+        ))
+        doc_ids_by_value = defaultdict(set)
+        for value, doc_id in self.env.cr.fetchall():
+            doc_ids_by_value[value].add(doc_id)
+
+        # Conservar el orden del modelo en los documentos de cada valor
+        all_docs = RelationModel.search([
+            ('id', 'in', list(set().union(*doc_ids_by_value.values()))),
+        ])
+        order = {doc_id: index for index, doc_id in enumerate(all_docs.ids)}
+        return {
+            value: RelationModel.browse(
+                sorted(doc_ids & order.keys(), key=order.get)
+            ).with_prefetch(all_docs._prefetch_ids)
+            for value, doc_ids in doc_ids_by_value.items()
+        }
+
+    def _get_relation_invoices(self, docs):
+        """
+        Leer de una vez las facturas de los documentos intermedios.
+
+        :return: Diccionario {id de documento: facturas}
+        """
+        empty = self.env['account.move']
+        if self.relation_to_invoice_field not in docs._fields:
+            return defaultdict(lambda: empty)
+        # Precargar la relación de todos los documentos en una sola lectura
+        docs.mapped(self.relation_to_invoice_field)
+        invoices_by_doc = defaultdict(lambda: empty)
+        for doc in docs:
+            invoices_by_doc[doc.id] = doc[self.relation_to_invoice_field].filtered(
+                lambda inv: inv.move_type in INVOICE_MOVE_TYPES
+            )
+        return invoices_by_doc
+
     def _apply_relation_reverse_match(self, payments, invoices):
         """
         Búsqueda inversa: Documento → Pago → Factura
@@ -292,10 +487,30 @@ class MxReconcileRuleUnified(models.Model):
 
         _logger.info(f"  Encontrados {len(related_docs)} documentos: {related_docs.mapped('name')}")
 
+        # Indexar pagos una sola vez por valor normalizado
+        regex = self._get_extract_regex()
+        index = MatchIndex(self._compare_values, self.min_score)
+        for position, payment in enumerate(payments):
+            payment_value = self._get_field_value(payment, self.payment_search_field_id)
+            if not payment_value:
+                continue
+
+            # Extraer valor si hay patrón
+            if self.extract_pattern:
+                extracted = self._extract_with_pattern(payment_value, regex)
+                if extracted:
+                    payment_value = extracted
+
+            payment_value = self._normalize_value(payment_value)
+            if payment_value:
+                index.add(payment_value, (position, payment))
+
+        search_field_name = self.relation_search_field_id.name if self.relation_search_field_id else 'name'
+        invoices_by_doc = self._get_relation_invoices(related_docs)
+
         # Para cada documento
         for doc in related_docs:
             # Obtener el valor del campo del documento que vamos a buscar en los pagos
-            search_field_name = self.relation_search_field_id.name if self.relation_search_field_id else 'name'
             doc_value = getattr(doc, search_field_name, '')
 
             if not doc_value:
@@ -303,40 +518,21 @@ class MxReconcileRuleUnified(models.Model):
                 continue
 
             doc_value = self._normalize_value(str(doc_value))
+            if not doc_value:
+                continue
             _logger.debug(f"  Buscando pagos que referencien: {doc_value}")
 
             # Buscar pagos que contengan esta referencia
-            matching_payments = []
-            for payment in payments:
-                payment_value = self._get_field_value(payment, self.payment_search_field_id)
-                if not payment_value:
-                    continue
-
-                # Extraer valor si hay patrón
-                if self.extract_pattern:
-                    extracted = self._extract_with_pattern(payment_value)
-                    if extracted:
-                        payment_value = extracted
-
-                payment_value = self._normalize_value(payment_value)
-
-                # Comparar
-                score = self._compare_values(doc_value, payment_value)
-                if score >= self.min_score:
-                    matching_payments.append((payment, score))
-                    _logger.debug(f"    ✓ Pago {payment.id} ({payment.payment_ref}) score: {score}%")
+            matching_payments = [
+                (payment, score) for payment, _value, score in index.search(doc_value)
+            ]
 
             if not matching_payments:
                 _logger.debug(f"  No se encontraron pagos para documento {doc.name}")
                 continue
 
-            # Obtener facturas del documento
-            doc_invoices = getattr(doc, self.relation_to_invoice_field, self.env['account.move'])
-
-            # Filtrar solo facturas válidas
-            doc_invoices = doc_invoices.filtered(
-                lambda inv: inv.move_type in ('out_invoice', 'in_invoice', 'out_refund', 'in_refund')
-            )
+            # Obtener facturas válidas del documento
+            doc_invoices = invoices_by_doc[doc.id]
 
             # Intersección con facturas objetivo
             matching_invoices = doc_invoices & invoices
@@ -372,19 +568,33 @@ class MxReconcileRuleUnified(models.Model):
 
         return str(value) if value else ''
 
-    def _extract_with_pattern(self, text):
-        """Extraer valor usando regex"""
-        if not text or not self.extract_pattern:
-            return text
-
+    def _get_extract_regex(self):
+        """Compilar el patrón de extracción, una vez por ejecución de la regla"""
+        if not self.extract_pattern:
+            return None
         try:
-            pattern = re.compile(self.extract_pattern, re.IGNORECASE)
-            match = pattern.search(str(text))
-            if match:
-                # Si hay grupos, tomar el primero
-                return match.group(1) if match.groups() else match.group(0)
+            return re.compile(self.extract_pattern, re.IGNORECASE)
         except re.error as e:
             _logger.error(f"Error en patrón regex '{self.extract_pattern}': {e}")
+        return None
+
+    def _extract_with_pattern(self, text, regex=None):
+        """Extraer valor usando regex
+
+        :param regex: Patrón ya compilado con ``_get_extract_regex``
+        """
+        if not text or not self.extract_pattern:
+            return text
+
+        if regex is None:
+            regex = self._get_extract_regex()
+        if regex is None:
+            return None
+
+        match = regex.search(str(text))
+        if match:
+            # Si hay grupos, tomar el primero
+            return match.group(1) if match.groups() else match.group(0)
 
         return None
 
@@ -438,17 +648,16 @@ class MxReconcileRuleUnified(models.Model):
         return ratio * 100.0
 
     def _apply_domain_filter(self, records, domain_str):
-        """Aplicar filtro de domain a recordset"""
-        if not domain_str or domain_str == '[]':
+        """Aplicar filtro de domain a recordset con una búsqueda en SQL"""
+        domain = self._parse_domain(domain_str)
+        if not domain or not records:
             return records
 
         try:
-            domain = eval(domain_str)
-            if not domain:
-                return records
-
-            # Filtrar usando el domain
-            return records.filtered(lambda r: self._match_domain(r, domain))
+            # La intersección conserva el orden de ``records``
+            return records & records.search(
+                expression.AND([[('id', 'in', records.ids)], domain])
+            )
         except Exception as e:
             _logger.warning(f"Error aplicando domain filter '{domain_str}': {e}")
             return records
@@ -463,37 +672,6 @@ class MxReconcileRuleUnified(models.Model):
         except:
             return []
 
-    def _match_domain(self, record, domain):
-        """Evaluar si un registro cumple con un domain"""
-        for condition in domain:
-            if len(condition) != 3:
-                continue
-
-            field, operator, value = condition
-            record_value = getattr(record, field, None)
-
-            if operator == '=' and record_value != value:
-                return False
-            elif operator == '!=' and record_value == value:
-                return False
-            elif operator == '>' and not (record_value and record_value > value):
-                return False
-            elif operator == '>=' and not (record_value and record_value >= value):
-                return False
-            elif operator == '<' and not (record_value and record_value < value):
-                return False
-            elif operator == '<=' and not (record_value and record_value <= value):
-                return False
-            elif operator == 'in' and record_value not in value:
-                return False
-            elif operator == 'not in' and record_value in value:
-                return False
-            elif operator == 'ilike':
-                if not (record_value and str(value).lower() in str(record_value).lower()):
-                    return False
-
-        return True
-
     def action_test_rule(self):
         """Abrir wizard de prueba"""
         return {
@@ -9,59 +9,26 @@ _logger = logging.getLogger(__name__)
 class MxAutoReconcileWizard(models.TransientModel):
     """Wizard de conciliación automática"""
     _name = 'mx.auto.reconcile.wizard'
+    _inherit = ['mx.auto.reconcile.mixin']
     _description = 'Wizard de Conciliación Automática'
 
-    date_from = fields.Date(
-        string='Fecha Desde',
-        required=True,
-        default=fields.Date.context_today,
-    )
-    date_to = fields.Date(
-        string='Fecha Hasta',
-        required=True,
-        default=fields.Date.context_today,
-    )
-    company_id = fields.Many2one(
-        'res.company',
-        string='Compañía',
-        required=True,
-        default=lambda self: self.env.company,
-    )
-    journal_ids = fields.Many2many(
-        'account.journal',
-        string='Diarios',
-        domain="[('type', '=', 'bank')]",
-    )
-
     tax_declaration_wizard_id = fields.Many2one(
         'mx.tax.declaration.wizard',
         string='Wizard de Declaración',
         ondelete='cascade',
     )
 
-    # Opciones
-    source_type = fields.Selection([
-        ('statement_lines', 'Líneas Bancarias'),
-        ('payments', 'Pagos'),
-        ('both', 'Ambos'),
-    ], string='Tipo de Origen', default='statement_lines', required=True)
-
-    only_unreconciled = fields.Boolean(
-        string='Solo No Conciliados',
-        default=True,
-    )
-    apply_direct_rules = fields.Boolean(
-        string='Aplicar Reglas Directas',
-        default=True,
+    run_in_background = fields.Boolean(
+        string='Ejecutar en Segundo Plano',
+        help='Procesar todos los items en segundo plano, por lotes en paralelo, '
+             'notificando el avance al usuario',
     )
-    apply_relation_rules = fields.Boolean(
-        string='Aplicar Reglas por Relación',
-        default=True,
-    )
-    min_match_score = fields.Float(
-        string='Score Mínimo (%)',
-        default=80.0,
-        help='Score mínimo para considerar un match',
+
+    # Paginación por llave: último item procesado
+    last_item_id = fields.Integer(readonly=True)
+    has_more_items = fields.Boolean(
+        string='Items Pendientes',
+        readonly=True,
     )
 
     # Resultados (Computed)
@@ -126,8 +93,19 @@ class MxAutoReconcileWizard(models.TransientModel):
         _logger.info(f"Compañía: {self.company_id.name}")
         _logger.info("=" * 80)
 
-        # Obtener items sin conciliar
-        items = self._get_unreconciled_items()
+        if self.run_in_background:
+            return self._enqueue_background_run()
+
+        # Una ejecución nueva empieza desde el primer item
+        if not self.has_more_items:
+            self.write({
+                'last_item_id': 0,
+                'suggestion_ids': [(5, 0, 0)],
+                'unmatched_ids': [(5, 0, 0)],
+            })
+
+        # Obtener el siguiente lote de items sin conciliar
+        items, has_more_items = self._get_unreconciled_items(after_id=self.last_item_id, limit=self.batch_size)
         _logger.info(f"Items sin conciliar encontrados: {len(items)}")
         
         if not items:
@@ -135,33 +113,17 @@ class MxAutoReconcileWizard(models.TransientModel):
                             'Período: %s - %s\n'
                             'Compañía: %s') % (self.date_from, self.date_to, self.company_id.name))
 
-        # Obtener facturas objetivo
-        invoices = self._get_target_invoices()
-        _logger.info(f"Facturas objetivo encontradas: {len(invoices)}")
-        
-        if not invoices:
-            raise UserError(_('No se encontraron facturas para conciliar.\n\n'
-                            'Verifique que existan facturas publicadas con estado de pago "No Pagado" o "Parcialmente Pagado".'))
+        self._check_target_invoices()
 
-        # Aplicar reglas
-        all_matches = []
-        
-        if self.apply_direct_rules:
-            _logger.info("Aplicando reglas directas...")
-            direct_matches = self._apply_direct_rules(items, invoices)
-            _logger.info(f"Reglas directas: {len(direct_matches)} matches encontrados")
-            all_matches.extend(direct_matches)
-
-        if self.apply_relation_rules:
-            _logger.info("Aplicando reglas por relación...")
-            relation_matches = self._apply_relation_rules(items, invoices)
-            _logger.info(f"Reglas por relación: {len(relation_matches)} matches encontrados")
-            all_matches.extend(relation_matches)
-
-        _logger.info(f"Total de matches encontrados: {len(all_matches)}")
+        # Aplicar reglas por lotes de facturas
+        all_matches = self._score_items(items)
 
         # Clasificar resultados
         self._classify_results(items, all_matches)
+        self.write({
+            'last_item_id': items[-1].id,
+            'has_more_items': has_more_items,
+        })
 
         _logger.info("=" * 80)
         _logger.info("PROCESO DE CONCILIACIÓN COMPLETADO")
@@ -170,163 +132,45 @@ class MxAutoReconcileWizard(models.TransientModel):
         _logger.info(f"Sin match: {self.total_unmatched}")
         _logger.info("=" * 80)
 
+        message = f'Procesados: {self.total_processed} | Sugerencias: {self.total_suggestions} | Sin match: {self.total_unmatched}'
+        params = {
+            'title': 'Conciliación Completada',
+            'message': message,
+            'type': 'success',
+            'sticky': True,
+        }
+        if self.has_more_items:
+            # Reabrir el wizard para procesar el siguiente lote
+            params['message'] += ' | Quedan items pendientes, procese el siguiente lote'
+            params['next'] = {
+                'type': 'ir.actions.act_window',
+                'res_model': self._name,
+                'res_id': self.id,
+                'view_mode': 'form',
+                'target': 'new',
+            }
+
         return {
             'type': 'ir.actions.client',
             'tag': 'display_notification',
-            'params': {
-                'title': 'Conciliación Completada',
-                'message': f'Procesados: {self.total_processed} | Sugerencias: {self.total_suggestions} | Sin match: {self.total_unmatched}',
-                'type': 'success',
-                'sticky': True,
-            }
+            'params': params,
         }
 
-    def _get_unreconciled_items(self):
-        """Obtener items sin conciliar"""
-        items = self.env['account.bank.statement.line']
-        
-        if self.source_type in ('statement_lines', 'both'):
-            # Dominio para líneas bancarias
-            domain = [
-                ('date', '>=', self.date_from),
-                ('date', '<=', self.date_to),
-                ('company_id', '=', self.company_id.id),
-            ]
-
-            if self.journal_ids:
-                domain.append(('journal_id', 'in', self.journal_ids.ids))
-
-            # Buscar todas las líneas en el período
-            all_lines = self.env['account.bank.statement.line'].search(domain)
-            
-            _logger.info(f"Total de líneas bancarias en período: {len(all_lines)}")
-            
-            if self.only_unreconciled:
-                # Filtrar las que NO están conciliadas
-                # En Odoo 18, una línea está conciliada si tiene move_id y está reconciliada
-                unreconciled = all_lines.filtered(
-                    lambda line: not line.is_reconciled if hasattr(line, 'is_reconciled') 
-                    else (not line.move_id or line.move_id.state != 'posted' or 
-                          any(not l.reconciled for l in line.move_id.line_ids.filtered(lambda l: l.account_id.reconcile)))
-                )
-                _logger.info(f"Líneas sin conciliar: {len(unreconciled)}")
-                items |= unreconciled
-            else:
-                items |= all_lines
-
-        if self.source_type in ('payments', 'both'):
-            # Dominio para pagos
-            payment_domain = [
-                ('date', '>=', self.date_from),
-                ('date', '<=', self.date_to),
-                ('company_id', '=', self.company_id.id),
-                ('state', '=', 'posted'),
-            ]
-            
-            if self.journal_ids:
-                payment_domain.append(('journal_id', 'in', self.journal_ids.ids))
-            
-            payments = self.env['account.payment'].search(payment_domain)
-            _logger.info(f"Pagos encontrados: {len(payments)}")
-            
-            # Convertir pagos a líneas bancarias si tienen
-            for payment in payments:
-                if payment.line_ids:
-                    # Buscar la línea bancaria asociada
-                    stmt_line = self.env['account.bank.statement.line'].search([
-                        ('payment_id', '=', payment.id)
-                    ], limit=1)
-                    if stmt_line:
-                        items |= stmt_line
-
-        return items
-
-    def _get_target_invoices(self):
-        """Obtener facturas objetivo para conciliar"""
-        return self.env['account.move'].search([
-            ('state', '=', 'posted'),
-            ('payment_state', 'in', ['not_paid', 'partial']),
-            ('company_id', '=', self.company_id.id),
-        ])
-
-    def _apply_direct_rules(self, items, invoices):
-        """Aplicar reglas directas"""
-        rules = self.env['mx.reconcile.rule'].search([
-            ('active', '=', True),
-            ('source_model', '=', 'statement_line'),
-        ], order='sequence, priority desc')
-
-        all_matches = []
-        for rule in rules:
-            matches = rule.apply_rule(items, invoices)
-            for source, invoice, score in matches:
-                if score >= self.min_match_score:
-                    all_matches.append({
-                        'source': source,
-                        'invoice': invoice,
-                        'score': score,
-                        'rule': rule,
-                        'rule_type': 'direct',
-                    })
-        return all_matches
-
-    def _apply_relation_rules(self, items, invoices):
-        """Aplicar reglas por relación"""
-        rules = self.env['mx.reconcile.relation.rule'].search([
-            ('active', '=', True),
-        ], order='sequence, priority desc')
-
-        all_matches = []
-        for rule in rules:
-            matches = rule.apply_relation_rule(items, invoices)
-            for source, invoice, score, related_doc in matches:
-                if score >= self.min_match_score:
-                    all_matches.append({
-                        'source': source,
-                        'invoice': invoice,
-                        'score': score,
-                        'rule': rule,
-                        'rule_type': 'relation',
-                        'related_doc': related_doc,
-                    })
-        return all_matches
-
-    def _classify_results(self, items, matches):
-        """Clasificar resultados en sugerencias y sin match"""
-        matched_items = set()
-        suggestions = self.env['account.bank.statement.line']
-
-        for match in matches:
-            source = match['source']
-            matched_items.add(source.id)
-            
-            # Actualizar línea con sugerencia
-            source.write({
-                'suggested_invoice_id': match['invoice'].id,
-                'reconcile_match_score': match['score'],
-                'reconcile_rule_id': match['rule'].id if match['rule_type'] == 'direct' else False,
-            })
-
-            suggestions |= source
-
-            # Crear log
-            self.env['mx.reconcile.log'].create({
-                'statement_line_id': source.id,
-                'invoice_id': match['invoice'].id,
-                'rule_id': match['rule'].id if match['rule_type'] == 'direct' else False,
-                'relation_rule_id': match['rule'].id if match['rule_type'] == 'relation' else False,
-                'rule_type': match['rule_type'],
-                'match_score': match['score'],
-                'state': 'confirmed' if match['score'] >= 95.0 else 'pending',
-            })
-
-        # Items sin match
-        unmatched = items.filtered(lambda i: i.id not in matched_items)
-
-        self.write({
-            'suggestion_ids': [(6, 0, suggestions.ids)],
-            'unmatched_ids': [(6, 0, unmatched.ids)],
-        })
+    def _enqueue_background_run(self):
+        """Encolar la conciliación para el cron de segundo plano"""
+        self._check_target_invoices()
+        self.env['mx.auto.reconcile.job'].create(self._get_reconcile_params())
+        self.env.ref('l10n_mx_auto_reconcile_enhanced.ir_cron_mx_auto_reconcile_job').sudo()._trigger()
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': 'Conciliación en Segundo Plano',
+                'message': 'La conciliación se ejecutará en segundo plano, se le notificará el avance.',
+                'type': 'info',
+                'next': {'type': 'ir.actions.act_window_close'},
+            },
+        }
 
     def action_open_full_reconcile_view(self):
         """Abrir vista completa de conciliación OCA"""
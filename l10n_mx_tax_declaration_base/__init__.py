@@ -1,3 +1,8 @@
 # -*- coding: utf-8 -*-
 
 from . import models
+
+
+def post_init_hook(env):
+    """Construir los totales fiscales por período de las facturas existentes"""
+    env['mx.tax.period.aggregate']._rebuild()
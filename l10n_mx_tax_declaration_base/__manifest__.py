@@ -48,6 +48,7 @@
         'views/res_company_views.xml',
         'views/menu_views.xml',
     ],
+    'post_init_hook': 'post_init_hook',
     'installable': True,
     'application': True,
     'auto_install': False,
@@ -4,5 +4,7 @@ from . import mx_tax_obligation_type
 from . import mx_tax_periodicity
 from . import mx_tax_obligation
 from . import mx_tax_calculation_rule
+from . import mx_tax_period_aggregate
 from . import account_move
+from . import account_partial_reconcile
 from . import res_company
@@ -73,15 +73,36 @@ class AccountMove(models.Model):
         """Auto-marcar facturas para declaración según configuración de obligaciones"""
         records = super().create(vals_list)
 
-        for record in records:
+        # Los totales fiscales se actualizan una sola vez al final
+        aggregate_records = records.with_context(skip_tax_aggregate=True)
+        for record in aggregate_records:
             # Solo aplicar a facturas de cliente y proveedor
             if record.move_type in ('out_invoice', 'in_invoice', 'out_refund', 'in_refund'):
-                self._auto_mark_for_declaration(record)
+                aggregate_records._auto_mark_for_declaration(record)
+
+        self.env['mx.tax.period.aggregate']._apply_moves(records._get_tax_aggregate_moves())
 
         return records
 
     def write(self, vals):
         """Auto-marcar facturas cuando cambia su estado"""
+        # Se resta la contribución de las facturas a los totales fiscales
+        # antes de escribir y se suma la nueva al final; las escrituras
+        # anidadas no actualizan los totales porque ya quedan cubiertas.
+        update_aggregates = (
+            not self.env.context.get('skip_tax_aggregate')
+            and not self._get_tax_aggregate_fields().isdisjoint(vals)
+        )
+        if not update_aggregates:
+            return self._write_and_mark(vals)
+        aggregate_model = self.env['mx.tax.period.aggregate']
+        aggregate_model._apply_moves(self._get_tax_aggregate_moves(), sign=-1)
+        res = self.with_context(skip_tax_aggregate=True)._write_and_mark(vals)
+        aggregate_model._apply_moves(self._get_tax_aggregate_moves())
+        return res
+
+    def _write_and_mark(self, vals):
+        """Escribir las facturas y auto-marcar las que se confirman"""
         res = super().write(vals)
 
         # Si se confirma la factura, verificar auto-marcado
@@ -93,6 +114,22 @@ class AccountMove(models.Model):
 
         return res
 
+    @api.model
+    def _get_tax_aggregate_fields(self):
+        """Campos de la factura que afectan los totales fiscales por período"""
+        return {
+            'state', 'include_in_tax_declaration', 'tax_declaration_period',
+            'company_id', 'move_type', 'line_ids', 'invoice_line_ids',
+        }
+
+    def _get_tax_aggregate_moves(self):
+        """Facturas que contribuyen a los totales fiscales por período"""
+        return self.filtered(
+            lambda move: move.state == 'posted'
+            and move.include_in_tax_declaration
+            and move.tax_declaration_period
+        )
+
     def _auto_mark_for_declaration(self, invoice):
         """Marcar automáticamente factura según configuración de obligaciones"""
         # Buscar obligaciones activas de la compañía con auto-marcado
@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models, api
+
+
+class AccountPartialReconcile(models.Model):
+    """Actualizar los saldos pendientes de los totales fiscales al conciliar o romper conciliaciones"""
+    _inherit = 'account.partial.reconcile'
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        lines = self.env['account.move.line'].browse({
+            line_id
+            for vals in vals_list
+            for line_id in (vals.get('debit_move_id'), vals.get('credit_move_id'))
+            if line_id
+        })
+        moves = lines.move_id._get_tax_aggregate_moves()
+        aggregate_model = self.env['mx.tax.period.aggregate']
+        aggregate_model._apply_moves(moves, sign=-1)
+        partials = super().create(vals_list)
+        aggregate_model._apply_moves(moves._get_tax_aggregate_moves())
+        return partials
+
+    def unlink(self):
+        moves = (self.debit_move_id.move_id | self.credit_move_id.move_id)._get_tax_aggregate_moves()
+        aggregate_model = self.env['mx.tax.period.aggregate']
+        aggregate_model._apply_moves(moves, sign=-1)
+        res = super().unlink()
+        aggregate_model._apply_moves(moves._get_tax_aggregate_moves())
+        return res
@@ -1,12 +1,23 @@
 # -*- coding: utf-8 -*-
 
-from odoo import fields, models, api, _
+from odoo import fields, models, api, tools, _
 from odoo.exceptions import ValidationError, UserError
+from odoo.tools import SQL
 from odoo.tools.safe_eval import safe_eval
+from collections import defaultdict
+import heapq
 import logging
 
 _logger = logging.getLogger(__name__)
 
+# Reglas que se resuelven con una consulta agregada sobre las facturas
+AGGREGATE_CALCULATION_TYPES = ('simple_sum', 'simple_subtract', 'filtered_sum', 'filtered_subtract')
+FILTERED_CALCULATION_TYPES = ('filtered_sum', 'filtered_subtract')
+SUBTRACT_CALCULATION_TYPES = ('simple_subtract', 'filtered_subtract')
+# Reglas que dependen del resultado de otras reglas
+OPERAND_CALCULATION_TYPES = ('subtract', 'multiply', 'divide', 'percentage')
+REFUND_MOVE_TYPES = ('out_refund', 'in_refund')
+
 
 class MxTaxCalculationRule(models.Model):
     """Reglas de cálculo dinámico para obligaciones fiscales"""
@@ -150,6 +161,140 @@ class MxTaxCalculationRule(models.Model):
                         _('La fórmula Python tiene errores de sintaxis: %s') % str(e)
                     )
 
+    def calculate_all(self, invoices=None, payments=None, period_start=None, period_end=None, rules_results=None):
+        """
+        Ejecutar el cálculo de todas las reglas en una sola pasada
+
+        Las sumas y restas (simples y con filtros) se resuelven con una sola
+        consulta agregada; las demás reglas se calculan después, con los
+        operandos antes que las reglas que los usan.
+
+        :param rules_results: diccionario con resultados de otras reglas {rule_id: result},
+            se actualiza con los resultados de estas reglas
+        :return: diccionario {rule_id: result}
+        """
+        if invoices is None:
+            invoices = self.env['account.move']
+        if rules_results is None:
+            rules_results = {}
+
+        aggregate_rules = self.filtered(lambda r: r.calculation_type in AGGREGATE_CALCULATION_TYPES)
+        rules_results.update(aggregate_rules._calculate_aggregates(invoices))
+
+        for rule in (self - aggregate_rules)._sorted_by_dependencies():
+            rules_results[rule.id] = rule.calculate(
+                invoices=invoices,
+                payments=payments,
+                period_start=period_start,
+                period_end=period_end,
+                rules_results=rules_results,
+            )
+
+        return rules_results
+
+    def _calculate_aggregates(self, invoices):
+        """
+        Calcular las reglas de suma/resta con una consulta agregada
+
+        :return: diccionario {rule_id: result}
+        """
+        results = dict.fromkeys(self.ids, 0.0)
+        rules = self.filtered('field_to_sum')
+        if not rules or not invoices:
+            return results
+
+        Move = self.env['account.move']
+        move_type = Move._field_to_sql(Move._table, 'move_type')
+        aggregates = []
+        for rule in rules:
+            amount = Move._field_to_sql(Move._table, rule.field_to_sum)
+            if rule.calculation_type in SUBTRACT_CALCULATION_TYPES:
+                # Restar notas de crédito
+                amount = SQL("CASE WHEN %s IN %s THEN -%s ELSE %s END", move_type, REFUND_MOVE_TYPES, amount, amount)
+            aggregates.append(SQL(
+                "COALESCE(SUM(%s) FILTER (WHERE %s), 0)", amount, rule._get_aggregate_condition(),
+            ))
+
+        query = SQL(
+            "SELECT %s FROM %s WHERE %s IN %s",
+            SQL(", ").join(aggregates),
+            SQL.identifier(Move._table),
+            SQL.identifier(Move._table, 'id'),
+            tuple(invoices.ids),
+        )
+        # Escribir los cambios pendientes de los campos que lee la consulta
+        self.env.flush_query(query)
+        self.env.cr.execute(query)
+        results.update(zip(rules.ids, map(float, self.env.cr.fetchone())))
+        return results
+
+    def _get_aggregate_condition(self):
+        """Condición SQL del filtro de dominio de la regla sobre account_move"""
+        self.ensure_one()
+        if self.calculation_type not in FILTERED_CALCULATION_TYPES:
+            return SQL("TRUE")
+
+        Move = self.env['account.move']
+        try:
+            domain = self._get_domain()
+            if not domain:
+                return SQL("TRUE")
+            query = Move._where_calc(domain)
+        except Exception as e:
+            _logger.error(f"Error aplicando filtro de dominio: {str(e)}")
+            return SQL("TRUE")
+
+        if not query._joins:
+            return query.where_clause
+        return SQL("%s IN %s", SQL.identifier(Move._table, 'id'), query.subselect())
+
+    def _sorted_by_dependencies(self):
+        """
+        Ordenar las reglas para calcular los operandos antes que las reglas
+        que los usan. Entre reglas independientes se conserva el orden
+        original.
+        """
+        ids = self.ids
+        position = {rule_id: index for index, rule_id in enumerate(ids)}
+        pending = {}
+        dependents = defaultdict(list)
+        for rule in self:
+            operands = set()
+            if rule.calculation_type in OPERAND_CALCULATION_TYPES:
+                operands = {op.id for op in rule.operand_1 | rule.operand_2 if op.id in position}
+            pending[rule.id] = len(operands)
+            for operand_id in operands:
+                dependents[operand_id].append(rule.id)
+
+        ready = [position[rule_id] for rule_id, count in pending.items() if not count]
+        heapq.heapify(ready)
+        ordered = []
+        while ready:
+            rule_id = ids[heapq.heappop(ready)]
+            ordered.append(rule_id)
+            for dependent_id in dependents[rule_id]:
+                pending[dependent_id] -= 1
+                if not pending[dependent_id]:
+                    heapq.heappush(ready, position[dependent_id])
+
+        if len(ordered) < len(ids):
+            cycle = self.filtered(lambda r: r.id not in ordered)
+            raise UserError(
+                _('Las reglas de cálculo tienen dependencias circulares: %s') % ', '.join(cycle.mapped('name'))
+            )
+        return self.browse(ordered)
+
+    @tools.ormcache('self.id', 'self.write_date')
+    def _get_cached_domain(self):
+        """Dominio de la regla, interpretado una vez por versión de la regla"""
+        if not self.domain_filter or self.domain_filter == '[]':
+            return ()
+        return tuple(safe_eval(self.domain_filter))
+
+    def _get_domain(self):
+        """Copia del dominio de la regla, el valor en caché no se modifica"""
+        return list(self._get_cached_domain())
+
     def calculate(self, invoices=None, payments=None, period_start=None, period_end=None, rules_results=None):
         """
         Ejecutar el cálculo de esta regla
@@ -215,8 +360,7 @@ class MxTaxCalculationRule(models.Model):
             return records
 
         try:
-            domain = safe_eval(self.domain_filter)
-            return records.filtered_domain(domain)
+            return records.filtered_domain(self._get_domain())
         except Exception as e:
             _logger.error(f"Error aplicando filtro de dominio: {str(e)}")
             return records
@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+
+from odoo import fields, models, api, _
+from odoo.tools import SQL
+import logging
+
+_logger = logging.getLogger(__name__)
+
+INCOME_MOVE_TYPES = ('out_invoice', 'out_refund')
+EXPENSE_MOVE_TYPES = ('in_invoice', 'in_refund')
+
+
+class MxTaxPeriodAggregate(models.Model):
+    """
+    Totales fiscales de las facturas incluidas en declaración, agrupados por
+    compañía, período fiscal, tipo de factura, estado del CFDI e impuesto.
+
+    Las filas sin impuesto guardan los totales de las facturas; las filas con
+    impuesto guardan la base y el saldo contable de las líneas de ese
+    impuesto. Al publicar, cancelar o conciliar facturas se resta su
+    contribución anterior y se suma la nueva, de modo que las declaraciones
+    leen unas cuantas filas en lugar de recorrer todas las facturas del
+    período. La tabla se construye completa al instalar el módulo.
+    """
+    _name = 'mx.tax.period.aggregate'
+    _description = 'Totales Fiscales por Período'
+    _order = 'period, company_id, move_type, tax_id'
+
+    company_id = fields.Many2one('res.company', string='Compañía', required=True, readonly=True)
+    period = fields.Date(string='Período Fiscal', required=True, readonly=True, index=True)
+    move_type = fields.Selection(
+        selection=lambda self: self.env['account.move']._fields['move_type'].selection,
+        string='Tipo',
+        required=True,
+        readonly=True,
+    )
+    cfdi_status = fields.Char(string='Estado CFDI', readonly=True)
+    tax_id = fields.Many2one('account.tax', string='Impuesto', readonly=True)
+
+    invoice_count = fields.Integer(string='Facturas', readonly=True)
+    amount_untaxed = fields.Float(string='Subtotal', readonly=True)
+    amount_tax = fields.Float(string='Impuestos', readonly=True)
+    amount_total = fields.Float(string='Total', readonly=True)
+    amount_residual = fields.Float(string='Saldo Pendiente', readonly=True)
+    tax_base_amount = fields.Float(string='Base del Impuesto', readonly=True)
+    tax_balance = fields.Float(
+        string='Saldo del Impuesto',
+        readonly=True,
+        help='Saldo contable de las líneas del impuesto: negativo para impuestos trasladados, '
+             'positivo para impuestos acreditables',
+    )
+
+    def init(self):
+        self.env.cr.execute("""
+            CREATE UNIQUE INDEX IF NOT EXISTS mx_tax_period_aggregate_key_uniq
+            ON mx_tax_period_aggregate (
+                company_id, period, move_type, COALESCE(cfdi_status, ''), COALESCE(tax_id, 0)
+            )
+        """)
+
+    # ============ Mantenimiento ============
+
+    @api.model
+    def _get_cfdi_status_sql(self):
+        """Estado del CFDI de ``account_move``; lo extienden los módulos de sincronización SAT"""
+        return SQL("NULL::varchar")
+
+    @api.model
+    def _get_aggregate_query(self, where, sign=1):
+        """Consulta de los totales de las facturas que cumplen ``where``, multiplicados por ``sign``"""
+        return SQL(
+            """
+            WITH moves AS (
+                SELECT account_move.*, NULLIF(%(cfdi_status)s, '') AS cfdi_status
+                FROM account_move
+                WHERE account_move.state = 'posted'
+                    AND account_move.include_in_tax_declaration
+                    AND account_move.tax_declaration_period IS NOT NULL
+                    AND %(where)s
+            )
+            SELECT moves.company_id, moves.tax_declaration_period, moves.move_type,
+                moves.cfdi_status, NULL::integer,
+                %(sign)s * COUNT(*), %(sign)s * SUM(moves.amount_untaxed),
+                %(sign)s * SUM(moves.amount_tax), %(sign)s * SUM(moves.amount_total),
+                %(sign)s * SUM(moves.amount_residual), 0, 0
+            FROM moves
+            GROUP BY 1, 2, 3, 4
+            UNION ALL
+            SELECT moves.company_id, moves.tax_declaration_period, moves.move_type,
+                moves.cfdi_status, aml.tax_line_id,
+                %(sign)s * COUNT(DISTINCT moves.id), 0, 0, 0, 0,
+                %(sign)s * SUM(aml.tax_base_amount), %(sign)s * SUM(aml.balance)
+            FROM moves
+            JOIN account_move_line aml ON aml.move_id = moves.id
+            WHERE aml.tax_line_id IS NOT NULL
+            GROUP BY 1, 2, 3, 4, 5
+            """,
+            cfdi_status=self._get_cfdi_status_sql(),
+            where=where,
+            sign=sign,
+        )
+
+    @api.model
+    def _flush_aggregate_sources(self, moves):
+        """Escribir en base de datos los valores de ``moves`` que lee la consulta de totales"""
+        moves.flush_recordset()
+        moves.line_ids.flush_recordset(['move_id', 'tax_line_id', 'tax_base_amount', 'balance'])
+
+    @api.model
+    def _apply_moves(self, moves, sign=1):
+        """
+        Sumar (sign=1) o restar (sign=-1) a los totales la contribución actual
+        de las facturas ``moves``. Las facturas que no están publicadas e
+        incluidas en declaración no contribuyen.
+        """
+        if not moves:
+            return
+        self._flush_aggregate_sources(moves)
+        self.env.cr.execute(SQL(
+            """
+            INSERT INTO mx_tax_period_aggregate AS agg (
+                company_id, period, move_type, cfdi_status, tax_id,
+                invoice_count, amount_untaxed, amount_tax, amount_total, amount_residual,
+                tax_base_amount, tax_balance,
+                create_uid, create_date, write_uid, write_date
+            )
+            SELECT delta.*, %(uid)s, now() at time zone 'UTC', %(uid)s, now() at time zone 'UTC'
+            FROM (%(aggregate)s) delta
+            ON CONFLICT (
+                company_id, period, move_type, COALESCE(cfdi_status, ''), COALESCE(tax_id, 0)
+            ) DO UPDATE SET
+                invoice_count = agg.invoice_count + EXCLUDED.invoice_count,
+                amount_untaxed = agg.amount_untaxed + EXCLUDED.amount_untaxed,
+                amount_tax = agg.amount_tax + EXCLUDED.amount_tax,
+                amount_total = agg.amount_total + EXCLUDED.amount_total,
+                amount_residual = agg.amount_residual + EXCLUDED.amount_residual,
+                tax_base_amount = agg.tax_base_amount + EXCLUDED.tax_base_amount,
+                tax_balance = agg.tax_balance + EXCLUDED.tax_balance,
+                write_uid = EXCLUDED.write_uid,
+                write_date = EXCLUDED.write_date
+            """,
+            uid=self.env.uid,
+            aggregate=self._get_aggregate_query(SQL("account_move.id IN %s", tuple(moves.ids)), sign),
+        ))
+        self.env.cr.execute("DELETE FROM mx_tax_period_aggregate WHERE invoice_count = 0")
+        self.invalidate_model()
+
+    @api.model
+    def _rebuild(self):
+        """Recalcular todos los totales desde las facturas"""
+        self.env.flush_all()
+        self.env.cr.execute("DELETE FROM mx_tax_period_aggregate")
+        self.env.cr.execute(SQL(
+            """
+            INSERT INTO mx_tax_period_aggregate (
+                company_id, period, move_type, cfdi_status, tax_id,
+                invoice_count, amount_untaxed, amount_tax, amount_total, amount_residual,
+                tax_base_amount, tax_balance,
+                create_uid, create_date, write_uid, write_date
+            )
+            SELECT agg.*, %(uid)s, now() at time zone 'UTC', %(uid)s, now() at time zone 'UTC'
+            FROM (%(aggregate)s) agg
+            """,
+            uid=self.env.uid,
+            aggregate=self._get_aggregate_query(SQL("TRUE")),
+        ))
+        self.invalidate_model()
+
+    # ============ Lectura ============
+
+    @api.model
+    def _get_period_totals(self, company, date_from, date_to):
+        """
+        Totales de ingresos y egresos del período, equivalentes a sumar las
+        facturas incluidas en declaración con período entre ``date_from`` y
+        ``date_to``
+
+        :return: diccionario con invoice_count, total_income, total_expense,
+            total_tax_collected y total_tax_paid
+        """
+        totals = dict.fromkeys(
+            ('total_income', 'total_expense', 'total_tax_collected', 'total_tax_paid'), 0.0
+        )
+        totals['invoice_count'] = 0
+        if not (company and date_from and date_to):
+            return totals
+
+        groups = self._read_group(
+            [
+                ('company_id', '=', company.id),
+                ('period', '>=', date_from),
+                ('period', '<=', date_to),
+                ('tax_id', '=', False),
+            ],
+            ['move_type'],
+            ['invoice_count:sum', 'amount_untaxed:sum', 'amount_tax:sum'],
+        )
+        for move_type, invoice_count, amount_untaxed, amount_tax in groups:
+            totals['invoice_count'] += invoice_count
+            if move_type in INCOME_MOVE_TYPES:
+                totals['total_income'] += amount_untaxed
+                totals['total_tax_collected'] += amount_tax
+            elif move_type in EXPENSE_MOVE_TYPES:
+                totals['total_expense'] += amount_untaxed
+                totals['total_tax_paid'] += amount_tax
+        return totals
@@ -1,3 +1,8 @@
 # -*- coding: utf-8 -*-
 
 from . import models
+
+
+def post_init_hook(env):
+    """Reagrupar los totales fiscales por período según el estado del CFDI"""
+    env['mx.tax.period.aggregate']._rebuild()
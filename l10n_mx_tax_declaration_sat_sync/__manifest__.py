@@ -30,6 +30,7 @@
         'views/cfdi_invoice_views.xml',
         'views/ir_attachment_views.xml',
     ],
+    'post_init_hook': 'post_init_hook',
     'installable': True,
     'application': False,
     'auto_install': True,  # Se instala automáticamente si ambos módulos están presentes
@@ -2,3 +2,4 @@
 
 from . import cfdi_invoice_attachment
 from . import ir_attachment
+from . import mx_tax_period_aggregate
@@ -16,6 +16,16 @@ class IrAttachment(models.Model):
         help='Indica si las facturas creadas desde este XML se deben marcar para declaración',
     )
 
+    def write(self, vals):
+        """Actualizar los totales fiscales cuando cambia el estado del CFDI"""
+        if 'estado' not in vals:
+            return super().write(vals)
+        aggregate_model = self.env['mx.tax.period.aggregate']
+        aggregate_model._apply_moves(self.invoice_ids._get_tax_aggregate_moves(), sign=-1)
+        res = super().write(vals)
+        aggregate_model._apply_moves(self.invoice_ids._get_tax_aggregate_moves())
+        return res
+
     def action_mark_related_invoices_for_declaration(self):
         """Marcar facturas relacionadas con este attachment para declaración"""
         self.ensure_one()
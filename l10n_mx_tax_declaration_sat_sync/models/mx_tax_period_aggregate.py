@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models, api
+from odoo.tools import SQL
+
+
+class MxTaxPeriodAggregate(models.Model):
+    """Agrupar los totales fiscales por el estado del CFDI importado del SAT"""
+    _inherit = 'mx.tax.period.aggregate'
+
+    @api.model
+    def _get_cfdi_status_sql(self):
+        return SQL(
+            "(SELECT attachment.estado FROM ir_attachment attachment "
+            "WHERE attachment.id = account_move.attachment_id)"
+        )
+
+    @api.model
+    def _flush_aggregate_sources(self, moves):
+        super()._flush_aggregate_sources(moves)
+        moves.attachment_id.flush_recordset(['estado'])
+
+
+class AccountMove(models.Model):
+    _inherit = 'account.move'
+
+    @api.model
+    def _get_tax_aggregate_fields(self):
+        return super()._get_tax_aggregate_fields() | {'attachment_id'}
@@ -116,6 +116,33 @@ class MxTaxDeclaration(models.Model):
         store=True,
         currency_field='currency_id',
     )
+
+    # Montos actuales del período (desde los totales fiscales por período)
+    period_invoice_count = fields.Integer(
+        string='Facturas del Período',
+        compute='_compute_period_totals',
+    )
+    period_total_income = fields.Monetary(
+        string='Ingresos del Período',
+        compute='_compute_period_totals',
+        currency_field='currency_id',
+    )
+    period_total_expense = fields.Monetary(
+        string='Egresos del Período',
+        compute='_compute_period_totals',
+        currency_field='currency_id',
+    )
+    period_total_tax_collected = fields.Monetary(
+        string='Impuestos Cobrados del Período',
+        compute='_compute_period_totals',
+        currency_field='currency_id',
+    )
+    period_total_tax_paid = fields.Monetary(
+        string='Impuestos Pagados del Período',
+        compute='_compute_period_totals',
+        currency_field='currency_id',
+    )
+
     total_payable = fields.Monetary(
         string='Total a Pagar',
         compute='_compute_total_payable',
@@ -231,6 +258,17 @@ class MxTaxDeclaration(models.Model):
             record.total_tax_collected = sum(income_lines.mapped('amount_tax'))
             record.total_tax_paid = sum(expense_lines.mapped('amount_tax'))
 
+    @api.depends('company_id', 'period_start', 'period_end')
+    def _compute_period_totals(self):
+        aggregates = self.env['mx.tax.period.aggregate']
+        for record in self:
+            totals = aggregates._get_period_totals(record.company_id, record.period_start, record.period_end)
+            record.period_invoice_count = totals['invoice_count']
+            record.period_total_income = totals['total_income']
+            record.period_total_expense = totals['total_expense']
+            record.period_total_tax_collected = totals['total_tax_collected']
+            record.period_total_tax_paid = totals['total_tax_paid']
+
     @api.depends('calculation_result_ids', 'calculation_result_ids.result')
     def _compute_total_payable(self):
         for record in self:
@@ -287,34 +325,32 @@ class MxTaxDeclaration(models.Model):
     def _execute_calculations_for_obligation(self, obligation, invoices):
         """Ejecutar reglas de cálculo de una obligación"""
         rules = obligation.calculation_rule_ids.sorted('sequence')
-        results = {}
-
-        for rule in rules:
-            try:
-                result = rule.calculate(
-                    invoices=invoices,
-                    period_start=self.period_start,
-                    period_end=self.period_end,
-                    rules_results=results,
-                )
-
-                results[rule.id] = result
 
-                # Guardar resultado
-                self.env['mx.tax.declaration.calculation.result'].create({
-                    'declaration_id': self.id,
-                    'calculation_rule_id': rule.id,
-                    'obligation_id': obligation.id,
-                    'result': result,
-                })
+        try:
+            # Ejecutar todas las reglas de la obligación en una pasada
+            results = rules.calculate_all(
+                invoices=invoices,
+                period_start=self.period_start,
+                period_end=self.period_end,
+            )
+        except UserError:
+            raise
+        except Exception as e:
+            _logger.error(f"Error ejecutando reglas de '{obligation.name}': {str(e)}")
+            raise UserError(
+                _('Error al ejecutar las reglas de cálculo de "%s": %s') % (obligation.name, str(e))
+            )
 
-                _logger.info(f"Regla '{rule.name}' ejecutada: {result}")
+        # Guardar resultados
+        self.env['mx.tax.declaration.calculation.result'].create([{
+            'declaration_id': self.id,
+            'calculation_rule_id': rule.id,
+            'obligation_id': obligation.id,
+            'result': results[rule.id],
+        } for rule in rules])
 
-            except Exception as e:
-                _logger.error(f"Error ejecutando regla '{rule.name}': {str(e)}")
-                raise UserError(
-                    _('Error al ejecutar la regla de cálculo "%s": %s') % (rule.name, str(e))
-                )
+        for rule in rules:
+            _logger.info(f"Regla '{rule.name}' ejecutada: {results[rule.id]}")
 
     def action_review(self):
         """Marcar como revisada"""
@@ -79,6 +79,36 @@ class MxTaxDeclarationWizard(models.TransientModel):
         currency_field='currency_id',
     )
 
+    # Totales del período leídos de los totales fiscales por período
+    period_invoice_count = fields.Integer(
+        string='Facturas del Período',
+        compute='_compute_period_totals',
+    )
+
+    period_total_income = fields.Monetary(
+        string='Ingresos del Período',
+        compute='_compute_period_totals',
+        currency_field='currency_id',
+    )
+
+    period_total_expense = fields.Monetary(
+        string='Egresos del Período',
+        compute='_compute_period_totals',
+        currency_field='currency_id',
+    )
+
+    period_total_tax_collected = fields.Monetary(
+        string='Impuestos Trasladados del Período',
+        compute='_compute_period_totals',
+        currency_field='currency_id',
+    )
+
+    period_total_tax_paid = fields.Monetary(
+        string='Impuestos Acreditables del Período',
+        compute='_compute_period_totals',
+        currency_field='currency_id',
+    )
+
     # Filtros para paso 2
     filter_move_type = fields.Selection([
         ('all', 'Todas'),
@@ -167,6 +197,17 @@ class MxTaxDeclarationWizard(models.TransientModel):
             wizard.invoice_count = len(wizard.invoice_ids)
             wizard.total_invoiced = sum(wizard.invoice_ids.mapped('amount_total'))
 
+    @api.depends('company_id', 'period_start', 'period_end')
+    def _compute_period_totals(self):
+        aggregates = self.env['mx.tax.period.aggregate']
+        for wizard in self:
+            totals = aggregates._get_period_totals(wizard.company_id, wizard.period_start, wizard.period_end)
+            wizard.period_invoice_count = totals['invoice_count']
+            wizard.period_total_income = totals['total_income']
+            wizard.period_total_expense = totals['total_expense']
+            wizard.period_total_tax_collected = totals['total_tax_collected']
+            wizard.period_total_tax_paid = totals['total_tax_paid']
+
     @api.depends('invoice_ids', 'invoice_ids.amount_residual')
     def _compute_reconciliation_stats(self):
         for wizard in self:
@@ -207,6 +248,14 @@ class MxTaxDeclarationWizard(models.TransientModel):
         if not self.obligation_ids:
             raise UserError(_('Debe seleccionar al menos una obligación fiscal.'))
 
+        # Los totales por período evitan buscar facturas en períodos vacíos
+        if not self.period_invoice_count:
+            raise UserError(
+                _('No se encontraron facturas marcadas para declaración en el período seleccionado.\n\n'
+                  'Período: %s - %s\n'
+                  'Compañía: %s') % (self.period_start, self.period_end, self.company_id.name)
+            )
+
         # Cargar facturas del período
         invoice_domain = [
             ('include_in_tax_declaration', '=', True),
@@ -239,6 +288,10 @@ class MxTaxDeclarationWizard(models.TransientModel):
         if not self.period_start or not self.period_end or not self.company_id:
             return
 
+        if not self.period_invoice_count:
+            self.invoice_ids = [(5, 0, 0)]
+            return
+
         base_domain = [
             ('include_in_tax_declaration', '=', True),
             ('tax_declaration_period', '>=', self.period_start),
@@ -376,6 +429,7 @@ class MxTaxDeclarationWizard(models.TransientModel):
         self.calculation_ids.unlink()
 
         results_dict = {}
+        calculation_vals = []
 
         # Ejecutar cálculos por obligación
         for obligation in self.obligation_ids:
@@ -385,33 +439,33 @@ class MxTaxDeclarationWizard(models.TransientModel):
                 _logger.warning(f"Obligación '{obligation.name}' no tiene reglas de cálculo configuradas")
                 continue
 
+            try:
+                # Ejecutar todas las reglas de la obligación en una pasada
+                rules.calculate_all(
+                    invoices=self.invoice_ids,
+                    period_start=self.period_start,
+                    period_end=self.period_end,
+                    rules_results=results_dict,
+                )
+            except UserError:
+                raise
+            except Exception as e:
+                _logger.error(f"Error ejecutando reglas de '{obligation.name}': {str(e)}")
+                raise UserError(
+                    _('Error al ejecutar las reglas de cálculo de "%s":\n\n%s') % (obligation.name, str(e))
+                )
+
             for rule in rules:
-                try:
-                    # Ejecutar cálculo
-                    result = rule.calculate(
-                        invoices=self.invoice_ids,
-                        period_start=self.period_start,
-                        period_end=self.period_end,
-                        rules_results=results_dict,
-                    )
-
-                    results_dict[rule.id] = result
-
-                    # Crear línea de resultado en wizard
-                    self.env['mx.tax.declaration.wizard.calculation'].create({
-                        'wizard_id': self.id,
-                        'calculation_rule_id': rule.id,
-                        'obligation_id': obligation.id,
-                        'result': result,
-                    })
-
-                    _logger.info(f"Cálculo ejecutado: {rule.name} = {result}")
-
-                except Exception as e:
-                    _logger.error(f"Error ejecutando regla '{rule.name}': {str(e)}")
-                    raise UserError(
-                        _('Error al ejecutar la regla de cálculo "%s":\n\n%s') % (rule.name, str(e))
-                    )
+                calculation_vals.append({
+                    'wizard_id': self.id,
+                    'calculation_rule_id': rule.id,
+                    'obligation_id': obligation.id,
+                    'result': results_dict[rule.id],
+                })
+                _logger.info(f"Cálculo ejecutado: {rule.name} = {results_dict[rule.id]}")
+
+        # Crear líneas de resultado en wizard
+        self.env['mx.tax.declaration.wizard.calculation'].create(calculation_vals)
 
         self.calculations_executed = True
 
@@ -458,21 +512,19 @@ class MxTaxDeclarationWizard(models.TransientModel):
         })
 
         # Crear líneas de facturas
-        for invoice in self.invoice_ids:
-            self.env['mx.tax.declaration.invoice.line'].create({
-                'declaration_id': declaration.id,
-                'invoice_id': invoice.id,
-                'included': True,
-            })
+        self.env['mx.tax.declaration.invoice.line'].create([{
+            'declaration_id': declaration.id,
+            'invoice_id': invoice.id,
+            'included': True,
+        } for invoice in self.invoice_ids])
 
         # Copiar resultados de cálculos
-        for calc in self.calculation_ids:
-            self.env['mx.tax.declaration.calculation.result'].create({
-                'declaration_id': declaration.id,
-                'calculation_rule_id': calc.calculation_rule_id.id,
-                'obligation_id': calc.obligation_id.id,
-                'result': calc.result,
-            })
+        self.env['mx.tax.declaration.calculation.result'].create([{
+            'declaration_id': declaration.id,
+            'calculation_rule_id': calc.calculation_rule_id.id,
+            'obligation_id': calc.obligation_id.id,
+            'result': calc.result,
+        } for calc in self.calculation_ids])
 
         # Marcar facturas como declaradas
         self.invoice_ids.write({'tax_declaration_status': 'declared'})
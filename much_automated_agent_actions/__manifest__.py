@@ -27,10 +27,12 @@
         "security/ir_rule.xml",
         "security/ir.model.access.csv",
         "data/ai_provider_data.xml",
+        "data/ir_cron_data.xml",
         "views/menus.xml",
         "views/ai_provider.xml",
         "views/ai_model.xml",
         "views/ai_log.xml",
+        "views/ai_job.xml",
         "views/ir_actions_server.xml",
         "views/base_automation.xml",
         "wizards/preview_prompt.xml",
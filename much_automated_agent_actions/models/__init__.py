@@ -2,3 +2,4 @@ from . import ai_provider
 from . import ai_service
 from . import ai_log
 from . import ir_actions_server
+from . import ai_job
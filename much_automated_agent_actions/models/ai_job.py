@@ -0,0 +1,441 @@
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from odoo import _, api, fields, models
+from odoo.tools import SQL
+from odoo.tools.json import json_default
+
+from ..tools import ProviderLimiter, RequestDeduplicator, new_environment
+
+_logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_WORKERS = 4
+# Running jobs older than this are considered lost (e.g. server restart)
+STALE_JOB_MINUTES = 30
+MAX_ATTEMPTS = 3
+# Time spent by one cron run before handing over to the next one
+RUNNER_TIME_BUDGET = 240
+# Rough token estimate of a prompt, used by the tokens-per-minute limits
+CHARS_PER_TOKEN = 4
+
+
+class AiJobBatch(models.Model):
+    _name = "ai.job.batch"
+    _description = "AI Job Batch"
+    _order = "id desc"
+
+    name = fields.Char(required=True)
+    server_action_id = fields.Many2one(
+        comodel_name="ir.actions.server",
+        required=True,
+        ondelete="cascade",
+    )
+    user_id = fields.Many2one(
+        comodel_name="res.users",
+        string="User",
+        default=lambda self: self.env.user,
+    )
+    job_ids = fields.One2many(
+        comodel_name="ai.job",
+        inverse_name="batch_id",
+        string="Jobs",
+    )
+    job_count = fields.Integer(compute="_compute_progress")
+    done_count = fields.Integer(compute="_compute_progress")
+    failed_count = fields.Integer(compute="_compute_progress")
+    progress = fields.Float(compute="_compute_progress")
+    state = fields.Selection(
+        selection=[
+            ("running", "Running"),
+            ("done", "Done"),
+        ],
+        default="running",
+        required=True,
+        index=True,
+    )
+
+    @api.depends("job_ids.state")
+    def _compute_progress(self):
+        counts = {
+            (batch.id, state): count
+            for batch, state, count in self.env["ai.job"]._read_group(
+                [("batch_id", "in", self.ids)], ["batch_id", "state"], ["__count"]
+            )
+        }
+        for batch in self:
+            batch.job_count = sum(
+                count for (batch_id, _state), count in counts.items() if batch_id == batch.id
+            )
+            batch.done_count = counts.get((batch.id, "done"), 0)
+            batch.failed_count = counts.get((batch.id, "failed"), 0)
+            finished = batch.done_count + batch.failed_count
+            batch.progress = batch.job_count and 100.0 * finished / batch.job_count
+
+    def _notify_finished(self):
+        """Close the batches without pending jobs and notify their users."""
+        finished = self.filtered(
+            lambda batch: batch.state == "running"
+            and batch.done_count + batch.failed_count == batch.job_count
+        )
+        for batch in finished:
+            message = _(
+                "Agent '%(action_name)s' processed %(done)s of %(total)s records.",
+                action_name=batch.name,
+                done=batch.done_count,
+                total=batch.job_count,
+            )
+            if batch.failed_count:
+                batch.user_id.notify_warning(
+                    message=message
+                    + " "
+                    + _("%(count)s records failed.", count=batch.failed_count),
+                    title=_("AI service done"),
+                )
+            else:
+                batch.user_id.notify_success(
+                    message=message, title=_("AI service done")
+                )
+        finished.state = "done"
+
+
+class AiJob(models.Model):
+    _name = "ai.job"
+    _description = "AI Job"
+    _order = "id"
+
+    batch_id = fields.Many2one(
+        comodel_name="ai.job.batch",
+        required=True,
+        ondelete="cascade",
+        index=True,
+    )
+    server_action_id = fields.Many2one(
+        related="batch_id.server_action_id",
+    )
+    provider_id = fields.Many2one(
+        comodel_name="ai.provider",
+        required=True,
+        ondelete="cascade",
+    )
+    user_id = fields.Many2one(
+        related="batch_id.user_id",
+    )
+    res_model = fields.Char(
+        string="Resource Model",
+        required=True,
+    )
+    res_id = fields.Many2oneReference(
+        string="Resource ID",
+        model_field="res_model",
+    )
+    context = fields.Text()
+    state = fields.Selection(
+        selection=[
+            ("pending", "Pending"),
+            ("running", "Running"),
+            ("done", "Done"),
+            ("failed", "Failed"),
+        ],
+        default="pending",
+        required=True,
+    )
+    attempt = fields.Integer()
+    request_hash = fields.Char(index=True)
+    token_estimate = fields.Integer()
+    is_duplicate = fields.Boolean(
+        help="The response was shared with an identical request",
+    )
+    response = fields.Text()
+    error = fields.Text()
+    date_started = fields.Datetime()
+    date_done = fields.Datetime()
+
+    def init(self):
+        self.env.cr.execute(
+            """
+            CREATE INDEX IF NOT EXISTS ai_job_pending_idx
+            ON ai_job (id) WHERE state = 'pending'
+            """
+        )
+
+    # ------------------------------------------------------------------
+    # Enqueue
+    # ------------------------------------------------------------------
+
+    @api.model
+    def _enqueue(self, server_action, records, context):
+        """Create a batch with one job per record and wake up the runner."""
+        batch = self.env["ai.job.batch"].create(
+            {
+                "name": server_action._get_action_name(),
+                "server_action_id": server_action.id,
+            }
+        )
+        # Keep the JSON serializable part of the context only
+        context = json.dumps(context, default=json_default)
+        self.create(
+            [
+                {
+                    "batch_id": batch.id,
+                    "provider_id": server_action.ai_model_id.provider_id.id,
+                    "res_model": records._name,
+                    "res_id": record_id,
+                    "context": context,
+                }
+                for record_id in records.ids
+            ]
+        )
+        self.env.ref(
+            "much_automated_agent_actions.ir_cron_process_ai_jobs"
+        ).sudo()._trigger()
+        return batch
+
+    # ------------------------------------------------------------------
+    # Runner
+    # ------------------------------------------------------------------
+
+    @api.model
+    def _get_max_workers(self) -> int:
+        return int(
+            self.env["ir.config_parameter"]
+            .sudo()
+            .get_param(
+                "much_automated_agent_actions.max_workers", DEFAULT_MAX_WORKERS
+            )
+        )
+
+    @api.model
+    def _requeue_stale_jobs(self):
+        """Put back the running jobs lost by a previous run."""
+        stale_jobs = self.search(
+            [
+                ("state", "=", "running"),
+                (
+                    "date_started",
+                    "<",
+                    fields.Datetime.now() - timedelta(minutes=STALE_JOB_MINUTES),
+                ),
+            ]
+        )
+        stale_jobs.filtered(lambda job: job.attempt >= MAX_ATTEMPTS).write(
+            {
+                "state": "failed",
+                "error": _("The job was interrupted too many times."),
+                "date_done": fields.Datetime.now(),
+            }
+        )
+        stale_jobs.filtered(lambda job: job.attempt < MAX_ATTEMPTS).state = "pending"
+
+    @api.model
+    def _claim_jobs(self, limit):
+        """Mark the next pending jobs as running, skipping the jobs locked
+        by another runner."""
+        self.env.flush_all()
+        self.env.cr.execute(
+            SQL(
+                """
+                UPDATE ai_job
+                   SET state = 'running',
+                       attempt = attempt + 1,
+                       date_started = now() AT TIME ZONE 'UTC'
+                 WHERE id IN (
+                        SELECT id FROM ai_job
+                         WHERE state = 'pending'
+                      ORDER BY id
+                         LIMIT %s
+                    FOR UPDATE SKIP LOCKED
+                 )
+             RETURNING id
+                """,
+                limit,
+            )
+        )
+        ids = [job_id for (job_id,) in self.env.cr.fetchall()]
+        self.invalidate_model()
+        return self.browse(ids).sorted()
+
+    @api.model
+    def _get_provider_limiter(self, provider):
+        """Return the limiter of ``provider``, seeded with the tokens sent
+        during the last minute."""
+        used_tokens = 0
+        if provider.tokens_per_minute:
+            used_tokens = self._read_group(
+                [
+                    ("provider_id", "=", provider.id),
+                    ("date_started", ">=", fields.Datetime.now() - timedelta(minutes=1)),
+                ],
+                [],
+                ["token_estimate:sum"],
+            )[0][0]
+        return ProviderLimiter(
+            provider.max_concurrency, provider.tokens_per_minute, used_tokens or 0
+        )
+
+    @api.model
+    def _cron_process_jobs(self):
+        """Process the pending jobs with a bounded pool of workers, each one
+        using its own cursor."""
+        self._requeue_stale_jobs()
+        max_workers = max(self._get_max_workers(), 1)
+        deadline = time.monotonic() + RUNNER_TIME_BUDGET
+        limiters = {}
+        deduplicator = RequestDeduplicator()
+        in_test_mode = self.env.registry.in_test_mode()
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            while time.monotonic() < deadline:
+                jobs = self._claim_jobs(max_workers * 2)
+                if not jobs:
+                    break
+                for provider in jobs.provider_id:
+                    if provider.id not in limiters:
+                        limiters[provider.id] = self._get_provider_limiter(provider)
+                if in_test_mode:
+                    # Test data is not visible from other cursors
+                    for job in jobs:
+                        try:
+                            with self.env.cr.savepoint():
+                                job._process(limiters, deduplicator)
+                        except Exception as exc:
+                            _logger.exception("Error processing AI job %s", job.id)
+                            job._set_failed(str(exc))
+                else:
+                    self.env.cr.commit()
+                    list(
+                        executor.map(
+                            lambda job_id: self._process_in_new_cursor(
+                                job_id, limiters, deduplicator
+                            ),
+                            jobs.ids,
+                        )
+                    )
+                    self.invalidate_model()
+                jobs.batch_id._notify_finished()
+                if not in_test_mode:
+                    self.env.cr.commit()
+
+        if self.search_count([("state", "=", "pending")], limit=1):
+            self.env.ref(
+                "much_automated_agent_actions.ir_cron_process_ai_jobs"
+            ).sudo()._trigger()
+
+    def _process_in_new_cursor(self, job_id, limiters, deduplicator):
+        """Process the job in a worker thread, with a new cursor."""
+        with new_environment(self.env.cr.dbname) as env:
+            job = env["ai.job"].browse(job_id)
+            # Run as the user who triggered the action, like a manual run
+            job_env = env(user=job.user_id.id, context=json.loads(job.context or "{}"))
+            try:
+                job.with_env(job_env)._process(limiters, deduplicator)
+            except Exception as exc:
+                env.cr.rollback()
+                _logger.exception("Error processing AI job %s", job_id)
+                job._set_failed(str(exc))
+
+    # ------------------------------------------------------------------
+    # Job execution
+    # ------------------------------------------------------------------
+
+    def _set_failed(self, error):
+        self.write(
+            {
+                "state": "failed",
+                "error": error,
+                "date_done": fields.Datetime.now(),
+            }
+        )
+
+    def _estimate_tokens(self, server_action, prompt, files) -> int:
+        text = "".join(
+            [
+                prompt,
+                files.get("chatter") or "",
+                json.dumps(files.get("record_data") or {}, default=json_default),
+            ]
+        )
+        return len(text) // CHARS_PER_TOKEN + (server_action.ai_model_id.max_tokens or 0)
+
+    def _get_cached_response(self, request_hash, cache_ttl):
+        """Return the response of an identical request answered during the
+        last ``cache_ttl`` minutes (the response cache TTL of the AI model)."""
+        if not cache_ttl:
+            return False
+        job = self.search(
+            [
+                ("request_hash", "=", request_hash),
+                ("state", "=", "done"),
+                ("response", "!=", False),
+                (
+                    "date_done",
+                    ">=",
+                    fields.Datetime.now() - timedelta(minutes=cache_ttl),
+                ),
+            ],
+            order="id desc",
+            limit=1,
+        )
+        return job.response
+
+    def _process(self, limiters, deduplicator):
+        """Render the prompt of the job, get the AI response and write it
+        on the record."""
+        self.ensure_one()
+        job = self.sudo()
+        context = json.loads(job.context or "{}")
+        server_action = job.server_action_id.with_context(**context)
+        record = self.env[job.res_model].sudo().with_context(**context).browse(job.res_id)
+
+        if not record.exists():
+            job._set_failed(_("The record no longer exists."))
+            return
+
+        if not (prompt := server_action._prepare_ai_prompt(record)):
+            job._set_failed(_("The prompt could not be rendered."))
+            return
+
+        files = server_action._prepare_ai_files(record)
+        request_hash = server_action._get_ai_request_hash(prompt, files)
+        token_estimate = job._estimate_tokens(server_action, prompt, files)
+        job.write({"request_hash": request_hash, "token_estimate": token_estimate})
+        provider = job.provider_id
+        limiter = limiters[provider.id]
+
+        def generate():
+            if cached_response := job._get_cached_response(
+                request_hash, server_action.ai_model_id.response_cache_ttl
+            ):
+                return cached_response
+            limiter.acquire_tokens(token_estimate)
+            with limiter.semaphore:
+                ai_service = job.env["ai.service.factory"].get_service(
+                    provider.code, provider.company_id.id
+                )
+                return server_action._generate_ai_response(ai_service, prompt, files)
+
+        response, is_duplicate = deduplicator.run(request_hash, generate)
+        if not response:
+            job._set_failed(_("No response was generated."))
+            return
+
+        server_action._process_ai_response(record, response, context=context)
+        job.write(
+            {
+                "state": "done",
+                "response": response,
+                "is_duplicate": is_duplicate,
+                "date_done": fields.Datetime.now(),
+            }
+        )
+
+    @api.autovacuum
+    def _gc_ai_jobs(self):
+        """Remove the finished batches older than a month."""
+        self.env["ai.job.batch"].sudo().search(
+            [
+                ("state", "=", "done"),
+                ("create_date", "<", fields.Datetime.subtract(fields.Datetime.now(), days=30)),
+            ]
+        ).unlink()
@@ -19,6 +19,13 @@ class AiProvider(models.Model):
     api_key = fields.Char(
         string="API Key",
     )
+    max_concurrency = fields.Integer(
+        default=4,
+        help="Maximum number of requests sent at the same time to the provider",
+    )
+    tokens_per_minute = fields.Integer(
+        help="Maximum number of estimated tokens sent per minute (0 = unlimited)",
+    )
     active = fields.Boolean(default=True)
 
 
@@ -92,6 +99,11 @@ class AiModel(models.Model):
         store=True,
         readonly=False,
     )
+    response_cache_ttl = fields.Integer(
+        string="Response Cache (minutes)",
+        help="Reuse the response of an identical request sent during the last "
+        "minutes instead of calling the provider again (0 = disabled)",
+    )
     active = fields.Boolean(default=True)
 
     @api.depends("creativity_preset")
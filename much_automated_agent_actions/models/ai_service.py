@@ -26,6 +26,7 @@ class FileData(TypedDict, total=False):
     filename: str
     data: str
     mimetype: str
+    checksum: str
 
 
 class AIFiles(TypedDict, total=False):
@@ -1,18 +1,25 @@
 import base64
+import hashlib
+import json
 import logging
-import threading
 from typing import Any, Dict, List, Optional
 
 from pytz import timezone  # NOSONAR
 
 from odoo import _, api, fields, models, tools as odoo_tools
+from odoo.tools.json import json_default
 from odoo.tools.mail import html_to_inner_content
 
-from ..tools import _async_notify, merge_dict, new_environment, parse_markdown
+from ..tools import LRUCache, _async_notify, merge_dict, new_environment, parse_markdown
 from .ai_service import AIFiles
 
 _logger = logging.getLogger(__name__)
 
+# Rendered reports and encoded attachments, shared by the workers of the process
+ARTIFACT_CACHE = LRUCache(max_entries=512, max_size=256 * 1024 * 1024, ttl=3600)
+# Completed AI responses of the models having a response cache TTL
+RESPONSE_CACHE = LRUCache(max_entries=1024, max_size=64 * 1024 * 1024)
+
 
 class IrActionsServer(models.Model):
     _inherit = "ir.actions.server"
@@ -89,11 +96,11 @@ class IrActionsServer(models.Model):
         if not self.ai_model_id:
             return False
 
-        # Get the AI service
+        # Check the AI service before queuing the records
         provider_code = self.ai_model_id.provider_id.code
         company_id = self.ai_model_id.provider_id.company_id.id
         try:
-            ai_service = self.env["ai.service.factory"].get_service(
+            self.env["ai.service.factory"].get_service(
                 provider_code, company_id
             )
         except Exception as exc:  # noqa
@@ -106,82 +113,26 @@ class IrActionsServer(models.Model):
 
         # Set up a clean context for records
         res_ids = self._context.get("active_ids", [self._context.get("active_id")])
+        res_ids = [res_id for res_id in res_ids if res_id]
         cleaned_ctx = self._prepare_clean_context()
-        records = self.env[self.model_name].with_context(**cleaned_ctx).browse(res_ids)
-
-        for record in records:
-            if not record.exists():
-                continue
-
-            self.env.user.notify_success(
-                message=_(
-                    "Agent '%(action_name)s' is working on it!",
-                    action_name=self._get_action_name(),
-                ),
-                title=_("AI service triggered"),
-            )
-            _logger.info("Offload to AI thread")
-            # Execute the AI processing in a separate thread
-            thread = threading.Thread(
-                target=self._process_record_in_thread,
-                args=(
-                    self.id,
-                    record.id,
-                    ai_service,
-                    self.env.cr.dbname,
-                    self.env.uid,
-                    cleaned_ctx,
-                ),
-            )
-            thread.start()
+        records = (
+            self.env[self.model_name].with_context(**cleaned_ctx).browse(res_ids).exists()
+        )
+        if not records:
+            return False
 
+        # The records are processed in background by the AI job runner
+        self.env["ai.job"].sudo()._enqueue(self, records, cleaned_ctx)
+        self.env.user.notify_success(
+            message=_(
+                "Agent '%(action_name)s' is working on %(count)s record(s)!",
+                action_name=self._get_action_name(),
+                count=len(records),
+            ),
+            title=_("AI service triggered"),
+        )
         return False
 
-    def _process_record_in_thread(
-        self, server_action_id, record_id, ai_service, dbname, uid, context
-    ):
-        """Process a record in a separate thread."""
-        # Create a new environment with the same credentials
-        with new_environment(dbname, uid=uid, context=context) as env:
-            new_cr = env.cr
-            try:
-                server_action = env["ir.actions.server"].sudo().browse(server_action_id)
-                record = env[server_action.model_name].sudo().browse(record_id)
-
-                if not record.exists():
-                    return
-
-                if not (prompt := server_action._prepare_ai_prompt(record)):
-                    return
-
-                files = server_action._prepare_ai_files(record)
-
-                if not (
-                    response := server_action._generate_ai_response(
-                        ai_service, prompt, files
-                    )
-                ):
-                    return
-
-                server_action._process_ai_response(record, response, context=context)
-
-                new_cr.commit()
-
-                _async_notify(
-                    uid=uid,
-                    type_="success",
-                    title="AI Service",
-                    message="AI Service is done",
-                )
-
-                _logger.info("AI Thread execution done")
-
-            except Exception as e:
-                new_cr.rollback()
-                _logger.exception("Error processing record in thread: %s", e)
-            finally:
-                new_cr.close()
-
     def _notify_error(self, title: str, message: str, summary: str = None) -> None:
         """Helper to show error notification to the user and log the error.
 
@@ -290,6 +241,9 @@ class IrActionsServer(models.Model):
     def _prepare_report_file(self, record: Any, result: AIFiles) -> None:
         """Add a report PDF to the result if specified and allowed.
 
+        The rendered PDF is cached until the report or the record changes,
+        per user, language and company since they change what is rendered.
+
         Args:
             record: The record being processed
             result: The AIFiles object to update
@@ -297,23 +251,40 @@ class IrActionsServer(models.Model):
         if not (self.include_report_id and self.ai_model_id.files_allowed):
             return
 
-        try:
-            report_content, report_format = self.include_report_id._render_qweb_pdf(
-                self.include_report_id, res_ids=record.id
-            )
-            if report_format == "pdf":
-                result["file_data"].append(
-                    {
-                        "filename": f"{self.include_report_id.name}.pdf",
-                        "data": base64.b64encode(report_content).decode("utf-8"),
-                    }
+        report = self.include_report_id
+        cache_key = (
+            self.env.cr.dbname,
+            "report",
+            report.id,
+            report.write_date,
+            self.env.uid,
+            self.env.lang,
+            self.env.company.id,
+            record._name,
+            record.id,
+            "write_date" in record._fields and record.write_date,
+        )
+        if (file_data := ARTIFACT_CACHE.get(cache_key)) is None:
+            try:
+                report_content, report_format = report._render_qweb_pdf(
+                    report, res_ids=record.id
                 )
-        except Exception as exc:  # noqa
-            self._notify_error(
-                _("AI Report Error"),
-                _("Error rendering report\n") + str(exc),
-                summary="Error rendering report",
-            )
+            except Exception as exc:  # noqa
+                self._notify_error(
+                    _("AI Report Error"),
+                    _("Error rendering report\n") + str(exc),
+                    summary="Error rendering report",
+                )
+                return
+            if report_format != "pdf":
+                return
+            file_data = {
+                "filename": f"{report.name}.pdf",
+                "data": base64.b64encode(report_content).decode("utf-8"),
+                "checksum": hashlib.sha1(report_content).hexdigest(),
+            }
+            ARTIFACT_CACHE.set(cache_key, file_data, size=len(file_data["data"]))
+        result["file_data"].append(dict(file_data))
 
     def _prepare_attachment_files(self, record: Any, result: AIFiles) -> None:
         """Add attachment files to the result if specified and allowed.
@@ -367,7 +338,8 @@ class IrActionsServer(models.Model):
             result["file_data"].append(
                 {
                     "filename": attachment.name,
-                    "data": attachment.datas,
+                    "data": self._get_attachment_data(attachment),
+                    "checksum": attachment.checksum,
                 }
             )
             return True
@@ -378,13 +350,31 @@ class IrActionsServer(models.Model):
             result["file_data"].append(
                 {
                     "filename": attachment.name,
-                    "data": attachment.datas,
+                    "data": self._get_attachment_data(attachment),
                     "mimetype": attachment.mimetype,
+                    "checksum": attachment.checksum,
                 }
             )
             return True
         return False
 
+    def _get_attachment_data(self, attachment: Any) -> bytes:
+        """Return the base64 content of the attachment, cached by checksum.
+
+        Args:
+            attachment: The attachment record
+
+        Returns:
+            bytes: The base64 encoded content
+        """
+        if not attachment.checksum:
+            return attachment.datas
+        cache_key = (self.env.cr.dbname, "attachment", attachment.checksum)
+        if (data := ARTIFACT_CACHE.get(cache_key)) is None:
+            data = attachment.datas
+            ARTIFACT_CACHE.set(cache_key, data, size=len(data or b""))
+        return data
+
     def _prepare_chatter_content(self, record: Any) -> str:
         """Prepare chatter content from record messages.
 
@@ -459,13 +449,47 @@ class IrActionsServer(models.Model):
 
         return record_data
 
+    def _get_ai_request_hash(self, prompt: str, files: Optional[AIFiles] = None) -> str:
+        """Return the hash identifying an AI request: the prompt, the files
+        (by checksum when known) and the model configuration."""
+        files = dict(files or {})
+        files["file_data"] = [
+            {key: value for key, value in file_data.items() if key != "data"}
+            if file_data.get("checksum")
+            else file_data
+            for file_data in files.get("file_data", [])
+        ]
+        ai_model = self.ai_model_id
+        payload = json.dumps(
+            [
+                prompt,
+                files,
+                ai_model.technical_name,
+                ai_model.temperature,
+                ai_model.top_p,
+                ai_model.top_k,
+                ai_model.max_tokens,
+            ],
+            sort_keys=True,
+            default=json_default,
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
     def _generate_ai_response(
         self, ai_service: Any, prompt: str, files: Optional[AIFiles] = None
     ) -> str | bool:
-        """Generate text response from AI service."""
+        """Generate text response from AI service.
+
+        Models with a response cache TTL reuse the response of an identical
+        request instead of calling the provider again."""
+        ai_model = self.ai_model_id
+        cache_key = None
+        if cache_ttl := ai_model.response_cache_ttl * 60:
+            cache_key = (self.env.cr.dbname, self._get_ai_request_hash(prompt, files))
+            if cached_response := RESPONSE_CACHE.get(cache_key, ttl=cache_ttl):
+                return cached_response
         try:
-            ai_model = self.ai_model_id
-            return ai_service.generate_text(
+            response = ai_service.generate_text(
                 prompt=prompt,
                 model_name=ai_model.technical_name,
                 files=files,
@@ -474,6 +498,9 @@ class IrActionsServer(models.Model):
                 top_k=ai_model.top_k,
                 max_tokens=ai_model.max_tokens,
             )
+            if cache_key and response:
+                RESPONSE_CACHE.set(cache_key, response, size=len(response))
+            return response
         except Exception as exc:  # noqa
             self._notify_error(
                 _("AI Generation Error"),
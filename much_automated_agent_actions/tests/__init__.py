@@ -2,3 +2,4 @@ from . import test_ai_service
 from . import test_ir_actions_server
 from . import test_preview_prompt
 from . import test_tools
+from . import test_ai_job
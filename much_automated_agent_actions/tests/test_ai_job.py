@@ -0,0 +1,147 @@
+from unittest.mock import MagicMock, patch
+
+from odoo.tests.common import TransactionCase, tagged
+
+from ..tools.job_utils import ProviderLimiter, RequestDeduplicator
+
+
+@tagged("-at_install", "post_install", "much_unit")
+class TestAiJob(TransactionCase):
+    """Test the background execution of the AI server actions."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.partners = cls.env["res.partner"].create(
+            [{"name": "Test Partner 1"}, {"name": "Test Partner 2"}]
+        )
+        cls.provider = cls.env["ai.provider"].create(
+            {
+                "name": "Test Provider",
+                "code": "openai",
+                "company_id": cls.env.company.id,
+                "api_key": "test_api_key",
+                "max_concurrency": 2,
+            }
+        )
+        cls.ai_model = cls.env["ai.model"].create(
+            {
+                "name": "Test Model",
+                "provider_id": cls.provider.id,
+                "technical_name": "test-model",
+            }
+        )
+        cls.field = cls.env["ir.model.fields"].search(
+            [("model", "=", "res.partner"), ("name", "=", "comment")], limit=1
+        )
+        cls.server_action = cls.env["ir.actions.server"].create(
+            {
+                "name": "Test AI Action",
+                "model_id": cls.env["ir.model"]._get_id("res.partner"),
+                "state": "generative_ai",
+                "ai_model_id": cls.ai_model.id,
+                "prompt_template": "Summarize our partners",
+                "output_destination": "field",
+                "output_field_id": cls.field.id,
+            }
+        )
+
+    def _run_action(self, mock_ai_service):
+        with patch(
+            "odoo.addons.much_automated_agent_actions.models.ai_service.AiServiceFactory.get_service",  # noqa: E501
+            return_value=mock_ai_service,
+        ):
+            self.server_action.with_context(
+                active_model="res.partner", active_ids=self.partners.ids
+            ).run()
+            self.env["ai.job"]._cron_process_jobs()
+
+    def test_enqueue_jobs(self):
+        """Running the action creates one job per record in a single batch."""
+        with patch(
+            "odoo.addons.much_automated_agent_actions.models.ai_service.AiServiceFactory.get_service",  # noqa: E501
+            return_value=MagicMock(),
+        ):
+            self.server_action.with_context(
+                active_model="res.partner", active_ids=self.partners.ids
+            ).run()
+
+        batch = self.env["ai.job.batch"].search(
+            [("server_action_id", "=", self.server_action.id)]
+        )
+        self.assertEqual(len(batch), 1)
+        self.assertEqual(batch.job_ids.mapped("res_id"), self.partners.ids)
+        self.assertEqual(set(batch.job_ids.mapped("state")), {"pending"})
+        self.assertEqual(batch.progress, 0)
+
+    def test_process_jobs_deduplicates_requests(self):
+        """Identical requests are sent once and their response is shared."""
+        mock_ai_service = MagicMock()
+        mock_ai_service.generate_text.return_value = "Test AI response"
+
+        self._run_action(mock_ai_service)
+
+        mock_ai_service.generate_text.assert_called_once()
+        batch = self.env["ai.job.batch"].search(
+            [("server_action_id", "=", self.server_action.id)]
+        )
+        self.assertEqual(set(batch.job_ids.mapped("state")), {"done"})
+        self.assertEqual(batch.job_ids.mapped("is_duplicate"), [False, True])
+        self.assertEqual(batch.state, "done")
+        self.assertEqual(batch.progress, 100)
+        for partner in self.partners:
+            self.assertIn("Test AI response", partner.comment)
+
+    def test_process_jobs_failure(self):
+        """A job without response is marked as failed."""
+        mock_ai_service = MagicMock()
+        mock_ai_service.generate_text.return_value = ""
+
+        self._run_action(mock_ai_service)
+
+        batch = self.env["ai.job.batch"].search(
+            [("server_action_id", "=", self.server_action.id)]
+        )
+        self.assertEqual(set(batch.job_ids.mapped("state")), {"failed"})
+        self.assertEqual(batch.failed_count, 2)
+        self.assertEqual(batch.state, "done")
+
+
+@tagged("post_install", "-at_install")
+class TestJobUtils(TransactionCase):
+    """Test cases for the job_utils module."""
+
+    def test_deduplicator_shares_result(self):
+        deduplicator = RequestDeduplicator()
+        func = MagicMock(return_value="result")
+
+        self.assertEqual(deduplicator.run("key", func), ("result", False))
+        self.assertEqual(deduplicator.run("key", func), ("result", True))
+        func.assert_called_once()
+
+    def test_deduplicator_retries_empty_result(self):
+        deduplicator = RequestDeduplicator()
+        func = MagicMock(return_value=False)
+
+        deduplicator.run("key", func)
+        deduplicator.run("key", func)
+        self.assertEqual(func.call_count, 2)
+
+    def test_provider_limiter_tokens(self):
+        limiter = ProviderLimiter(1, tokens_per_minute=100)
+
+        with patch(
+            "odoo.addons.much_automated_agent_actions.tools.job_utils.time.sleep"
+        ) as mock_sleep:
+            limiter.acquire_tokens(60)
+            mock_sleep.assert_not_called()
+            # The next request exceeds the budget: the limiter waits until the
+            # first request leaves the one-minute window
+            with patch(
+                "odoo.addons.much_automated_agent_actions.tools.job_utils.time.monotonic",
+                side_effect=[0.0, 61.0],
+            ):
+                limiter._window[0] = (0.0, 60)
+                limiter.acquire_tokens(60)
+            mock_sleep.assert_called_once()
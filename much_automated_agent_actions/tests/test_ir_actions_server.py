@@ -190,6 +190,59 @@ class TestIrActionsServer(TransactionCase):
         self.assertEqual(result["file_data"][0]["filename"], "test.pdf")
         self.assertEqual(result["file_data"][0]["data"], self.attachment.datas)
 
+    def test_ai_request_hash_uses_checksums(self):
+        """Test that files with a checksum are identified by it."""
+        files = {
+            "file_data": [
+                {"filename": "test.pdf", "data": "Zmlyc3Q=", "checksum": "abc"}
+            ],
+            "chatter": "",
+        }
+        same_file = {
+            "file_data": [
+                {"filename": "test.pdf", "data": "c2Vjb25k", "checksum": "abc"}
+            ],
+            "chatter": "",
+        }
+        other_file = {
+            "file_data": [
+                {"filename": "test.pdf", "data": "Zmlyc3Q=", "checksum": "def"}
+            ],
+            "chatter": "",
+        }
+
+        request_hash = self.server_action._get_ai_request_hash("Prompt", files)
+        self.assertEqual(
+            request_hash, self.server_action._get_ai_request_hash("Prompt", same_file)
+        )
+        self.assertNotEqual(
+            request_hash,
+            self.server_action._get_ai_request_hash("Prompt", other_file),
+        )
+        self.assertNotEqual(
+            request_hash, self.server_action._get_ai_request_hash("Other", files)
+        )
+
+    def test_generate_ai_response_cache(self):
+        """Test that identical requests reuse the cached response."""
+        mock_ai_service = MagicMock()
+        mock_ai_service.generate_text.return_value = "Cached AI response"
+        files = {"file_data": [], "chatter": ""}
+
+        self.ai_model.response_cache_ttl = 10
+        for _i in range(2):
+            response = self.server_action._generate_ai_response(
+                mock_ai_service, "Test cached prompt", files
+            )
+            self.assertEqual(response, "Cached AI response")
+        mock_ai_service.generate_text.assert_called_once()
+
+        self.ai_model.response_cache_ttl = 0
+        self.server_action._generate_ai_response(
+            mock_ai_service, "Test cached prompt", files
+        )
+        self.assertEqual(mock_ai_service.generate_text.call_count, 2)
+
     def test_prepare_attachment_files_max_files(self):
         """Test preparing attachment files with max files limit."""
         # Create more attachments than the max_files limit
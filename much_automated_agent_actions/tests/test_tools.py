@@ -1,7 +1,10 @@
+from unittest.mock import patch
+
 from markupsafe import Markup
 
 from odoo.tests.common import TransactionCase, tagged
 
+from ..tools.cache_utils import LRUCache
 from ..tools.dict_utils import merge_dict
 from ..tools.md_utils import parse_markdown
 
@@ -137,3 +140,40 @@ This is a text with a footnote[^1].
 
         self.assertIn('class="class"', result)
         self.assertIn('id="id"', result)
+
+
+@tagged("post_install", "-at_install")
+class TestCacheUtils(TransactionCase):
+    """Test cases for the cache_utils module."""
+
+    def test_lru_cache_evicts_least_recently_used(self):
+        cache = LRUCache(max_entries=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("c"), 3)
+
+    def test_lru_cache_max_size(self):
+        cache = LRUCache(max_entries=10, max_size=10)
+        cache.set("a", "aaaaaa", size=6)
+        cache.set("b", "bbbbbb", size=6)
+        cache.set("c", "c" * 11, size=11)
+
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.get("b"), "bbbbbb")
+        self.assertIsNone(cache.get("c"))
+
+    def test_lru_cache_ttl(self):
+        cache = LRUCache(max_entries=10, ttl=60)
+        with patch(
+            "odoo.addons.much_automated_agent_actions.tools.cache_utils.time.monotonic",
+            side_effect=[0.0, 30.0, 61.0],
+        ):
+            cache.set("a", 1)
+            self.assertEqual(cache.get("a"), 1)
+            self.assertIsNone(cache.get("a"))
+        self.assertEqual(len(cache), 0)
@@ -4,3 +4,5 @@ from .string_utils import decode_string, str_to_bool
 from .img_utils import is_image_mimetype
 from .env_utils import new_environment
 from .notification_utils import _async_notify
+from .job_utils import ProviderLimiter, RequestDeduplicator
+from .cache_utils import LRUCache
@@ -0,0 +1,63 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class LRUCache:
+    """Thread-safe least recently used cache.
+
+    The cache is bounded by a number of entries and by the total size of the
+    values, entries older than the TTL are expired on read.
+    """
+
+    def __init__(
+        self, max_entries: int, max_size: int = 0, ttl: Optional[float] = None
+    ) -> None:
+        self.max_entries = max_entries
+        self.max_size = max_size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: OrderedDict = OrderedDict()
+        self._size = 0
+
+    def get(self, key: Hashable, ttl: Optional[float] = None) -> Any:
+        """Return the value of ``key``, or ``None`` if it is missing or
+        older than ``ttl`` seconds (the cache TTL by default)."""
+        ttl = ttl or self.ttl
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, size, date = entry
+            if ttl and time.monotonic() - date > ttl:
+                self._pop(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any, size: int = 0) -> None:
+        """Store ``value``, evicting the least recently used entries."""
+        if self.max_size and size > self.max_size:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._pop(key)
+            self._entries[key] = (value, size, time.monotonic())
+            self._size += size
+            while len(self._entries) > self.max_entries or (
+                self.max_size and self._size > self.max_size
+            ):
+                self._pop(next(iter(self._entries)))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def _pop(self, key: Hashable) -> None:
+        _value, size, _date = self._entries.pop(key)
+        self._size -= size
+
+    def __len__(self) -> int:
+        return len(self._entries)
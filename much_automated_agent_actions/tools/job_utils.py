@@ -0,0 +1,74 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+RATE_LIMIT_WINDOW = 60.0
+
+
+class ProviderLimiter:
+    """Concurrency and tokens-per-minute limits of one AI provider.
+
+    The concurrency limit is a semaphore held during the provider call; the
+    token limit is a sliding one-minute window of the estimated tokens of the
+    requests already sent.
+    """
+
+    def __init__(
+        self, max_concurrency: int, tokens_per_minute: int = 0, used_tokens: int = 0
+    ) -> None:
+        self.semaphore = threading.BoundedSemaphore(max(max_concurrency, 1))
+        self.tokens_per_minute = tokens_per_minute
+        self._lock = threading.Lock()
+        self._window: deque = deque()
+        if used_tokens:
+            self._window.append((time.monotonic(), used_tokens))
+
+    def acquire_tokens(self, tokens: int) -> None:
+        """Wait until ``tokens`` fit in the tokens-per-minute budget."""
+        if not self.tokens_per_minute:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                while self._window and now - self._window[0][0] >= RATE_LIMIT_WINDOW:
+                    self._window.popleft()
+                used = sum(window_tokens for _date, window_tokens in self._window)
+                # A request larger than the budget is sent alone
+                if not self._window or used + tokens <= self.tokens_per_minute:
+                    self._window.append((now, tokens))
+                    return
+                wait = RATE_LIMIT_WINDOW - (now - self._window[0][0])
+            time.sleep(max(wait, 0.1))
+
+
+class RequestDeduplicator:
+    """Run a function once per key and share its result.
+
+    Callers asking for a key already being computed wait for the first
+    caller and get the same result. Failures and empty results are not
+    kept, so a later caller tries again.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._futures: Dict[Hashable, Future] = {}
+
+    def run(self, key: Hashable, func: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Return the result of ``func`` for ``key`` and whether it was
+        shared from another caller."""
+        with self._lock:
+            future = self._futures.get(key)
+            owner = future is None
+            if owner:
+                future = self._futures[key] = Future()
+        if owner:
+            try:
+                future.set_result(func())
+            except Exception as exc:
+                future.set_exception(exc)
+            if future.exception() or not future.result():
+                with self._lock:
+                    self._futures.pop(key, None)
+        return future.result(), not owner
@@ -2,6 +2,7 @@
 
 from . import saas_license
 from . import saas_instance
+from . import saas_usage
 from . import subscription_package
 from . import saas_config
 from . import res_config_settings
@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 
 from odoo import models, fields, api, _
+from odoo.tools import SQL
 
 
 class SaasInstance(models.Model):
@@ -35,6 +36,46 @@ class SaasInstance(models.Model):
         compute='_compute_has_overages'
     )
 
+    # Metered usage
+    usage_sample_ids = fields.One2many(
+        'saas.usage.sample',
+        'instance_id',
+        string='Usage Samples'
+    )
+    usage_daily_ids = fields.One2many(
+        'saas.usage.daily',
+        'instance_id',
+        string='Daily Usage'
+    )
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        instances = super().create(vals_list)
+        instances._record_usage()
+        return instances
+
+    def write(self, vals):
+        res = super().write(vals)
+        if not self._get_usage_fields().isdisjoint(vals):
+            self._record_usage()
+        return res
+
+    @api.model
+    def _get_usage_fields(self):
+        """Instance fields whose changes are recorded as usage samples"""
+        return {'current_users', 'company_count', 'storage_used_gb'}
+
+    def _record_usage(self):
+        """Append a usage sample with the current usage of the instances"""
+        if not self:
+            return self.env['saas.usage.sample']
+        return self.env['saas.usage.sample'].sudo().create([{
+            'instance_id': instance.id,
+            'user_count': instance.current_users,
+            'company_count': instance.company_count,
+            'storage_gb': instance.storage_used_gb,
+        } for instance in self])
+
     @api.depends('license_ids')
     def _compute_license_count(self):
         for record in self:
@@ -42,13 +83,47 @@ class SaasInstance(models.Model):
 
     @api.depends('license_ids', 'license_ids.date')
     def _compute_latest_license(self):
+        # One indexed lookup for all the instances instead of sorting their records
+        instance_ids = [instance_id for instance_id in self._origin.ids if instance_id]
+        latest = {}
+        if instance_ids:
+            self.env['saas.license'].flush_model(['instance_id', 'date'])
+            self.env.cr.execute(SQL(
+                """
+                SELECT DISTINCT ON (instance_id) instance_id, id
+                FROM saas_license
+                WHERE instance_id IN %s
+                ORDER BY instance_id, date DESC, id DESC
+                """,
+                tuple(instance_ids),
+            ))
+            latest = dict(self.env.cr.fetchall())
         for record in self:
-            record.latest_license_id = record.license_ids.sorted('date', reverse=True)[:1]
+            record.latest_license_id = latest.get(record._origin.id, False)
 
-    @api.depends('latest_license_id', 'latest_license_id.is_billable')
+    @api.depends('latest_license_id', 'latest_license_id.user_overage', 'latest_license_id.company_overage',
+                 'latest_license_id.storage_overage', 'usage_daily_ids',
+                 'subscription_id.max_users', 'subscription_id.max_companies', 'subscription_id.max_storage_gb')
     def _compute_has_overages(self):
+        """Usage above the plan limits, from the metered usage or else the last license record"""
+        latest_usage = self.env['saas.usage.daily']._get_latest_usage(
+            [instance_id for instance_id in self._origin.ids if instance_id]
+        )
         for record in self:
-            record.has_overages = record.latest_license_id.is_billable if record.latest_license_id else False
+            usage = latest_usage.get(record._origin.id)
+            if usage is None:
+                # Not metered yet, use the overages of the last license record
+                license = record.latest_license_id
+                record.has_overages = bool(
+                    license.user_overage or license.company_overage or license.storage_overage
+                )
+                continue
+            sub = record.subscription_id
+            record.has_overages = bool(
+                (sub.max_users and usage['user_count'] > sub.max_users)
+                or (sub.max_companies and usage['company_count'] > sub.max_companies)
+                or (sub.max_storage_gb and usage['storage_gb'] > sub.max_storage_gb)
+            )
 
     def action_view_licenses(self):
         """View license records for this instance"""
@@ -71,13 +146,9 @@ class SaasInstance(models.Model):
         """Create a license snapshot for current usage"""
         self.ensure_one()
 
-        license = self.env['saas.license'].create({
-            'instance_id': self.id,
-            'date': fields.Date.today(),
-            'user_count': self.current_users,
-            'company_count': self.company_count,
-            'storage_gb': self.storage_used_gb,
-        })
+        license = self.env['saas.license'].create(
+            self.env['saas.license']._prepare_snapshot_vals_list(self, fields.Date.today())
+        )
 
         return {
             'type': 'ir.actions.act_window',
@@ -1,7 +1,17 @@
 # -*- coding: utf-8 -*-
 
 from odoo import models, fields, api, _
-from datetime import timedelta
+import logging
+
+_logger = logging.getLogger(__name__)
+
+# Pricing model -> (charge the base price, field holding the billed user quantity)
+PRICING_MODEL_CHARGES = {
+    'overage_only': (False, 'user_overage'),
+    'base_included_overage': (True, 'user_overage'),
+    'per_user': (False, 'user_count'),
+    'base_per_user': (True, 'user_count'),
+}
 
 
 class SaasLicense(models.Model):
@@ -155,90 +165,51 @@ class SaasLicense(models.Model):
                  'plan_user_limit', 'plan_company_limit', 'plan_storage_limit')
     def _compute_overages(self):
         for record in self:
-            # User overage
-            if record.plan_user_limit and record.user_count > record.plan_user_limit:
-                record.user_overage = record.user_count - record.plan_user_limit
-            else:
-                record.user_overage = 0
-
-            # Company overage
-            if record.plan_company_limit and record.company_count > record.plan_company_limit:
-                record.company_overage = record.company_count - record.plan_company_limit
-            else:
-                record.company_overage = 0
-
-            # Storage overage
-            if record.plan_storage_limit and record.storage_gb > record.plan_storage_limit:
-                record.storage_overage = record.storage_gb - record.plan_storage_limit
-            else:
-                record.storage_overage = 0.0
+            record.user_overage = max(record.user_count - record.plan_user_limit, 0) if record.plan_user_limit else 0
+            record.company_overage = (
+                max(record.company_count - record.plan_company_limit, 0) if record.plan_company_limit else 0
+            )
+            record.storage_overage = (
+                max(record.storage_gb - record.plan_storage_limit, 0.0) if record.plan_storage_limit else 0.0
+            )
 
     @api.depends('user_count', 'user_overage', 'company_overage', 'storage_overage', 'subscription_id',
                  'subscription_id.pricing_model', 'subscription_id.base_monthly_price',
                  'subscription_id.price_per_user', 'subscription_id.included_users')
     def _compute_billing_amounts(self):
         """Calculate billing amounts based on pricing model"""
-        for record in self:
-            base_amount = 0.0
-            user_amount = 0.0
-            overage_amount = 0.0
-
-            if not record.subscription_id:
-                record.base_amount = 0.0
-                record.user_amount = 0.0
-                record.overage_amount = 0.0
-                record.total_amount = 0.0
-                record.is_billable = False
-                continue
-
-            sub = record.subscription_id
-            pricing_model = sub.pricing_model or 'overage_only'
-
-            # === CALCULATE BASED ON PRICING MODEL ===
-
-            if pricing_model == 'overage_only':
-                # Only charge for users that exceed the limit
-                base_amount = 0.0
-                user_amount = 0.0
-                if record.user_overage > 0:
-                    user_amount = record.user_overage * sub.price_per_user
-
-            elif pricing_model == 'base_included_overage':
-                # Base price + charge for additional users beyond included
-                base_amount = sub.base_monthly_price
-                user_amount = 0.0
-                if record.user_overage > 0:
-                    user_amount = record.user_overage * sub.price_per_user
-
-            elif pricing_model == 'per_user':
-                # Charge for every user, no base price
-                base_amount = 0.0
-                user_amount = record.user_count * sub.price_per_user
-
-            elif pricing_model == 'base_per_user':
-                # Base price + charge for every user
-                base_amount = sub.base_monthly_price
-                user_amount = record.user_count * sub.price_per_user
-
-            # === ADDITIONAL OVERAGES (company and storage) ===
-            # These work the same for all models
-
-            # Company overage
-            if record.company_overage > 0:
-                overage_amount += record.company_overage * sub.price_per_company
-
-            # Storage overage
-            if record.storage_overage > 0:
-                overage_amount += record.storage_overage * sub.price_per_gb
-
-            # === SET VALUES ===
-            record.base_amount = base_amount
-            record.user_amount = user_amount
-            record.overage_amount = overage_amount
-            record.total_amount = base_amount + user_amount + overage_amount
-
-            # Is billable if there's any amount to charge
-            record.is_billable = record.total_amount > 0
+        without_subscription = self.filtered(lambda record: not record.subscription_id)
+        without_subscription.update({
+            'base_amount': 0.0,
+            'user_amount': 0.0,
+            'overage_amount': 0.0,
+            'total_amount': 0.0,
+            'is_billable': False,
+        })
+
+        # Records sharing a pricing model are billed with the same formula
+        for pricing_model, records in (self - without_subscription).grouped(
+            lambda record: record.subscription_id.pricing_model or 'overage_only'
+        ).items():
+            charge_base, user_quantity_field = PRICING_MODEL_CHARGES.get(pricing_model, (False, None))
+            for record in records:
+                sub = record.subscription_id
+                base_amount = sub.base_monthly_price if charge_base else 0.0
+                user_amount = record[user_quantity_field] * sub.price_per_user if user_quantity_field else 0.0
+
+                # Company and storage overages work the same for all models
+                overage_amount = (
+                    record.company_overage * sub.price_per_company
+                    + record.storage_overage * sub.price_per_gb
+                )
+
+                record.base_amount = base_amount
+                record.user_amount = user_amount
+                record.overage_amount = overage_amount
+                record.total_amount = base_amount + user_amount + overage_amount
+
+                # Is billable if there's any amount to charge
+                record.is_billable = record.total_amount > 0
 
     @api.depends('total_amount')
     def _compute_is_billable(self):
@@ -246,36 +217,13 @@ class SaasLicense(models.Model):
         for record in self:
             record.is_billable = record.total_amount > 0
 
-    def action_create_invoice(self):
-        """Create invoice based on pricing model"""
+    def _prepare_invoice_lines(self):
+        """Return the invoice line commands billing this license record"""
         self.ensure_one()
-
-        if not self.is_billable:
-            return {
-                'type': 'ir.actions.client',
-                'tag': 'display_notification',
-                'params': {
-                    'title': _('Not Billable'),
-                    'message': _('No charges for this license record.'),
-                    'type': 'warning',
-                }
-            }
-
-        if self.invoice_id:
-            return {
-                'type': 'ir.actions.client',
-                'tag': 'display_notification',
-                'params': {
-                    'title': _('Already Invoiced'),
-                    'message': _('This license record has already been invoiced.'),
-                    'type': 'warning',
-                }
-            }
-
-        # Create invoice lines based on pricing model
         invoice_lines = []
-        instance_name = self.instance_id.name if self.instance_id else (self.company_id.name if hasattr(self, 'company_id') else 'License')
-        pricing_model = self.subscription_id.pricing_model or 'overage_only'
+        instance_name = self.instance_id.name or self.company_id.name or _('License')
+        sub = self.subscription_id
+        user_quantity_field = PRICING_MODEL_CHARGES.get(sub.pricing_model or 'overage_only', (False, None))[1]
 
         # Base amount line (for applicable models)
         if self.base_amount > 0:
@@ -287,19 +235,19 @@ class SaasLicense(models.Model):
 
         # User amount line (varies by model)
         if self.user_amount > 0:
-            if pricing_model in ['overage_only', 'base_included_overage']:
+            if user_quantity_field == 'user_overage':
                 # Additional users (overage)
                 invoice_lines.append((0, 0, {
                     'name': _('Additional Users (%s) - %s') % (self.user_overage, instance_name),
                     'quantity': self.user_overage,
-                    'price_unit': self.subscription_id.price_per_user,
+                    'price_unit': sub.price_per_user,
                 }))
-            elif pricing_model in ['per_user', 'base_per_user']:
+            elif user_quantity_field == 'user_count':
                 # All users
                 invoice_lines.append((0, 0, {
                     'name': _('Users (%s) - %s') % (self.user_count, instance_name),
                     'quantity': self.user_count,
-                    'price_unit': self.subscription_id.price_per_user,
+                    'price_unit': sub.price_per_user,
                 }))
 
         # Company overage line (always additional)
@@ -307,7 +255,7 @@ class SaasLicense(models.Model):
             invoice_lines.append((0, 0, {
                 'name': _('Additional Companies (%s) - %s') % (self.company_overage, instance_name),
                 'quantity': self.company_overage,
-                'price_unit': self.subscription_id.price_per_company,
+                'price_unit': sub.price_per_company,
             }))
 
         # Storage overage line (always additional)
@@ -315,10 +263,69 @@ class SaasLicense(models.Model):
             invoice_lines.append((0, 0, {
                 'name': _('Additional Storage (%.2f GB) - %s') % (self.storage_overage, instance_name),
                 'quantity': self.storage_overage,
-                'price_unit': self.subscription_id.price_per_gb,
+                'price_unit': sub.price_per_gb,
             }))
 
-        if not invoice_lines:
+        return invoice_lines
+
+    def _create_invoices(self):
+        """
+        Create one invoice per client and company for the billable, not yet
+        invoiced license records, with one line block per license record.
+
+        :return: the created invoices
+        """
+        invoices = self.env['account.move']
+        licenses = self.filtered(lambda record: record.is_billable and not record.invoice_id)
+        for company, company_licenses in licenses.grouped('company_id').items():
+            invoice_licenses = []
+            vals_list = []
+            for client_licenses in company_licenses.grouped('client_id').values():
+                invoice_lines = [
+                    line for record in client_licenses.sorted('date') for line in record._prepare_invoice_lines()
+                ]
+                if not invoice_lines:
+                    continue
+                invoice_licenses.append(client_licenses)
+                vals_list.append({
+                    'move_type': 'out_invoice',
+                    'partner_id': client_licenses.client_id.partner_id.id,
+                    'invoice_date': fields.Date.today(),
+                    'invoice_line_ids': invoice_lines,
+                })
+            company_invoices = self.env['account.move'].with_company(company or self.env.company).create(vals_list)
+            for client_licenses, invoice in zip(invoice_licenses, company_invoices):
+                client_licenses.invoice_id = invoice
+            invoices |= company_invoices
+        return invoices
+
+    def action_create_invoice(self):
+        """Create invoices based on pricing model, one per client"""
+        if not self.filtered('is_billable'):
+            return {
+                'type': 'ir.actions.client',
+                'tag': 'display_notification',
+                'params': {
+                    'title': _('Not Billable'),
+                    'message': _('No charges for this license record.'),
+                    'type': 'warning',
+                }
+            }
+
+        if all(record.invoice_id for record in self.filtered('is_billable')):
+            return {
+                'type': 'ir.actions.client',
+                'tag': 'display_notification',
+                'params': {
+                    'title': _('Already Invoiced'),
+                    'message': _('This license record has already been invoiced.'),
+                    'type': 'warning',
+                }
+            }
+
+        invoices = self._create_invoices()
+
+        if not invoices:
             return {
                 'type': 'ir.actions.client',
                 'tag': 'display_notification',
@@ -329,47 +336,78 @@ class SaasLicense(models.Model):
                 }
             }
 
-        invoice = self.env['account.move'].create({
-            'move_type': 'out_invoice',
-            'partner_id': self.client_id.partner_id.id,
-            'invoice_date': fields.Date.today(),
-            'invoice_line_ids': invoice_lines,
-        })
-
-        self.invoice_id = invoice.id
-
+        if len(invoices) == 1:
+            return {
+                'type': 'ir.actions.act_window',
+                'name': _('Invoice'),
+                'res_model': 'account.move',
+                'res_id': invoices.id,
+                'view_mode': 'form',
+                'target': 'current',
+            }
         return {
             'type': 'ir.actions.act_window',
-            'name': _('Invoice'),
+            'name': _('Invoices'),
             'res_model': 'account.move',
-            'res_id': invoice.id,
-            'view_mode': 'form',
+            'domain': [('id', 'in', invoices.ids)],
+            'view_mode': 'list,form',
             'target': 'current',
         }
 
+    @api.model
+    def _prepare_snapshot_vals_list(self, instances, date):
+        """
+        Return the values of the license records of ``instances`` at ``date``.
+
+        Subscriptions billed on peak or average usage read the metered usage
+        of the month up to ``date``; the others, and instances without
+        metered usage, use the current usage of the instance.
+        """
+        period_usage = self.env['saas.usage.daily']._get_period_usage(
+            instances.filtered(lambda instance: instance.subscription_id.usage_billing_basis in ('peak', 'average')).ids,
+            date.replace(day=1),
+            date,
+        )
+        vals_list = []
+        for instance in instances:
+            vals = {
+                'instance_id': instance.id,
+                'date': date,
+                'user_count': instance.current_users,
+                'company_count': instance.company_count,
+                'storage_gb': instance.storage_used_gb,
+            }
+            if instance.id in period_usage:
+                vals.update(period_usage[instance.id][instance.subscription_id.usage_billing_basis])
+            vals_list.append(vals)
+        return vals_list
+
     @api.model
     def create_monthly_license_records(self):
         """
         Cron job to create monthly license records for all active instances
         """
+        today = fields.Date.today()
+        # Daily usage sample of every running instance
+        self.env['saas.instance'].search([('state', 'in', ['active', 'trial'])])._record_usage()
+
+        # Active instances without a record for today, in a single anti-join
         instances = self.env['saas.instance'].search([
-            ('state', 'in', ['active', 'trial'])
+            ('state', 'in', ['active', 'trial']),
+            ('license_ids', 'not any', [('date', '=', today)]),
         ])
+        if not instances:
+            return True
 
-        for instance in instances:
-            # Check if record already exists for this month
-            existing = self.search([
-                ('instance_id', '=', instance.id),
-                ('date', '=', fields.Date.today())
-            ])
-
-            if not existing:
-                self.create({
-                    'instance_id': instance.id,
-                    'date': fields.Date.today(),
-                    'user_count': instance.current_users,
-                    'company_count': instance.company_count,
-                    'storage_gb': instance.storage_used_gb,
-                })
+        licenses = self.with_context(mail_create_nolog=True, tracking_disable=True).create(
+            self._prepare_snapshot_vals_list(instances, today)
+        )
+        _logger.info("Created %s license records for %s", len(licenses), today)
 
         return True
+
+    def init(self):
+        self.env.cr.execute("""
+            CREATE INDEX IF NOT EXISTS saas_license_instance_date_idx
+            ON saas_license (instance_id, date DESC, id DESC)
+        """)
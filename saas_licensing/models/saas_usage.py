@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models, fields, api, _
+from odoo.exceptions import UserError
+from odoo.tools import SQL
+from datetime import timedelta
+
+DEFAULT_SAMPLE_RETENTION_DAYS = 90
+
+
+class SaasUsageSample(models.Model):
+    """
+    Append-only usage samples of the SaaS instances.
+
+    Every sample is added to the daily rollup of its instance when created,
+    so old samples can be removed without losing the billing figures.
+    """
+    _name = 'saas.usage.sample'
+    _description = 'SaaS Usage Sample'
+    _order = 'timestamp desc, id desc'
+    _log_access = False
+
+    instance_id = fields.Many2one(
+        'saas.instance',
+        string='Instance',
+        required=True,
+        ondelete='cascade',
+        readonly=True
+    )
+    timestamp = fields.Datetime(
+        string='Timestamp',
+        default=fields.Datetime.now,
+        required=True,
+        readonly=True,
+        index=True
+    )
+    user_count = fields.Integer(string='User Count', readonly=True)
+    company_count = fields.Integer(string='Company Count', readonly=True)
+    storage_gb = fields.Float(string='Storage (GB)', readonly=True)
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        samples = super().create(vals_list)
+        self.env['saas.usage.daily']._add_samples(samples)
+        return samples
+
+    def write(self, vals):
+        raise UserError(_('Usage samples cannot be modified.'))
+
+    @api.autovacuum
+    def _gc_samples(self):
+        """Remove the samples older than the retention period, their daily rollups are kept"""
+        retention_days = int(self.env['ir.config_parameter'].sudo().get_param(
+            'saas_licensing.usage_sample_retention_days', DEFAULT_SAMPLE_RETENTION_DAYS
+        ))
+        self.search([('timestamp', '<', fields.Datetime.now() - timedelta(days=retention_days))]).unlink()
+
+
+class SaasUsageDaily(models.Model):
+    """
+    Daily usage rollup of the SaaS instances: peak, sum and last value of
+    the samples of each day. The (instance, day) unique index also serves
+    the "latest usage" lookup of the instances.
+    """
+    _name = 'saas.usage.daily'
+    _description = 'SaaS Daily Usage'
+    _order = 'day desc, instance_id'
+    _log_access = False
+
+    instance_id = fields.Many2one(
+        'saas.instance',
+        string='Instance',
+        required=True,
+        ondelete='cascade',
+        readonly=True
+    )
+    day = fields.Date(string='Day', required=True, readonly=True)
+    sample_count = fields.Integer(string='Samples', readonly=True)
+    last_sample_at = fields.Datetime(string='Last Sample', readonly=True)
+
+    user_max = fields.Integer(string='Peak Users', readonly=True)
+    user_sum = fields.Integer(string='Users Sum', readonly=True)
+    user_last = fields.Integer(string='Users', readonly=True)
+    company_max = fields.Integer(string='Peak Companies', readonly=True)
+    company_sum = fields.Integer(string='Companies Sum', readonly=True)
+    company_last = fields.Integer(string='Companies', readonly=True)
+    storage_max = fields.Float(string='Peak Storage (GB)', readonly=True)
+    storage_sum = fields.Float(string='Storage Sum (GB)', readonly=True)
+    storage_last = fields.Float(string='Storage (GB)', readonly=True)
+
+    _sql_constraints = [
+        ('instance_day_uniq', 'unique(instance_id, day)', 'Only one usage rollup per instance and day.'),
+    ]
+
+    @api.model
+    def _add_samples(self, samples):
+        """Add ``samples`` to the daily rollups of their instances"""
+        if not samples:
+            return
+        samples.flush_recordset()
+        self.env.cr.execute(SQL(
+            """
+            INSERT INTO saas_usage_daily AS daily (
+                instance_id, day, sample_count, last_sample_at,
+                user_max, user_sum, user_last,
+                company_max, company_sum, company_last,
+                storage_max, storage_sum, storage_last
+            )
+            SELECT
+                sample.instance_id,
+                sample.timestamp::date,
+                COUNT(*),
+                MAX(sample.timestamp),
+                MAX(sample.user_count),
+                SUM(sample.user_count),
+                (ARRAY_AGG(sample.user_count ORDER BY sample.timestamp DESC, sample.id DESC))[1],
+                MAX(sample.company_count),
+                SUM(sample.company_count),
+                (ARRAY_AGG(sample.company_count ORDER BY sample.timestamp DESC, sample.id DESC))[1],
+                MAX(sample.storage_gb),
+                SUM(sample.storage_gb),
+                (ARRAY_AGG(sample.storage_gb ORDER BY sample.timestamp DESC, sample.id DESC))[1]
+            FROM saas_usage_sample sample
+            WHERE sample.id IN %(sample_ids)s
+            GROUP BY sample.instance_id, sample.timestamp::date
+            ON CONFLICT (instance_id, day) DO UPDATE SET
+                sample_count = daily.sample_count + EXCLUDED.sample_count,
+                user_max = GREATEST(daily.user_max, EXCLUDED.user_max),
+                user_sum = daily.user_sum + EXCLUDED.user_sum,
+                company_max = GREATEST(daily.company_max, EXCLUDED.company_max),
+                company_sum = daily.company_sum + EXCLUDED.company_sum,
+                storage_max = GREATEST(daily.storage_max, EXCLUDED.storage_max),
+                storage_sum = daily.storage_sum + EXCLUDED.storage_sum,
+                user_last = CASE WHEN EXCLUDED.last_sample_at >= daily.last_sample_at
+                    THEN EXCLUDED.user_last ELSE daily.user_last END,
+                company_last = CASE WHEN EXCLUDED.last_sample_at >= daily.last_sample_at
+                    THEN EXCLUDED.company_last ELSE daily.company_last END,
+                storage_last = CASE WHEN EXCLUDED.last_sample_at >= daily.last_sample_at
+                    THEN EXCLUDED.storage_last ELSE daily.storage_last END,
+                last_sample_at = GREATEST(daily.last_sample_at, EXCLUDED.last_sample_at)
+            """,
+            sample_ids=tuple(samples.ids),
+        ))
+        self.invalidate_model()
+        # The upsert bypasses the ORM, mark the fields depending on the
+        # rollups (e.g. has_overages) as outdated on the instances
+        samples.instance_id.modified(['usage_daily_ids'])
+
+    @api.model
+    def _get_latest_usage(self, instance_ids):
+        """
+        Return the last metered usage of the instances
+
+        :return: dict {instance_id: {'user_count', 'company_count', 'storage_gb'}}
+        """
+        if not instance_ids:
+            return {}
+        self.flush_model()
+        self.env.cr.execute(SQL(
+            """
+            SELECT DISTINCT ON (instance_id) instance_id, user_last, company_last, storage_last
+            FROM saas_usage_daily
+            WHERE instance_id IN %s
+            ORDER BY instance_id, day DESC
+            """,
+            tuple(instance_ids),
+        ))
+        return {
+            instance_id: {'user_count': users, 'company_count': companies, 'storage_gb': storage}
+            for instance_id, users, companies, storage in self.env.cr.fetchall()
+        }
+
+    @api.model
+    def _get_period_usage(self, instance_ids, date_from, date_to):
+        """
+        Return the peak and average usage of the instances between
+        ``date_from`` and ``date_to`` (both included)
+
+        :return: dict {instance_id: {'peak': {...}, 'average': {...}}} where
+            both values hold user_count, company_count and storage_gb
+        """
+        if not instance_ids:
+            return {}
+        groups = self._read_group(
+            [('instance_id', 'in', list(instance_ids)), ('day', '>=', date_from), ('day', '<=', date_to)],
+            ['instance_id'],
+            ['sample_count:sum', 'user_max:max', 'user_sum:sum', 'company_max:max', 'company_sum:sum',
+             'storage_max:max', 'storage_sum:sum'],
+        )
+        usage = {}
+        for instance, samples, user_max, user_sum, company_max, company_sum, storage_max, storage_sum in groups:
+            if not samples:
+                continue
+            usage[instance.id] = {
+                'peak': {
+                    'user_count': user_max,
+                    'company_count': company_max,
+                    'storage_gb': storage_max,
+                },
+                'average': {
+                    'user_count': round(user_sum / samples),
+                    'company_count': round(company_sum / samples),
+                    'storage_gb': storage_sum / samples,
+                },
+            }
+        return usage
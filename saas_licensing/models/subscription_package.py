@@ -127,6 +127,16 @@ class SubscriptionPackage(models.Model):
         help='Create invoice automatically when overage is detected'
     )
 
+    usage_billing_basis = fields.Selection([
+        ('snapshot', 'Current Usage'),
+        ('peak', 'Peak Usage'),
+        ('average', 'Average Usage'),
+    ], string='Usage Billing Basis',
+       default='snapshot',
+       required=True,
+       help='Usage billed on the license records: the usage at the time of the record, '
+            'or the peak or average metered usage of the month')
+
     # ===== COMPUTED FIELDS FOR UI =====
     pricing_model_description = fields.Text(
         string='Pricing Description',
@@ -20,6 +20,7 @@
 #
 #############################################################################
 from dateutil.relativedelta import relativedelta
+from markupsafe import Markup
 from odoo import api, fields, models, SUPERUSER_ID, _
 from odoo.exceptions import UserError
 
@@ -71,7 +72,15 @@ class SubscriptionPackage(models.Model):
     next_invoice_date = fields.Date(string='Next Invoice Date',
                                     store=True, help='Add next invoice date',
                                     compute="_compute_next_invoice_date",
-                                    inverse="_inverse_next_invoice_date")
+                                    inverse="_inverse_next_invoice_date",
+                                    index=True)
+    renew_date = fields.Date(string='Renewal Date', store=True, index=True,
+                             compute='_compute_renewal_dates',
+                             help='Date on which the renewal alert is sent')
+    end_date = fields.Date(string='End Date', store=True, index=True,
+                           compute='_compute_renewal_dates',
+                           help='Date on which the renewal limit of the plan '
+                                'is reached')
     company_id = fields.Many2one('res.company', string='Company',
                                  help='Select the company',
                                  default=lambda self: self.env.company,
@@ -192,16 +201,30 @@ class SubscriptionPackage(models.Model):
     def _compute_next_invoice_date(self):
         """The compute function is the next invoice date for subscription
         packages based on the start date and renewal time."""
-        for sub in self.env['subscription.package'].search([]):
+        for sub in self:
             if sub.start_date:
                 sub.next_invoice_date = sub.start_date + relativedelta(
                     days=sub.plan_id.renewal_time)
 
     def _inverse_next_invoice_date(self):
-        """Inverse function for next invoice date"""
-        for sub in self.env['subscription.package'].search([]):
-            if sub.start_date:
-                return
+        """Inverse function for next invoice date, the written date is
+        kept as is"""
+        return
+
+    @api.depends('next_invoice_date', 'date_started', 'plan_id.days_to_end')
+    def _compute_renewal_dates(self):
+        """Store the renewal and end dates so that the scheduler only has to
+        fetch the subscriptions due today."""
+        for sub in self:
+            if sub.next_invoice_date and sub.date_started:
+                dates = sub.find_renew_date(sub.next_invoice_date,
+                                            sub.date_started,
+                                            sub.plan_id.days_to_end)
+                sub.renew_date = dates['renew_date']
+                sub.end_date = dates['end_date']
+            else:
+                sub.renew_date = False
+                sub.end_date = False
 
     def button_invoice_count(self):
         """ It displays invoice based on subscription package """
@@ -373,80 +396,114 @@ class SubscriptionPackage(models.Model):
                 'close_date': close_date}
         return data
 
+    def _get_due_subscriptions(self, date):
+        """Return the in progress subscriptions having something to do on
+        the given date: an invoice, a renewal alert or the renewal limit."""
+        return self.search([
+            ('stage_category', '=', 'progress'),
+            '|', '|',
+            ('next_invoice_date', '=', date),
+            ('renew_date', '=', date),
+            ('end_date', '=', date),
+        ])
+
+    def _prepare_recurring_invoice_vals(self, date):
+        """Return the values of the draft invoice of the subscription"""
+        self.ensure_one()
+        return {
+            'move_type': 'out_invoice',
+            'invoice_date_due': date,
+            'invoice_payment_term_id': False,
+            'invoice_date': date,
+            'state': 'draft',
+            'subscription_id': self.id,
+            'partner_id': self.partner_invoice_id.id,
+            'currency_id': self.partner_invoice_id.currency_id.id,
+            'invoice_line_ids': [(0, 0, {
+                'product_id': line.product_id.id,
+                'quantity': line.product_qty,
+                'price_unit': line.unit_price,
+                'discount': line.discount,
+                'tax_ids': [(6, 0, line.tax_ids.ids)],
+            }) for line in self.product_line_ids],
+        }
+
+    def _update_close_date(self):
+        """Set the close date computed from the plan on the subscriptions"""
+        for sub in self:
+            sub.close_date = sub.find_renew_date(
+                sub.next_invoice_date, sub.date_started,
+                sub.plan_id.days_to_end)['close_date']
+
     def close_limit_cron(self):
         """ It Checks renew date, close date. It will send mail when renew
         date and also generates invoices based on the plan. It wil close the
-        subscription automatically if renewal limit is exceeded"""
-        pending_subscriptions = self.env['subscription.package'].search(
-            [('stage_category', '=', 'progress')])
+        subscription automatically if renewal limit is exceeded.
+
+        Only the subscriptions due today are fetched, using the stored next
+        invoice, renewal and end dates."""
         today_date = fields.Date.today()
-        pending_subscription = False
-        for pending_subscription in pending_subscriptions:
-            get_dates = self.find_renew_date(
-                pending_subscription.next_invoice_date,
-                pending_subscription.date_started,
-                pending_subscription.plan_id.days_to_end)
-            renew_date = get_dates['renew_date']
-            end_date = get_dates['end_date']
-            pending_subscription.close_date = get_dates['close_date']
-            if today_date == pending_subscription.next_invoice_date:
-                if pending_subscription.plan_id.invoice_mode == 'draft_invoice':
-                    this_products_line = []
-                    for rec in pending_subscription.product_line_ids:
-                        rec_list = [0, 0, {'product_id': rec.product_id.id,
-                                           'quantity': rec.product_qty,
-                                           'price_unit': rec.unit_price,
-                                           'discount': rec.discount,
-                                           'tax_ids': rec.tax_ids
-                                           }]
-                        this_products_line.append(rec_list)
-                    self.env['account.move'].create(
-                        {
-                            'move_type': 'out_invoice',
-                            'invoice_date_due': today_date,
-                            'invoice_payment_term_id': False,
-                            'invoice_date': today_date,
-                            'state': 'draft',
-                            'subscription_id': pending_subscription.id,
-                            'partner_id': pending_subscription.partner_invoice_id.id,
-                            'currency_id': pending_subscription.partner_invoice_id.currency_id.id,
-                            'invoice_line_ids': this_products_line
-                        })
-                    pending_subscription.write({
-                        'is_to_renew': False,
-                        'start_date': pending_subscription.next_invoice_date})
-                    new_date = self.find_renew_date(
-                        pending_subscription.next_invoice_date,
-                        pending_subscription.date_started,
-                        pending_subscription.plan_id.days_to_end)
-                    pending_subscription.write(
-                        {'close_date': new_date['close_date']})
-                    self.send_renew_alert_mail(today_date,
-                                               new_date['renew_date'],
-                                               pending_subscription.id)
-
-            if (today_date == end_date) and (
-                    pending_subscription.plan_id.limit_choice != 'manual'):
-                display_msg = ("<h5><i>The renewal limit has been exceeded "
-                               "today for this subscription based on the "
-                               "current subscription plan.</i></h5>")
-                pending_subscription.message_post(body=display_msg)
-                pending_subscription.is_closed = True
-                reason = (self.env['subscription.package.stop'].search([
-                    ('name', '=', 'Renewal Limit Exceeded')]).id)
-                pending_subscription.close_reason_id = reason
-                pending_subscription.closed_by = self.user_id
-                pending_subscription.close_date = fields.Date.today()
-                stage = (self.env['subscription.package.stage'].search([
-                    ('category', '=', 'closed')]).id)
-                values = {'stage_id': stage, 'is_to_renew': False,
-                          'next_invoice_date': False}
-                pending_subscription.write(values)
-
-            self.send_renew_alert_mail(today_date, renew_date,
-                                       pending_subscription.id)
-
-        return dict(pending=pending_subscription)
+        pending_subscriptions = self._get_due_subscriptions(today_date)
+        if not pending_subscriptions:
+            return dict(pending=pending_subscriptions)
+        # Prefetch the plans and products of all the due subscriptions
+        pending_subscriptions.plan_id.mapped('invoice_mode')
+        pending_subscriptions.product_line_ids.product_id.mapped('name')
+
+        # Dates are read before invoicing, as the invoice moves them forward
+        to_alert = pending_subscriptions.filtered(
+            lambda sub: sub.renew_date == today_date)
+        to_close = pending_subscriptions.filtered(
+            lambda sub: sub.end_date == today_date
+            and sub.plan_id.limit_choice != 'manual')
+        to_invoice = pending_subscriptions.filtered(
+            lambda sub: sub.next_invoice_date == today_date
+            and sub.plan_id.invoice_mode == 'draft_invoice')
+        pending_subscriptions.filtered(
+            lambda sub: sub.next_invoice_date and sub.date_started
+        )._update_close_date()
+
+        if to_invoice:
+            self.env['account.move'].create([
+                sub._prepare_recurring_invoice_vals(today_date)
+                for sub in to_invoice])
+            to_invoice.write({'is_to_renew': False,
+                              'start_date': today_date})
+            to_invoice._update_close_date()
+            to_alert |= to_invoice.filtered(
+                lambda sub: sub.renew_date == today_date)
+
+        if to_close:
+            display_msg = Markup(
+                "<h5><i>%s</i></h5>") % _(
+                "The renewal limit has been exceeded today for this "
+                "subscription based on the current subscription plan.")
+            for sub in to_close:
+                sub.message_post(body=display_msg)
+            reason = self.env['subscription.package.stop'].search([
+                ('name', '=', 'Renewal Limit Exceeded')], limit=1)
+            stage = self.env['subscription.package.stage'].search([
+                ('category', '=', 'closed')], limit=1)
+            to_close.write({'is_closed': True,
+                            'close_reason_id': reason.id,
+                            'closed_by': self.env.user.id,
+                            'close_date': today_date,
+                            'stage_id': stage.id,
+                            'is_to_renew': False,
+                            'next_invoice_date': False})
+
+        to_alert.send_renew_alert_mails()
+        return dict(pending=pending_subscriptions)
+
+    def send_renew_alert_mails(self):
+        """Queue the renewal alert emails of the subscriptions and mark them
+        for renewal."""
+        if not self:
+            return
+        self.env.ref(
+            'subscription_package.mail_template_subscription_renew'
+        ).send_mail_batch(self.ids)
+        self.write({'is_to_renew': True})
 
     @api.depends('product_line_ids.total_amount',
                  'product_line_ids.price_total', 'product_line_ids.tax_ids')